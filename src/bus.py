@@ -0,0 +1,118 @@
+"""
+Шина событий для доставки клиентам по постоянному соединению. Подписки каждого процесса хранятся в нём самом, а
+сообщение адресуется темам (например, ленте пользователя) и доставляется во все подписанные на них очереди.
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Collection
+from contextlib import asynccontextmanager
+from typing import Any
+
+
+class Bus(ABC):
+    @abstractmethod
+    async def publish(self, topics: Collection[str], message: str) -> None:
+        pass
+
+    @abstractmethod
+    def subscribe(self, *topics: str) -> Any:
+        """
+        Асинхронный контекстный менеджер, выдающий очередь сообщений подписки.
+        """
+
+    async def setup(self) -> None:
+        pass
+
+    async def dispose(self) -> None:
+        pass
+
+
+class LocalBus(Bus):
+    """
+    Доставляет сообщения только подписчикам своего процесса. Очереди ограничены: если клиент не успевает их
+    читать, новые сообщения для него отбрасываются, а не накапливаются.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self._queue_size: int = queue_size
+        self._queues: dict[str, set[asyncio.Queue[str]]] = {}
+
+    async def publish(self, topics: Collection[str], message: str) -> None:
+        self._deliver(topics, message)
+
+    @asynccontextmanager
+    async def subscribe(self, *topics: str) -> AsyncIterator[asyncio.Queue[str]]:
+        queue: asyncio.Queue[str] = asyncio.Queue(self._queue_size)
+        for topic in topics:
+            self._queues.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            for topic in topics:
+                queues = self._queues[topic]
+                queues.discard(queue)
+                if not queues:
+                    del self._queues[topic]
+
+    def _deliver(self, topics: Collection[str], message: str) -> None:
+        for topic in topics:
+            for queue in self._queues.get(topic, ()):
+                if not queue.full():
+                    queue.put_nowait(message)
+
+
+class RedisBus(LocalBus):
+    """
+    Сообщения рассылаются всем процессам через канал Redis, а каждый из них доставляет их своим подписчикам. Клиент
+    может быть любым с интерфейсом redis.asyncio.Redis.
+    """
+
+    CHANNEL: str = "bus"
+
+    def __init__(self, client: Any, queue_size: int) -> None:
+        super().__init__(queue_size)
+        self._client: Any = client
+        self._listener: asyncio.Task[None] | None = None
+
+    async def publish(self, topics: Collection[str], message: str) -> None:
+        await self._client.publish(
+            self.CHANNEL, json.dumps({"topics": list(topics), "message": message})
+        )
+
+    async def setup(self) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.CHANNEL)
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def dispose(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self._client.aclose()
+
+    async def _listen(self, pubsub: Any) -> None:
+        try:
+            async for event in pubsub.listen():
+                data = json.loads(event["data"])
+                self._deliver(data["topics"], data["message"])
+        finally:
+            await pubsub.aclose()
+
+
+class DeferredBus(Bus):
+    """
+    Откладывает публикацию через defer (например, BackgroundTasks.add_task), чтобы сообщение ушло только после
+    фиксации транзакции и получатели сразу видели изменения, о которых их оповестили.
+    """
+
+    def __init__(self, bus: Bus, defer: Callable[..., Any]) -> None:
+        self._bus: Bus = bus
+        self._defer: Callable[..., Any] = defer
+
+    async def publish(self, topics: Collection[str], message: str) -> None:
+        self._defer(self._bus.publish, list(topics), message)
+
+    def subscribe(self, *topics: str) -> Any:
+        return self._bus.subscribe(*topics)
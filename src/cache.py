@@ -0,0 +1,249 @@
+"""
+Кэш сериализованных ответов. Записи сгруппированы по ключам (например, все страницы ленты одного пользователя), и
+инвалидируется ключ целиком. Время жизни отсчитывается от первой записи в ключ, поэтому ограничивает устаревание
+даже тех изменений, о которых кэш не оповещается.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from time import monotonic
+from typing import Any
+from uuid import uuid4
+
+VERSION_FIELD: str = "version"
+
+
+class Cache(ABC):
+    def __init__(self) -> None:
+        self._hits: int = 0
+        self._misses: int = 0
+        self._pending: dict[tuple[str, str], asyncio.Event] = {}
+
+    async def get(self, key: str, field: str) -> bytes | None:
+        value = await self._get(key, field)
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+
+        return value
+
+    async def get_or_set(
+        self, key: str, field: str, create: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """
+        При промахе значение создаётся однократно: одновременные запросы того же поля в процессе ждут первого из них,
+        а не обращаются к источнику сами. Если первый завершился ошибкой, ожидавшие создают значение повторно.
+        """
+        value = await self.get(key, field)
+        if value is not None:
+            return value
+
+        pending = self._pending.get((key, field))
+        if pending is not None:
+            await pending.wait()
+            value = await self._get(key, field)
+            if value is not None:
+                return value
+
+        event = self._pending[key, field] = asyncio.Event()
+        try:
+            value = await create()
+            await self.set(key, field, value)
+            return value
+        finally:
+            if self._pending.get((key, field)) is event:
+                del self._pending[key, field]
+            event.set()
+
+    async def get_version(self, key: str) -> str:
+        """
+        Версия создаётся при первом обращении и исчезает вместе с ключом при инвалидации или истечении, поэтому
+        меняется при каждом изменении закэшированных данных. В счётчиках не учитывается.
+        """
+        version = await self._get(key, VERSION_FIELD)
+        if version is None:
+            version = uuid4().hex.encode()
+            await self.set(key, VERSION_FIELD, version)
+
+        return version.decode()
+
+    @abstractmethod
+    async def set(self, key: str, field: str, value: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def set_if_version(
+        self, key: str, field: str, value: bytes, version: str
+    ) -> bool:
+        """
+        Значение записывается, только если версия ключа (см. get_version) не изменилась: так данные, прочитанные до
+        инвалидации, не попадают в кэш после неё.
+        :return: Записано ли значение.
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def dispose(self) -> None:
+        pass
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Счётчики ведутся в каждом процессе отдельно, даже если хранилище общее.
+        """
+        return {"hits": self._hits, "misses": self._misses}
+
+    @abstractmethod
+    async def _get(self, key: str, field: str) -> bytes | None:
+        pass
+
+
+class LRUCache(Cache):
+    """
+    Хранится в памяти процесса: при превышении размера вытесняется ключ, дольше всех не использовавшийся.
+    """
+
+    def __init__(self, size: int, ttl: float) -> None:
+        super().__init__()
+        self._size: int = size
+        self._ttl: float = ttl
+        self._entries: OrderedDict[str, tuple[float, dict[str, bytes]]] = OrderedDict()
+
+    async def set(self, key: str, field: str, value: bytes) -> None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            entry = self._entries[key] = monotonic() + self._ttl, {}
+        entry[1][field] = value
+
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    async def set_if_version(
+        self, key: str, field: str, value: bytes, version: str
+    ) -> bool:
+        if await self._get(key, VERSION_FIELD) != version.encode():
+            return False
+
+        await self.set(key, field, value)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def dispose(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {**super().get_stats(), "size": len(self._entries)}
+
+    async def _get(self, key: str, field: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[1].get(field)
+
+
+class RedisCache(Cache):
+    """
+    Хранится в Redis-совместимом хранилище, общем для всех процессов: ключ — хэш, поле — запись. Клиент может быть
+    любым с интерфейсом redis.asyncio.Redis.
+    """
+
+    SET_IF_VERSION: str = """
+    if redis.call("HGET", KEYS[1], ARGV[1]) ~= ARGV[2] then
+        return 0
+    end
+    redis.call("HSET", KEYS[1], ARGV[3], ARGV[4])
+    return 1
+    """
+
+    def __init__(self, client: Any, ttl: int) -> None:
+        super().__init__()
+        self._client: Any = client
+        self._ttl: int = ttl
+
+    async def set(self, key: str, field: str, value: bytes) -> None:
+        async with self._client.pipeline(transaction=False) as pipeline:
+            pipeline.hset(key, field, value)
+            pipeline.expire(key, self._ttl, nx=True)
+            await pipeline.execute()
+
+    async def set_if_version(
+        self, key: str, field: str, value: bytes, version: str
+    ) -> bool:
+        """
+        Версия проверяется и значение записывается одним скриптом на сервере. Время жизни уже задано записью версии.
+        """
+        return bool(
+            await self._client.eval(
+                self.SET_IF_VERSION, 1, key, VERSION_FIELD, version, field, value
+            )
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def dispose(self) -> None:
+        await self._client.aclose()
+
+    async def _get(self, key: str, field: str) -> bytes | None:
+        return await self._client.hget(key, field)
+
+
+class DeferredCache(Cache):
+    """
+    Откладывает инвалидацию через defer (например, BackgroundTasks.add_task) до фиксации транзакции: иначе
+    одновременный запрос успел бы снова закэшировать данные, прочитанные до неё. Остальные операции выполняются
+    сразу, а счётчики ведёт исходный кэш.
+    """
+
+    def __init__(self, cache: Cache, defer: Callable[..., Any]) -> None:
+        super().__init__()
+        self._cache: Cache = cache
+        self._defer: Callable[..., Any] = defer
+
+    async def get(self, key: str, field: str) -> bytes | None:
+        return await self._cache.get(key, field)
+
+    async def get_or_set(
+        self, key: str, field: str, create: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        return await self._cache.get_or_set(key, field, create)
+
+    async def get_version(self, key: str) -> str:
+        return await self._cache.get_version(key)
+
+    async def set(self, key: str, field: str, value: bytes) -> None:
+        await self._cache.set(key, field, value)
+
+    async def set_if_version(
+        self, key: str, field: str, value: bytes, version: str
+    ) -> bool:
+        return await self._cache.set_if_version(key, field, value, version)
+
+    async def delete(self, *keys: str) -> None:
+        self._defer(self._cache.delete, *keys)
+
+    async def dispose(self) -> None:
+        """
+        Исходный кэш закрывает его владелец.
+        """
+
+    def get_stats(self) -> dict[str, Any]:
+        return self._cache.get_stats()
+
+    async def _get(self, key: str, field: str) -> bytes | None:
+        return await self._cache._get(key, field)
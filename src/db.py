@@ -1,23 +1,61 @@
 from abc import ABC, abstractmethod
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from itertools import cycle
+from time import monotonic
 from typing import Any
 
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
 
+from src.pool import InstrumentedPool, PoolMetrics
 from src.settings import db_settings
 
+WRITTEN: str = "is_written"
+
+
+class WriteTrackingSession(Session):
+    """
+    Отмечает в info, изменялись ли в сессии данные: выражениями INSERT, UPDATE, DELETE или сбросом объектов ORM.
+    Изменения в обход сессии (например, COPY драйвером) отмечаются явно (см. mark_written).
+    """
+
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def _track_execute(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        mark_written(state.session)
+
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def _track_flush(session: Session, flush_context: UOWTransaction) -> None:
+    mark_written(session)
+
+
+def mark_written(session: Session | AsyncSession) -> None:
+    session.info[WRITTEN] = True
+
 
 class DBManager(ABC):
     @abstractmethod
     @asynccontextmanager
-    def get_session(self) -> AsyncGenerator[Any, None]:
+    def get_session(
+        self, client: Any = None, is_read_only: bool = False
+    ) -> AsyncGenerator[Any, None]:
+        pass
+
+    @abstractmethod
+    @asynccontextmanager
+    def get_read_session(
+        self, client: Any = None, primary: Any = None
+    ) -> AsyncGenerator[Any, None]:
         pass
 
     @abstractmethod
@@ -28,33 +66,108 @@ class DBManager(ABC):
     async def clear(self) -> None:
         pass
 
+    @abstractmethod
+    async def dispose(self) -> None:
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> dict[str, Any]:
+        pass
+
 
 class SQLAlchemyDBManager(DBManager):
+    """
+    Владеет движками и пулами соединений, поэтому должен создаваться один раз на процесс (см. lifespan), а не на каждый
+    запрос.
+    """
+
     def __init__(self, metadata: MetaData) -> None:
         self._metadata: MetaData = metadata
 
-        self._engine: AsyncEngine = create_async_engine(
-            db_settings.url,
-            pool_size=db_settings.pool_size,
-            max_overflow=db_settings.max_overflow,
-            pool_pre_ping=db_settings.is_pool_pre_ping,
-        )
+        self._metrics: dict[str, PoolMetrics] = {}
+
+        self._engine: AsyncEngine = self._create_engine("primary", db_settings.url)
         self._session_maker: async_sessionmaker[AsyncSession] = async_sessionmaker(
-            self._engine, expire_on_commit=False
+            self._engine,
+            expire_on_commit=False,
+            sync_session_class=WriteTrackingSession,
         )
 
+        self._read_only_engine: AsyncEngine = self._to_read_only(self._engine)
+
+        self._replicas: list[AsyncEngine] = [
+            self._create_engine(f"replica_{i}", url)
+            for i, url in enumerate(db_settings.replica_urls)
+        ]
+        self._read_only_replicas: dict[AsyncEngine, AsyncEngine] = {
+            replica: self._to_read_only(replica) for replica in self._replicas
+        }
+        self._next_replicas: cycle[AsyncEngine] = cycle(self._replicas)
+        self._unhealthy_until: dict[AsyncEngine, float] = {}
+        self._written_until: dict[Any, float] = {}
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
     @asynccontextmanager
-    async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
+    async def get_session(
+        self, client: Any = None, is_read_only: bool = False
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Сессия основного сервера. Если в ней изменялись данные (см. WriteTrackingSession), клиент на время
+        db_settings.read_your_writes_time закрепляется за основным сервером: так он гарантированно увидит собственные
+        изменения, даже если реплики отстают.
+
+        Сессия только для чтения не фиксируется и не отмечает клиента (см. _open_read_only).
+        """
+        if is_read_only:
+            async with self._open_read_only(self._read_only_engine) as session:
+                yield session
+            return
+
         session = self._session_maker()
         try:
             yield session
             await session.commit()
-        except Exception as exc:
+            is_written = session.info.get(WRITTEN, False)
+        except Exception:
             await session.rollback()
-            raise exc
+            raise
         finally:
             await session.close()
 
+        if is_written and client is not None and db_settings.read_your_writes_time:
+            self._mark_written(client)
+
+    @asynccontextmanager
+    async def get_read_session(
+        self, client: Any = None, primary: AsyncSession | None = None
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Сессия для чтения на одной из реплик (по кругу). Соединение с репликой устанавливается заранее: если она
+        недоступна, то на время db_settings.replica_cooldown исключается из балансировки, а чтение выполняется на
+        основном сервере. Он же используется, если подходящей реплики нет: переданная сессия primary (чтобы не
+        занимать второе соединение из его пула) или новая.
+        """
+        replica = self._choose_replica(client)
+        session = None if replica is None else await self._connect(replica)
+
+        if session is not None:
+            try:
+                yield session
+            except Exception as exc:
+                if self._is_unavailable(exc):
+                    self._mark_unavailable(replica)
+                raise
+            finally:
+                await session.close()
+        elif primary is not None:
+            yield primary
+        else:
+            async with self._open_read_only(self._read_only_engine) as session:
+                yield session
+
     async def setup(self) -> None:
         async with self._engine.begin() as conn:
             await conn.run_sync(self._metadata.create_all)
@@ -63,3 +176,95 @@ class SQLAlchemyDBManager(DBManager):
         async with self._engine.begin() as conn:
             for table in self._metadata.sorted_tables:
                 await conn.execute(table.delete())
+
+    async def dispose(self) -> None:
+        for engine in (self._engine, *self._replicas):
+            await engine.dispose()
+
+    @asynccontextmanager
+    async def _open_read_only(
+        self, engine: AsyncEngine
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Запросы выполняются в режиме автофиксации: драйвер не отправляет ни BEGIN, ни COMMIT, ни ROLLBACK, а значит
+        чтение не тратит на них лишних обращений к серверу. Соединение, как и в любой сессии, берётся из пула только
+        при первом запросе.
+        """
+        session = self._session_maker(bind=engine)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {name: metrics.to_dict() for name, metrics in self._metrics.items()}
+
+    def _choose_replica(self, client: Any) -> AsyncEngine | None:
+        now = monotonic()
+        if self._written_until.get(client, 0) > now:
+            return None
+
+        for _ in self._replicas:
+            replica = next(self._next_replicas)
+            if self._unhealthy_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+    async def _connect(self, replica: AsyncEngine) -> AsyncSession | None:
+        """
+        :return: Сессия для чтения с уже полученным соединением или None, если реплика недоступна.
+        """
+        session = self._session_maker(bind=self._read_only_replicas[replica])
+        try:
+            await session.connection()
+        except Exception as exc:
+            await session.close()
+            if not self._is_unavailable(exc):
+                raise
+            self._mark_unavailable(replica)
+            return None
+
+        return session
+
+    def _mark_unavailable(self, replica: AsyncEngine) -> None:
+        self._unhealthy_until[replica] = monotonic() + db_settings.replica_cooldown
+
+    def _mark_written(self, client: Any) -> None:
+        """
+        Клиент переносится в конец словаря, поэтому записи упорядочены по сроку действия и истёкшие удаляются с
+        начала.
+        """
+        now = monotonic()
+        while self._written_until:
+            oldest = next(iter(self._written_until))
+            if self._written_until[oldest] > now:
+                break
+            del self._written_until[oldest]
+
+        self._written_until.pop(client, None)
+        self._written_until[client] = now + db_settings.read_your_writes_time
+
+    @staticmethod
+    def _is_unavailable(exc: Exception) -> bool:
+        return isinstance(exc, OSError) or (
+            isinstance(exc, DBAPIError) and exc.connection_invalidated
+        )
+
+    @staticmethod
+    def _to_read_only(engine: AsyncEngine) -> AsyncEngine:
+        """
+        Движок использует тот же пул, что и исходный, меняется только уровень изоляции выдаваемых соединений.
+        """
+        return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+    def _create_engine(self, name: str, url: str) -> AsyncEngine:
+        engine = create_async_engine(
+            url,
+            poolclass=InstrumentedPool,
+            pool_size=db_settings.pool_size,
+            max_overflow=db_settings.max_overflow,
+            pool_pre_ping=db_settings.is_pool_pre_ping,
+        )
+        engine.pool.metrics = self._metrics[name] = PoolMetrics(name, engine)  # type: ignore
+
+        return engine
@@ -3,33 +3,182 @@
 т.д.).
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from hashlib import blake2b
 from typing import Annotated, Any
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Header, Request
+from fastapi.security import APIKeyHeader
 
+from src.bus import Bus, LocalBus, RedisBus
+from src.cache import Cache, LRUCache, RedisCache
 from src.db import DBManager, SQLAlchemyDBManager
 from src.models import SQLAlchemyModel
+from src.pool import log_event
+from src.settings import cache_settings, db_settings, event_settings
 
 
-def get_db_manager() -> DBManager:
+def create_db_manager() -> DBManager:
     return SQLAlchemyDBManager(SQLAlchemyModel.metadata)
 
 
+def create_cache() -> Cache:
+    """
+    Клиент Redis — необязательная зависимость: он нужен, только если задан адрес хранилища.
+    """
+    if cache_settings.cache_url is None:
+        return LRUCache(cache_settings.cache_size, cache_settings.cache_ttl)
+
+    from redis.asyncio import from_url
+
+    return RedisCache(from_url(cache_settings.cache_url), cache_settings.cache_ttl)
+
+
+def create_bus() -> Bus:
+    if event_settings.events_url is None:
+        return LocalBus(event_settings.events_queue_size)
+
+    from redis.asyncio import from_url
+
+    return RedisBus(
+        from_url(event_settings.events_url), event_settings.events_queue_size
+    )
+
+
+def get_db_manager(request: Request) -> DBManager:
+    """
+    Менеджер создаётся один раз на процесс в lifespan: все запросы используют общие движок и пул соединений.
+    """
+    return request.app.state.db_manager
+
+
 DB_Manager = Annotated[DBManager, Depends(get_db_manager)]
 
 
+def get_cache(request: Request) -> Cache:
+    return request.app.state.cache
+
+
+Response_Cache = Annotated[Cache, Depends(get_cache)]
+
+
+def get_principal_cache(request: Request) -> Cache:
+    """
+    Данные аутентификации хранятся отдельно от лент: они не вытесняют друг друга из кэша процесса, а счётчики
+    попаданий и промахов ведутся раздельно.
+    """
+    return request.app.state.principal_cache
+
+
+Principal_Cache = Annotated[Cache, Depends(get_principal_cache)]
+
+
+def get_bus(request: Request) -> Bus:
+    return request.app.state.bus
+
+
+Event_Bus = Annotated[Bus, Depends(get_bus)]
+
+IfNoneMatch = Annotated[
+    str | None,
+    Header(description="Метки ранее полученных версий ответа.", alias="If-None-Match"),
+]
+
+
+def to_etag(*parts: Any) -> str:
+    """
+    Слабая метка строится из версии данных и параметров запроса, а не из тела ответа, поэтому проверяется до его
+    формирования.
+    """
+    return (
+        f'W/"{blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()}"'
+    )
+
+
+def is_etag_matched(etag: str, if_none_match: str | None) -> bool:
+    """
+    Сравнение слабое (RFC 9110, 13.1.2): префикс W/ не учитывается.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+key_header: APIKeyHeader = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+def _get_client(request: Request) -> str | None:
+    """
+    Клиент различается по ключу API без обращения к БД и без его проверки: это нужно лишь для маршрутизации чтения
+    (см. DBManager), а аутентификация сама выполняется через сессию для чтения.
+    """
+    return request.headers.get(key_header.model.name)
+
+
+Client = Annotated[str | None, Depends(_get_client)]
+
+
+async def _log_pool_stats(db_manager: DBManager) -> None:
+    while True:
+        await asyncio.sleep(db_settings.pool_log_interval)
+        log_event("db_pool_stats", pools=db_manager.get_stats())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    await get_db_manager().setup()
+    app.state.db_manager = create_db_manager()
+    await app.state.db_manager.setup()
+    app.state.cache = create_cache()
+    app.state.principal_cache = create_cache()
+    app.state.bus = create_bus()
+    await app.state.bus.setup()
+
+    tasks = []
+    if db_settings.pool_log_interval:
+        tasks.append(asyncio.create_task(_log_pool_stats(app.state.db_manager)))
 
     yield
 
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await app.state.bus.dispose()
+    await app.state.principal_cache.dispose()
+    await app.state.cache.dispose()
+    await app.state.db_manager.dispose()
+
+
+READ_ONLY_METHODS: frozenset[str] = frozenset({"GET", "HEAD"})
 
-async def _get_session(db_manager: DB_Manager) -> AsyncGenerator[Any, None]:
-    async with db_manager.get_session() as session:
+
+async def _get_session(
+    db_manager: DB_Manager, client: Client, request: Request
+) -> AsyncGenerator[Any, None]:
+    """
+    Режим сессии выбирается по маршруту: безопасные методы (см. READ_ONLY_METHODS) только читают данные, поэтому
+    их сессия не фиксируется.
+    """
+    async with db_manager.get_session(
+        client, request.method in READ_ONLY_METHODS
+    ) as session:
         yield session
 
 
 Session: Any = Annotated[Any, Depends(_get_session)]
+
+
+async def _get_read_session(
+    db_manager: DB_Manager, client: Client, session: Session
+) -> AsyncGenerator[Any, None]:
+    async with db_manager.get_read_session(client, session) as read_session:
+        yield read_session
+
+
+ReadSession: Any = Annotated[Any, Depends(_get_read_session)]
@@ -0,0 +1,68 @@
+"""
+Объединение запросов отдельных записей в пакетные. Загрузчик живёт не дольше обработки запроса (как и репозиторий,
+которому принадлежит) и не кэширует результаты: между проходами цикла событий данные могут измениться.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Mapping
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Ключи, запрошенные за один проход цикла событий (например, из задач asyncio.gather), загружаются одним вызовом
+    batch_load. Он получает уникальные ключи в порядке запроса и возвращает значения по ключам; отсутствующим
+    ключам соответствует None.
+    """
+
+    def __init__(
+        self, batch_load: Callable[[list[K]], Awaitable[Mapping[K, V]]]
+    ) -> None:
+        self._batch_load: Callable[[list[K]], Awaitable[Mapping[K, V]]] = batch_load
+        self._batch: dict[K, asyncio.Future[V | None]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        loop = asyncio.get_running_loop()
+        if not self._batch:
+            loop.call_soon(self._dispatch)
+
+        future = self._batch.get(key)
+        if future is None:
+            future = self._batch[key] = loop.create_future()
+
+        return await future
+
+    def _dispatch(self) -> None:
+        batch, self._batch = self._batch, {}
+        task = asyncio.create_task(self._resolve(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._finish)
+
+    def _finish(self, task: asyncio.Task[None]) -> None:
+        """
+        Ошибка загрузки уже передана ожидающим ключей, поэтому в самой задаче она считается обработанной.
+        """
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _resolve(self, batch: dict[K, asyncio.Future[Any]]) -> None:
+        try:
+            values = await self._batch_load(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
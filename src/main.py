@@ -19,6 +19,7 @@ from src.errors import (
     validation_handler,
 )
 from src.medias.routes import router as medias
+from src.metrics.routes import router as metrics
 from src.settings import api_settings, cors_settings, source_settings
 from src.tweets.routes import router as tweets
 from src.users.errors import (
@@ -67,5 +68,5 @@ for exc, handler in (
     app.add_exception_handler(exc, handler)  # type: ignore
 
 
-for router in (users, tweets, medias):
+for router in (users, tweets, medias, metrics):
     app.include_router(router, prefix="/api")
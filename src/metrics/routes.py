@@ -0,0 +1,46 @@
+from fastapi import APIRouter, status
+
+from src.dependencies import DB_Manager, Response_Cache
+from src.metrics.schemas import PydanticCacheStats, PydanticPoolsStats
+from src.schemas import PydanticError
+from src.users.dependencies import CurrentUser
+
+router: APIRouter = APIRouter(prefix="/metrics", tags=["Метрики"])
+
+
+@router.get(
+    "/pools",
+    summary="Получение статистики пулов соединений.",
+    response_description="Статистика получена.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+    },
+)
+async def get_pools(db_manager: DB_Manager, user: CurrentUser) -> PydanticPoolsStats:
+    """
+    Счётчики пулов соединений с основным сервером («primary») и репликами («replica_<номер>») БД. Собираются
+    отдельно в каждом процессе (воркере), которым и отвечает на запрос.
+    """
+    return PydanticPoolsStats.from_obj(db_manager.get_stats())
+
+
+@router.get(
+    "/cache",
+    summary="Получение статистики кэша ответов.",
+    response_description="Статистика получена.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+    },
+)
+async def get_cache(cache: Response_Cache, user: CurrentUser) -> PydanticCacheStats:
+    """
+    Счётчики попаданий и промахов кэша лент. Собираются отдельно в каждом процессе (воркере), которым и отвечает
+    на запрос, даже если само хранилище кэша общее.
+    """
+    return PydanticCacheStats.from_obj(cache.get_stats())
@@ -0,0 +1,97 @@
+from typing import Annotated, Any
+
+from pydantic import Field, NonNegativeFloat, NonNegativeInt
+
+from src.schemas import PydanticRootSchema, PydanticSchema, Schema
+
+
+class Histogram(Schema):
+    buckets: Any
+    count: Any
+    sum: Any
+
+
+class PydanticHistogram(PydanticSchema, Histogram):
+    buckets: Annotated[
+        dict[str, NonNegativeInt],
+        Field(
+            description="Количество наблюдений по верхним границам интервалов, с",
+            examples=[{"0.001": 98, "0.005": 2, "inf": 0}],
+        ),
+    ]
+    count: Annotated[
+        NonNegativeInt, Field(description="Всего наблюдений", examples=[100])
+    ]
+    sum: Annotated[
+        NonNegativeFloat, Field(description="Сумма наблюдений, с", examples=[0.05])
+    ]
+
+
+class PoolStats(Schema):
+    size: Any
+    checked_in: Any
+    checked_out: Any
+    overflow: Any
+    connects: Any
+    invalidations: Any
+    pre_ping_failures: Any
+    checkout_wait: Any
+    connection_age: Any
+
+
+class PydanticPoolStats(PydanticSchema, PoolStats):
+    size: Annotated[NonNegativeInt, Field(description="Размер пула", examples=[100])]
+    checked_in: Annotated[
+        NonNegativeInt, Field(description="Свободных соединений", examples=[3])
+    ]
+    checked_out: Annotated[
+        NonNegativeInt, Field(description="Выданных соединений", examples=[2])
+    ]
+    overflow: Annotated[
+        int,
+        Field(
+            description="Текущее превышение пула (отрицательно, пока пул не заполнен)",
+            examples=[-95],
+        ),
+    ]
+    connects: Annotated[
+        NonNegativeInt, Field(description="Открыто соединений", examples=[5])
+    ]
+    invalidations: Annotated[
+        NonNegativeInt, Field(description="Сброшено соединений", examples=[0])
+    ]
+    pre_ping_failures: Annotated[
+        NonNegativeInt, Field(description="Неудачных проверок (pre-ping)", examples=[0])
+    ]
+    checkout_wait: Annotated[
+        PydanticHistogram, Field(description="Время получения соединения из пула")
+    ]
+    connection_age: Annotated[
+        PydanticHistogram, Field(description="Возраст выдаваемых соединений")
+    ]
+
+
+class PoolsStats(Schema):
+    root: Any
+
+
+class PydanticPoolsStats(PydanticRootSchema, PoolsStats):
+    root: dict[str, PydanticPoolStats]
+
+
+class CacheStats(Schema):
+    hits: Any
+    misses: Any
+    size: Any
+
+
+class PydanticCacheStats(PydanticSchema, CacheStats):
+    hits: Annotated[NonNegativeInt, Field(description="Попаданий", examples=[90])]
+    misses: Annotated[NonNegativeInt, Field(description="Промахов", examples=[10])]
+    size: Annotated[
+        NonNegativeInt | None,
+        Field(
+            description="Ключей в кэше (null — хранилище общее и не учитывается)",
+            examples=[25],
+        ),
+    ] = None
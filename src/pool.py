@@ -0,0 +1,144 @@
+"""
+Инструментирование пула соединений: счётчики собираются отдельно в каждом процессе (воркере) и доступны как через API,
+так и в виде структурированных событий журнала.
+"""
+
+import json
+import logging
+from bisect import bisect_left
+from time import monotonic, perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
+
+from src.settings import db_settings
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+CHECKOUT_WAIT_BOUNDS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+CONNECTION_AGE_BOUNDS: tuple[float, ...] = (1, 10, 60, 300, 900, 3600, 14400, 86400)
+
+
+def log_event(name: str, **fields: Any) -> None:
+    logger.info(json.dumps({"event": name, **fields}, default=str))
+
+
+class Histogram:
+    """
+    Последний интервал не ограничен сверху, поэтому каждое наблюдение попадает ровно в один из них.
+    """
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds: tuple[float, ...] = bounds
+        self._counts: list[int] = [0] * (len(bounds) + 1)
+        self._sum: float = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": dict(
+                zip(map(str, (*self._bounds, "inf")), self._counts, strict=True)
+            ),
+            "count": sum(self._counts),
+            "sum": self._sum,
+        }
+
+
+class PoolMetrics:
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self._name: str = name
+        self._engine: AsyncEngine = engine
+
+        self._checkout_wait: Histogram = Histogram(CHECKOUT_WAIT_BOUNDS)
+        self._connection_age: Histogram = Histogram(CONNECTION_AGE_BOUNDS)
+        self._connects: int = 0
+        self._invalidations: int = 0
+        self._pre_ping_failures: int = 0
+
+        sync_engine = engine.sync_engine
+        for name_, listener in (
+            ("connect", self._on_connect),
+            ("checkout", self._on_checkout),
+            ("invalidate", self._on_invalidate),
+            ("handle_error", self._on_error),
+        ):
+            event.listen(sync_engine, name_, listener)
+
+    def observe_checkout_wait(self, wait: float) -> None:
+        self._checkout_wait.observe(wait)
+        if wait >= db_settings.pool_slow_checkout_time:
+            log_event(
+                "db_pool_slow_checkout",
+                pool=self._name,
+                wait=wait,
+                status=self._engine.pool.status(),
+            )
+
+    def to_dict(self) -> dict[str, Any]:
+        pool = self._engine.pool
+        return {
+            "size": pool.size(),  # type: ignore
+            "checked_in": pool.checkedin(),  # type: ignore
+            "checked_out": pool.checkedout(),  # type: ignore
+            "overflow": pool.overflow(),  # type: ignore
+            "connects": self._connects,
+            "invalidations": self._invalidations,
+            "pre_ping_failures": self._pre_ping_failures,
+            "checkout_wait": self._checkout_wait.to_dict(),
+            "connection_age": self._connection_age.to_dict(),
+        }
+
+    def _on_connect(self, dbapi_conn: Any, record: ConnectionPoolEntry) -> None:
+        record.info["connected_at"] = monotonic()
+        self._connects += 1
+
+    def _on_checkout(
+        self, dbapi_conn: Any, record: ConnectionPoolEntry, proxy: PoolProxiedConnection
+    ) -> None:
+        self._connection_age.observe(monotonic() - record.info["connected_at"])
+
+    def _on_invalidate(
+        self, dbapi_conn: Any, record: ConnectionPoolEntry, exc: BaseException | None
+    ) -> None:
+        self._invalidations += 1
+
+    def _on_error(self, context: ExceptionContext) -> None:
+        if context.is_pre_ping:
+            self._pre_ping_failures += 1
+            log_event(
+                "db_pool_pre_ping_failure",
+                pool=self._name,
+                error=repr(context.original_exception),
+            )
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Событие checkout пула возникает уже после получения соединения, поэтому время ожидания (включая создание нового
+    соединения и pre-ping) замеряется здесь.
+    """
+
+    metrics: PoolMetrics | None = None
+
+    def connect(self) -> PoolProxiedConnection:
+        start = perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_checkout_wait(perf_counter() - start)
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool  # type: ignore
@@ -2,25 +2,43 @@
 Типовые операции, независимые от типа хранимых данных (преимущественно CRUD).
 """
 
-from collections.abc import Sequence
-from contextlib import suppress
-from typing import Type, TypeVar
+from collections.abc import AsyncIterator, Sequence
+from functools import partial
+from typing import Any, Type, TypeVar
 from uuid import UUID
 
-from sqlalchemy import select
+import asyncpg
+from sqlalchemy import Select, Table, Uuid, any_, delete, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute, selectinload
 
+from src.db import mark_written
 from src.errors import AlreadyExistsError, NotFoundError
+from src.loaders import DataLoader
 from src.models import SQLAlchemyIDModel
+from src.settings import db_settings
+
+FOREIGN_KEY_VIOLATION: str = "23503"
+UNIQUE_VIOLATION: str = "23505"
 
 
 class SQLAlchemyRepository:
     T = TypeVar("T", bound=SQLAlchemyIDModel)
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self, session: AsyncSession, read_session: AsyncSession | None = None
+    ) -> None:
+        """
+        Сессия для чтения может быть открыта на реплике: через неё выполняются только запросы, которым не нужны
+        изменения текущей транзакции.
+        """
         self._session: AsyncSession = session
+        self._read_session: AsyncSession = (
+            session if read_session is None else read_session
+        )
+        self._loaders: dict[tuple[Any, ...], DataLoader[UUID, Any]] = {}
 
     async def _get_by_id(
         self,
@@ -31,10 +49,12 @@ class SQLAlchemyRepository:
             | InstrumentedAttribute[list[SQLAlchemyIDModel]],
             ...,
         ],
+        is_read_only: bool = False,
     ) -> T:
+        session = self._read_session if is_read_only else self._session
         try:
             return (
-                await self._session.execute(
+                await session.execute(
                     select(model)
                     .where(model.id == id_)
                     .options(*[selectinload(rel) for rel in relationships])
@@ -43,6 +63,85 @@ class SQLAlchemyRepository:
         except NoResultFound:
             raise NotFoundError(f"Requested {model.__readable_name__} not found")
 
+    async def _load_by_id(
+        self,
+        id_: UUID,
+        model: Type[T],
+        relationships: tuple[
+            InstrumentedAttribute[SQLAlchemyIDModel]
+            | InstrumentedAttribute[list[SQLAlchemyIDModel]],
+            ...,
+        ],
+    ) -> T:
+        """
+        Записи, запрошенные за один проход цикла событий с одинаковыми параметрами, загружаются одним запросом (см.
+        DataLoader и _get_by_ids) через сессию для чтения. Это позволяет запрашивать их конкурентно, хотя сессия не
+        допускает параллельных запросов, поэтому другие запросы через неё в это время выполняться не должны.
+        """
+        key = (model, tuple(map(str, relationships)))
+        loader = self._loaders.get(key)
+        if loader is None:
+            loader = self._loaders[key] = DataLoader(
+                partial(
+                    self._get_by_ids,
+                    model=model,
+                    relationships=relationships,
+                    is_read_only=True,
+                )
+            )
+
+        record = await loader.load(id_)
+        if record is None:
+            raise NotFoundError(f"Requested {model.__readable_name__} not found")
+
+        return record
+
+    async def _get_by_ids(
+        self,
+        ids: Sequence[UUID],
+        model: Type[T],
+        relationships: tuple[
+            InstrumentedAttribute[SQLAlchemyIDModel]
+            | InstrumentedAttribute[list[SQLAlchemyIDModel]],
+            ...,
+        ],
+        is_read_only: bool = False,
+    ) -> dict[UUID, T]:
+        """
+        :return: Записи по ID; отсутствующие пропускаются.
+        """
+        session = self._read_session if is_read_only else self._session
+        return {
+            record.id: record
+            for record in (
+                await session.execute(
+                    select(model)
+                    .where(self._in_ids(model.id, ids))
+                    .options(*[selectinload(rel) for rel in relationships])
+                )
+            ).scalars()
+        }
+
+    async def _get_many_by_ids(
+        self,
+        ids: Sequence[UUID],
+        model: Type[T],
+        relationships: tuple[
+            InstrumentedAttribute[SQLAlchemyIDModel]
+            | InstrumentedAttribute[list[SQLAlchemyIDModel]],
+            ...,
+        ],
+        is_read_only: bool = False,
+    ) -> list[T]:
+        """
+        Записи загружаются одним запросом (см. _get_by_ids) и возвращаются в порядке переданных ID.
+        """
+        records = await self._get_by_ids(ids, model, relationships, is_read_only)
+        if any(id_ not in records for id_ in ids):
+            raise NotFoundError(f"Requested {model.__readable_name__} not found")
+
+        return [records[id_] for id_ in ids]
+
     async def _get_all(
         self,
         model: Type[T],
@@ -62,6 +161,25 @@ class SQLAlchemyRepository:
             .all()
         )
 
+    async def _stream(
+        self, statement: Select[Any], batch_size: int
+    ) -> AsyncIterator[list[asyncpg.Record]]:
+        """
+        Строки читаются курсором на сервере партиями, поэтому в памяти находится не больше одной из них. Курсору
+        нужна транзакция, а сессии для чтения работают в режиме автофиксации (см. DBManager), поэтому она открывается
+        драйвером на время чтения (внутри транзакции сессии — как точка сохранения).
+        """
+        connection = await self._read_session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        compiled = statement.compile(dialect=connection.dialect)
+
+        async with driver_connection.transaction():
+            cursor = await driver_connection.cursor(
+                str(compiled), *(compiled.params[name] for name in compiled.positiontup)
+            )
+            while records := await cursor.fetch(batch_size):
+                yield records
+
     async def _create(self, record: T) -> T:
         try:
             self._session.add(record)
@@ -73,6 +191,80 @@ class SQLAlchemyRepository:
 
         return record
 
+    async def _create_many(
+        self, model: Type[T], values: Sequence[dict[str, Any]]
+    ) -> list[UUID]:
+        """
+        Записи создаются без объектов ORM одним запросом с несколькими строками, а начиная с
+        db_settings.copy_threshold строк — командой COPY, которая не разбирает каждую строку как выражение SQL.
+        Значения по умолчанию на стороне Python (например, ID) вычисляются заранее, т.к. COPY их не применяет.
+
+        :return: ID созданных записей в порядке переданных значений.
+        """
+        if not values:
+            return []
+
+        rows = self._with_defaults(model.__table__, values)
+        try:
+            if len(rows) >= db_settings.copy_threshold:
+                await self._copy(model.__table__, rows)
+            else:
+                await self._session.execute(insert(model.__table__).values(rows))
+        except IntegrityError as exc:
+            self._raise_integrity_error(
+                getattr(exc.orig, "sqlstate", None), model.__readable_name__
+            )
+            raise
+        except asyncpg.IntegrityConstraintViolationError as exc:
+            self._raise_integrity_error(exc.sqlstate, model.__readable_name__)
+            raise
+
+        return [row["id"] for row in rows]
+
+    async def _upsert_many(
+        self,
+        model: Type[T],
+        values: Sequence[dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Sequence[str] | None = None,
+    ) -> None:
+        """
+        Записи создаются или обновляются одним запросом с несколькими строками. Строки с одинаковыми значениями
+        index_elements объединяются заранее (побеждает последняя): одна команда не может изменить строку дважды.
+
+        :param index_elements: Столбцы уникального ограничения, по которому определяется конфликт.
+        :param update_columns: Обновляемые при конфликте столбцы (по умолчанию — все переданные, кроме ключевых).
+        """
+        if not values:
+            return
+
+        rows = list(
+            {
+                tuple(row[name] for name in index_elements): row
+                for row in self._with_defaults(model.__table__, values)
+            }.values()
+        )
+        if update_columns is None:
+            keys = {*index_elements, *model.__table__.primary_key.columns.keys()}
+            update_columns = [name for name in values[0] if name not in keys]
+
+        query = insert(model.__table__).values(rows)
+        query = (
+            query.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={name: query.excluded[name] for name in update_columns},
+            )
+            if update_columns
+            else query.on_conflict_do_nothing(index_elements=index_elements)
+        )
+        try:
+            await self._session.execute(query)
+        except IntegrityError as exc:
+            self._raise_integrity_error(
+                getattr(exc.orig, "sqlstate", None), model.__readable_name__
+            )
+            raise
+
     async def _delete_by_id(
         self,
         id_: UUID,
@@ -91,45 +283,132 @@ class SQLAlchemyRepository:
 
         await self._session.delete(record)
 
-    async def _append_related_by_id(
-        self,
-        list_: list[T],
-        related_id: UUID,
-        related_model: Type[T],
-        related_relationships: tuple[
-            InstrumentedAttribute[SQLAlchemyIDModel]
-            | InstrumentedAttribute[list[SQLAlchemyIDModel]],
-            ...,
-        ],
+    async def _delete_many(
+        self, model: Type[SQLAlchemyIDModel], ids: Sequence[UUID]
     ) -> None:
         """
-        Попытка создать уже существующее отношение не вызывает ошибок, т.к. результат в любом случае соответствует
-        ожидаемому — отношение присутствует.
+        Записи удаляются одним запросом, без загрузки. Как и в _delete_by_id, отсутствие любой из записей вызывает
+        NotFoundError; удаление остальных отменяется вместе с транзакцией.
         """
-        related = await self._get_by_id(
-            related_id, related_model, related_relationships
+        deleted = (
+            (
+                await self._session.execute(
+                    delete(model).where(self._in_ids(model.id, ids)).returning(model.id)
+                )
+            )
+            .scalars()
+            .all()
         )
+        if len(deleted) < len(set(ids)):
+            raise NotFoundError(f"Requested {model.__readable_name__} not found")
 
-        list_.append(related)
+    async def _create_relation(self, table: Table, **values: Any) -> bool:
+        """
+        Отношение создаётся одним запросом, без загрузки коллекций связанных записей. Попытка создать уже
+        существующее отношение не вызывает ошибок, т.к. результат в любом случае соответствует ожидаемому — отношение
+        присутствует.
 
-    async def _remove_related_by_id(
-        self,
-        list_: list[T],
-        related_id: UUID,
-        related_model: Type[T],
-        related_relationships: tuple[
-            InstrumentedAttribute[SQLAlchemyIDModel]
-            | InstrumentedAttribute[list[SQLAlchemyIDModel]],
-            ...,
-        ],
-    ) -> None:
+        :return: Было ли отношение создано этим запросом.
+        """
+        try:
+            return (
+                await self._session.execute(
+                    insert(table)
+                    .values(**values)
+                    .on_conflict_do_nothing()
+                    .returning(*table.primary_key.columns)
+                )
+            ).first() is not None
+        except IntegrityError as exc:
+            self._raise_integrity_error(getattr(exc.orig, "sqlstate", None), table.name)
+            raise
+
+    async def _delete_relation(self, table: Table, **values: Any) -> bool:
+        """
+        Отношение удаляется одним запросом. Попытка удалить несуществующее отношение не вызывает ошибок, т.к.
+        результат в любом случае соответствует ожидаемому — отношение отсутствует.
+
+        :return: Было ли отношение удалено этим запросом.
+        """
+        return (
+            await self._session.execute(
+                delete(table)
+                .where(*(table.c[name] == value for name, value in values.items()))
+                .returning(*table.primary_key.columns)
+            )
+        ).first() is not None
+
+    async def _copy(self, table: Table, rows: Sequence[dict[str, Any]]) -> None:
         """
-        Попытка удалить несуществующее отношение не вызывает ошибок, т.к. результат в любом случае соответствует
-        ожидаемому — отношение отсутствует.
+        COPY выполняется драйвером на соединении сессии (в её транзакции), поэтому изменения ORM сбрасываются заранее.
         """
-        related = await self._get_by_id(
-            related_id, related_model, related_relationships
+        await self._session.flush()
+        mark_written(self._session)
+        connection = await self._session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        columns = list(rows[0])
+
+        await driver_connection.copy_records_to_table(
+            table.name,
+            records=[tuple(row[name] for name in columns) for row in rows],
+            columns=columns,
         )
 
-        with suppress(ValueError):
-            list_.remove(related)
+    @staticmethod
+    def _in_ids(column: Any, ids: Sequence[UUID]) -> Any:
+        """
+        ID передаются одним параметром-массивом, поэтому выражение не зависит от их количества и подготавливается
+        драйвером однократно.
+        """
+        return column == any_(literal(list(ids), ARRAY(Uuid)))
+
+    @staticmethod
+    def _with_defaults(
+        table: Table, values: Sequence[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        defaults = {
+            column.key: column.default
+            for column in table.columns
+            if column.default is not None
+            and (column.default.is_scalar or column.default.is_callable)
+        }
+
+        rows = []
+        for row in values:
+            row = dict(row)
+            for name, default in defaults.items():
+                if name not in row:
+                    row[name] = (
+                        default.arg(None) if default.is_callable else default.arg
+                    )
+            rows.append(row)
+
+        return rows
+
+    @staticmethod
+    def _raise_integrity_error(sqlstate: str | None, readable_name: str) -> None:
+        """
+        Нарушения уникальности и внешних ключей преобразуются в ошибки предметной области, остальные оставляются
+        вызывающему.
+        """
+        if sqlstate == UNIQUE_VIOLATION:
+            raise AlreadyExistsError(f"{readable_name.capitalize()} already exists.")
+        if sqlstate == FOREIGN_KEY_VIOLATION:
+            raise NotFoundError("Requested related record not found")
+
+
+class AsyncpgRepository(SQLAlchemyRepository):
+    """
+    Запросы выполняются напрямую драйвером asyncpg на соединении сессии SQLAlchemy (с её пулом и транзакцией), минуя
+    ORM: без карты идентичности и загрузки отношений. Драйвер кэширует подготовленные выражения каждого соединения,
+    поэтому повторяющиеся запросы не разбираются сервером заново.
+    """
+
+    @staticmethod
+    async def _get_connection(session: AsyncSession) -> asyncpg.Connection:
+        """
+        Запросы драйвера не вызывают автоматического сброса изменений ORM, поэтому он выполняется явно.
+        """
+        await session.flush()
+        connection = await session.connection()
+        return (await connection.get_raw_connection()).driver_connection
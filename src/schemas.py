@@ -3,16 +3,18 @@
 """
 
 from abc import ABC, abstractmethod
-from collections.abc import Awaitable, Callable
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from collections.abc import Awaitable, Callable, Mapping, Sequence
 from functools import wraps
 from typing import Annotated, Any, Self, Type, TypeVar
 from uuid import UUID
 
-from fastapi import Path
-from pydantic import BaseModel, ConfigDict, Field, RootModel
+from fastapi import Path, Query
+from pydantic import BaseModel, ConfigDict, Field, RootModel, ValidationError
 from pydantic.alias_generators import to_camel
 
-from src.settings import EXAMPLES
+from src.settings import EXAMPLES, db_settings
 
 
 class Schema(ABC):
@@ -73,6 +75,30 @@ def obj_from_dto(obj_class: Type[Any]) -> Callable[[FuncT], FuncT]:
     return decorator
 
 
+PydanticSchemaT = TypeVar("PydanticSchemaT", bound=PydanticSchema)
+
+
+def to_cursor(schema: PydanticSchema) -> str:
+    """
+    Курсор непрозрачен для клиента: это позиция в упорядоченной выборке, закодированная в строку.
+    """
+    return urlsafe_b64encode(schema.model_dump_json().encode()).decode()
+
+
+def from_cursor(
+    schema_class: Type[PydanticSchemaT],
+) -> Callable[[str | None], PydanticSchemaT | None]:
+    def decode(cursor: str | None) -> PydanticSchemaT | None:
+        if cursor is None:
+            return None
+        try:
+            return schema_class.model_validate_json(urlsafe_b64decode(cursor))
+        except (DecodeError, ValidationError):
+            raise ValueError("Invalid cursor.")
+
+    return decode
+
+
 class Error(Schema):
     msg: Any
 
@@ -81,6 +107,63 @@ class PydanticError(PydanticSchema, Error):
     msg: Annotated[str, Field(examples=["Something went wrong."])]
 
 
+class IDs(Schema):
+    ids: Any
+
+
+class PydanticIDs(PydanticSchema, IDs):
+    ids: Annotated[
+        list[UUID],
+        Field(
+            min_length=1,
+            max_length=db_settings.batch_max_size,
+            description="Уникальные идентификаторы",
+            examples=[[EXAMPLES.uuid4()]],
+        ),
+    ]
+
+
+class BatchItem(Schema):
+    id: Any
+    error: Any
+
+
+class PydanticBatchItem(PydanticSchema, BatchItem):
+    id: Annotated[
+        UUID,
+        Field(description="Уникальный идентификатор", examples=[EXAMPLES.uuid4()]),
+    ]
+    error: Annotated[
+        PydanticError | None,
+        Field(
+            description="Ошибка, с которой завершился бы запрос для одного ID (null — успешно)",
+            examples=[None],
+        ),
+    ]
+
+
+class BatchResult(Schema):
+    root: Any
+
+
+class PydanticBatchResult(PydanticRootSchema, BatchResult):
+    root: list[PydanticBatchItem]
+
+    @classmethod
+    def from_errors(cls, ids: Sequence[UUID], errors: Mapping[UUID, Exception]) -> Self:
+        return cls(
+            [
+                PydanticBatchItem(
+                    id=id_,
+                    error=None
+                    if id_ not in errors
+                    else PydanticError(msg=errors[id_].args[0]),
+                )
+                for id_ in ids
+            ]
+        )
+
+
 ID = Annotated[
     UUID,
     Path(
@@ -89,3 +172,8 @@ ID = Annotated[
         examples=[EXAMPLES.uuid4()],
     ),
 ]
+
+Limit = Annotated[
+    int,
+    Query(ge=1, le=100, description="Максимальное количество записей на странице"),
+]
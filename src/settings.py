@@ -9,7 +9,9 @@ from pydantic import (
     HttpUrl,
     MariaDBDsn,
     MySQLDsn,
+    NonNegativeFloat,
     NonNegativeInt,
+    PositiveFloat,
     PositiveInt,
     PostgresDsn,
     RedisDsn,
@@ -29,6 +31,10 @@ def _to_str(value: Any) -> str:
     return str(value)
 
 
+def _to_optional_str(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
 def _to_strings(values: list[Any]) -> list[str]:
     return list(map(_to_str, values))
 
@@ -64,6 +70,45 @@ class DBSettings(Settings, Generic[T]):
     pool_size: PositiveInt = 100
     max_overflow: NonNegativeInt = 0
     is_pool_pre_ping: bool = False
+    pool_slow_checkout_time: PositiveFloat = 0.1
+    pool_log_interval: NonNegativeFloat = 0
+
+    replica_urls: Annotated[list[T], AfterValidator(_to_strings)] = Field(
+        default_factory=list
+    )
+    replica_cooldown: PositiveFloat = 30
+    read_your_writes_time: NonNegativeFloat = 0
+
+    is_raw_repositories: bool = False
+    is_db_json: bool = False
+
+    reconcile_batch_size: PositiveInt = 1000
+    timeline_size: PositiveInt = 800
+    pull_threshold: PositiveInt = 10_000
+    stream_batch_size: PositiveInt = 1000
+    likes_preview_size: PositiveInt = 3
+    batch_max_size: PositiveInt = 1000
+    copy_threshold: PositiveInt = 1000
+
+
+class RankingSettings(Settings):
+    gravity: Annotated[NonNegativeFloat, Field(default=1.8, alias="ranking_gravity")]
+    affinity_weight: Annotated[
+        NonNegativeFloat, Field(default=0.5, alias="ranking_affinity_weight")
+    ]
+    batch_size: Annotated[PositiveInt, Field(default=4096, alias="ranking_batch_size")]
+
+
+class CacheSettings(Settings):
+    cache_url: Annotated[RedisDsn | None, AfterValidator(_to_optional_str)] = None
+    cache_size: PositiveInt = 10_000
+    cache_ttl: PositiveInt = 30
+
+
+class EventSettings(Settings):
+    events_url: Annotated[RedisDsn | None, AfterValidator(_to_optional_str)] = None
+    events_queue_size: PositiveInt = 100
+    events_heartbeat: PositiveFloat = 15
 
 
 class SourceSettings(Settings):
@@ -96,5 +141,8 @@ class CORSSettings(Settings):
 
 api_settings = APISettings()  # type: ignore
 db_settings = DBSettings[PostgresDsn]()  # type: ignore
+ranking_settings = RankingSettings()  # type: ignore
+cache_settings = CacheSettings()  # type: ignore
+event_settings = EventSettings()  # type: ignore
 source_settings = SourceSettings()  # type: ignore
 cors_settings = CORSSettings()  # type: ignore
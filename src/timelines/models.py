@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Integer, Table, Uuid
+
+from src.models import SQLAlchemyModel
+
+sqlalchemy_timelines: Table = Table(
+    "timelines",
+    SQLAlchemyModel.metadata,
+    Column(
+        "user_id",
+        Uuid,
+        ForeignKey("users.id", onupdate="RESTRICT", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("slot", Integer, primary_key=True),
+    Column(
+        "tweet_id",
+        Uuid,
+        ForeignKey("tweets.id", onupdate="RESTRICT", ondelete="CASCADE"),
+        index=True,
+    ),
+)
@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Select, delete, exists, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.repositories import SQLAlchemyRepository
+from src.settings import db_settings
+from src.timelines.models import sqlalchemy_timelines
+from src.tweets.models import SQLAlchemyTweet
+from src.users.models import SQLAlchemyUser, sqlalchemy_follows
+
+
+class TimelineRepository(ABC):
+    @abstractmethod
+    async def get_readers(self, *tweet_ids: UUID) -> list[UUID]:
+        pass
+
+    @abstractmethod
+    async def push(self, tweet_id: UUID, author_id: UUID) -> list[UUID]:
+        pass
+
+    @abstractmethod
+    async def remove(self, tweet_id: UUID) -> list[UUID]:
+        pass
+
+    @abstractmethod
+    async def backfill(self, user_id: UUID, *author_ids: UUID) -> None:
+        pass
+
+    @abstractmethod
+    async def prune(self, user_id: UUID, author_id: UUID) -> None:
+        pass
+
+
+class SQLAlchemyTimelineRepository(SQLAlchemyRepository, TimelineRepository):
+    """
+    Лента каждого пользователя — кольцевой буфер из timeline_size ячеек: публикация записывается в ячейку, следующую
+    за последней заполненной (её номер хранится в SQLAlchemyUser.timeline_head), вытесняя самую старую.
+    """
+
+    async def get_readers(self, *tweet_ids: UUID) -> list[UUID]:
+        """
+        :return: ID пользователей, в лентах которых есть хотя бы одна из публикаций.
+        """
+        return list(
+            (
+                await self._session.execute(
+                    select(sqlalchemy_timelines.c.user_id)
+                    .where(sqlalchemy_timelines.c.tweet_id.in_(tweet_ids))
+                    .distinct()
+                )
+            ).scalars()
+        )
+
+    async def push(self, tweet_id: UUID, author_id: UUID) -> list[UUID]:
+        """
+        Публикация добавляется в ленты всех отслеживающих автора одним запросом: их счётчики ячеек сдвигаются
+        на сервере, поэтому одновременные публикации не занимают одну ячейку. Строки отслеживающих блокируются заранее
+        в порядке ID, чтобы одновременные публикации авторов с общими отслеживающими не заблокировали друг друга.
+        :return: ID пользователей, в ленты которых добавлена публикация.
+        """
+        followers = (
+            select(SQLAlchemyUser.id)
+            .join(
+                sqlalchemy_follows,
+                SQLAlchemyUser.id == sqlalchemy_follows.c.follower_id,
+            )
+            .where(sqlalchemy_follows.c.followed_id == author_id)
+            .order_by(SQLAlchemyUser.id)
+            .with_for_update(of=SQLAlchemyUser)
+            .cte("followers")
+        )
+        heads = (
+            update(SQLAlchemyUser)
+            .where(SQLAlchemyUser.id == followers.c.id)
+            .values(timeline_head=SQLAlchemyUser.timeline_head + 1)
+            .returning(SQLAlchemyUser.id, SQLAlchemyUser.timeline_head)
+            .cte("heads")
+        )
+
+        return list(
+            (
+                await self._session.execute(
+                    self._upsert(
+                        select(
+                            heads.c.id,
+                            heads.c.timeline_head % db_settings.timeline_size,
+                            literal(tweet_id),
+                        )
+                    )
+                    .add_cte(followers, heads)
+                    .returning(sqlalchemy_timelines.c.user_id)
+                )
+            ).scalars()
+        )
+
+    async def remove(self, tweet_id: UUID) -> list[UUID]:
+        """
+        :return: ID пользователей, из лент которых удалена публикация.
+        """
+        return list(
+            (
+                await self._session.execute(
+                    delete(sqlalchemy_timelines)
+                    .where(sqlalchemy_timelines.c.tweet_id == tweet_id)
+                    .returning(sqlalchemy_timelines.c.user_id)
+                )
+            ).scalars()
+        )
+
+    async def backfill(self, user_id: UUID, *author_ids: UUID) -> None:
+        """
+        В ленту добавляются последние публикации авторов, которых в ней ещё нет, если они новее вытесняемых. Лента
+        перезаписывается целиком: публикации раскладываются от последней заполненной ячейки назад, от новых к старым,
+        поэтому рассылка (см. push) сначала занимает свободные ячейки, а затем вытесняет самые старые публикации.
+        Строка пользователя блокируется, чтобы одновременные рассылки не заняли те же ячейки.
+        """
+        if not author_ids:
+            return
+
+        head = (
+            await self._session.execute(
+                select(SQLAlchemyUser.timeline_head)
+                .where(SQLAlchemyUser.id == user_id)
+                .with_for_update()
+            )
+        ).scalar_one()
+        entries = (
+            await self._session.execute(
+                select(
+                    sqlalchemy_timelines.c.slot,
+                    SQLAlchemyTweet.id,
+                    SQLAlchemyTweet.created_at,
+                )
+                .join(
+                    SQLAlchemyTweet,
+                    SQLAlchemyTweet.id == sqlalchemy_timelines.c.tweet_id,
+                )
+                .where(sqlalchemy_timelines.c.user_id == user_id)
+            )
+        ).all()
+        candidates = (
+            await self._session.execute(
+                select(
+                    literal(None).label("slot"),
+                    SQLAlchemyTweet.id,
+                    SQLAlchemyTweet.created_at,
+                )
+                .where(
+                    SQLAlchemyTweet.author_id.in_(author_ids),
+                    ~exists().where(
+                        sqlalchemy_timelines.c.user_id == user_id,
+                        sqlalchemy_timelines.c.tweet_id == SQLAlchemyTweet.id,
+                    ),
+                )
+                .order_by(SQLAlchemyTweet.created_at.desc(), SQLAlchemyTweet.id.desc())
+                .limit(db_settings.timeline_size)
+            )
+        ).all()
+
+        kept = sorted(
+            (*entries, *candidates),
+            key=lambda entry: (entry.created_at, entry.id),
+            reverse=True,
+        )[: db_settings.timeline_size]
+        if all(entry.slot is not None for entry in kept):
+            return
+
+        await self._session.execute(
+            delete(sqlalchemy_timelines).where(
+                sqlalchemy_timelines.c.user_id == user_id
+            )
+        )
+        await self._session.execute(
+            insert(sqlalchemy_timelines),
+            [
+                {
+                    "user_id": user_id,
+                    "slot": (head - offset) % db_settings.timeline_size,
+                    "tweet_id": entry.id,
+                }
+                for offset, entry in enumerate(kept)
+            ],
+        )
+
+    async def prune(self, user_id: UUID, author_id: UUID) -> None:
+        """
+        Освободившиеся ячейки остаются пустыми до следующего оборота буфера.
+        """
+        await self._session.execute(
+            delete(sqlalchemy_timelines).where(
+                sqlalchemy_timelines.c.user_id == user_id,
+                sqlalchemy_timelines.c.tweet_id.in_(
+                    select(SQLAlchemyTweet.id).where(
+                        SQLAlchemyTweet.author_id == author_id
+                    )
+                ),
+            )
+        )
+
+    @staticmethod
+    def _upsert(rows: Select[Any]) -> Any:
+        query = insert(sqlalchemy_timelines).from_select(
+            ["user_id", "slot", "tweet_id"], rows
+        )
+        return query.on_conflict_do_update(
+            index_elements=["user_id", "slot"],
+            set_={"tweet_id": query.excluded.tweet_id},
+        )
@@ -1,14 +1,39 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import BackgroundTasks, Depends
 
-from src.dependencies import Session
-from src.tweets.repositories import SQLAlchemyTweetRepository
+from src.bus import DeferredBus
+from src.cache import DeferredCache
+from src.dependencies import Event_Bus, ReadSession, Response_Cache, Session
+from src.settings import db_settings
+from src.timelines.repositories import SQLAlchemyTimelineRepository
+from src.tweets.repositories import AsyncpgTweetRepository, SQLAlchemyTweetRepository
 from src.tweets.services import TweetService
+from src.users.repositories import SQLAlchemyUserRepository
 
 
-def _get_tweet_service(session: Session) -> TweetService:
-    return TweetService(SQLAlchemyTweetRepository(session))
+def _get_tweet_service(
+    session: Session,
+    read_session: ReadSession,
+    cache: Response_Cache,
+    bus: Event_Bus,
+    background_tasks: BackgroundTasks,
+) -> TweetService:
+    """
+    Фоновые задачи выполняются после фиксации сессии, поэтому через них инвалидируется кэш и публикуются события.
+    """
+    repository = (
+        AsyncpgTweetRepository
+        if db_settings.is_raw_repositories
+        else SQLAlchemyTweetRepository
+    )
+    return TweetService(
+        repository(session, read_session),
+        SQLAlchemyTimelineRepository(session),
+        SQLAlchemyUserRepository(session, read_session),
+        DeferredCache(cache, background_tasks.add_task),
+        DeferredBus(bus, background_tasks.add_task),
+    )
 
 
 Service = Annotated[TweetService, Depends(_get_tweet_service)]
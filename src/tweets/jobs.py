@@ -0,0 +1,47 @@
+"""
+Фоновые задачи публикаций. Запускаются отдельно от веб-сервиса (например, по расписанию):
+python -m src.tweets.jobs
+"""
+
+import asyncio
+import logging
+
+from src.db import DBManager
+from src.dependencies import create_db_manager
+from src.settings import db_settings
+from src.tweets.repositories import SQLAlchemyTweetRepository
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def reconcile_like_counts(db_manager: DBManager, batch_size: int) -> int:
+    """
+    Каждая партия обрабатывается в собственной транзакции, чтобы не удерживать блокировки всех публикаций сразу.
+    Задаче нужна только БД, поэтому кэш и шина событий (и их подключения) не создаются.
+    """
+    after_id, total = None, 0
+    while True:
+        async with db_manager.get_session() as session:
+            after_id, fixed = await SQLAlchemyTweetRepository(
+                session
+            ).reconcile_like_counts(after_id, batch_size)
+
+        total += fixed
+        if after_id is None:
+            return total
+
+
+async def main() -> None:
+    db_manager = create_db_manager()
+    try:
+        fixed = await reconcile_like_counts(
+            db_manager, db_settings.reconcile_batch_size
+        )
+        logger.info("Like counts reconciled: %d tweets fixed", fixed)
+    finally:
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,6 +1,16 @@
 import uuid
+from datetime import datetime
 
-from sqlalchemy import Column, ForeignKey, String, Table, Uuid
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Table,
+    Uuid,
+    func,
+)
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,14 +19,26 @@ from src.users.models import SQLAlchemyUser
 
 
 class SQLAlchemyTweet(SQLAlchemyIDModel):
+    """
+    Количество отметок «нравится» денормализовано: оно поддерживается при их создании и удалении, а расхождения
+    (например, после каскадного удаления пользователей) исправляются сверкой (см. src/tweets/jobs.py).
+    """
+
     __readable_name__ = "tweet"
     __tablename__ = "tweets"
+    __table_args__ = (
+        Index("ix_tweets_author_id_created_at", "author_id", "created_at"),
+    )
 
     text: Mapped[str] = mapped_column(String(500))
     medias: Mapped[list[uuid.UUID]] = mapped_column(ARRAY(Uuid))
     author_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("users.id", onupdate="RESTRICT", ondelete="CASCADE")
     )
+    like_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
 
     author: Mapped[SQLAlchemyUser] = relationship("SQLAlchemyUser")
     likes: Mapped[list[SQLAlchemyUser]] = relationship(
@@ -38,5 +60,6 @@ sqlalchemy_likes: Table = Table(
         Uuid,
         ForeignKey("users.id", onupdate="RESTRICT", ondelete="CASCADE"),
         primary_key=True,
+        index=True,
     ),
 )
@@ -0,0 +1,143 @@
+"""
+Ранжирование ленты: оценка публикаций-кандидатов по количеству отметок «нравится» с затуханием во времени и близости
+автора к читателю. Вычисления векторизованы, поэтому не зависят от числа кандидатов на уровне интерпретатора.
+"""
+
+from collections.abc import Iterable
+from uuid import UUID
+
+import numpy as np
+from numpy.typing import NDArray
+
+type Floats = NDArray[np.float64]
+type Indices = NDArray[np.intp]
+type IDs = NDArray[np.uint64]
+
+SECONDS_PER_HOUR: int = 3600
+
+
+def split_ids(ids: Iterable[UUID]) -> tuple[IDs, IDs]:
+    """
+    UUID не помещается в числовой тип NumPy, поэтому хранится старшей и младшей половинами; их лексикографический
+    порядок совпадает с порядком UUID в Python и PostgreSQL.
+    """
+    numbers = [id_.int for id_ in ids]
+    return (
+        np.fromiter((number >> 64 for number in numbers), np.uint64, len(numbers)),
+        np.fromiter(
+            (number & 0xFFFF_FFFF_FFFF_FFFF for number in numbers),
+            np.uint64,
+            len(numbers),
+        ),
+    )
+
+
+def score(
+    like_counts: Floats,
+    ages: Floats,
+    affinities: Floats,
+    gravity: float,
+    affinity_weight: float,
+) -> Floats:
+    """
+    Популярность делится на возраст в часах в степени gravity (как в Hacker News), поэтому старые публикации
+    уступают новым даже при большем количестве отметок. Близость автора увеличивает оценку логарифмически.
+    :param ages: Возраст публикаций, с.
+    :param affinities: Количество отмеченных читателем публикаций каждого автора.
+    """
+    return (
+        (like_counts + 1)
+        * (1 + affinity_weight * np.log1p(affinities))
+        / (np.maximum(ages, 0) / SECONDS_PER_HOUR + 2) ** gravity
+    )
+
+
+def rank(
+    like_counts: Floats,
+    ages: Floats,
+    affinities: Floats,
+    ids: tuple[IDs, IDs],
+    k: int,
+    batch_size: int,
+    gravity: float,
+    affinity_weight: float,
+    after: tuple[float, UUID] | None = None,
+) -> tuple[Indices, Floats]:
+    """
+    Кандидаты оцениваются партиями: промежуточные массивы ограничены размером партии, а между партиями переносятся
+    только лучшие k.
+    :param ids: ID кандидатов (см. split_ids) — второй ключ упорядочивания при равных оценках.
+    :param after: Оценка и ID, после которых (в порядке убывания) начинается выборка.
+    :return: Индексы лучших k кандидатов по убыванию (оценка, ID) и их оценки.
+    """
+    best, best_scores = np.empty(0, np.intp), np.empty(0, np.float64)
+    for start in range(0, len(like_counts), batch_size):
+        batch = slice(start, start + batch_size)
+        scores = score(
+            like_counts[batch], ages[batch], affinities[batch], gravity, affinity_weight
+        )
+        indices = np.arange(start, start + len(scores))
+        if after is not None:
+            is_after = _is_after(scores, ids[0][batch], ids[1][batch], *after)
+            indices, scores = indices[is_after], scores[is_after]
+
+        indices = np.concatenate((best, indices))
+        scores = np.concatenate((best_scores, scores))
+        chosen = _top(scores, ids[0][indices], ids[1][indices], k)
+        best, best_scores = indices[chosen], scores[chosen]
+
+    return best, best_scores
+
+
+def locate(scores: Floats, ids: tuple[IDs, IDs], after: tuple[float, UUID]) -> int:
+    """
+    :param scores: Оценки, упорядоченные по убыванию (оценка, ID), как их возвращает rank.
+    :return: Индекс первого кандидата после after (len(scores), если таких нет).
+    """
+    is_after = _is_after(scores, *ids, *after)
+    return int(np.argmax(is_after)) if is_after.any() else len(scores)
+
+
+def to_bytes(scores: Floats, ids: tuple[IDs, IDs]) -> bytes:
+    """
+    Упорядоченные кандидаты хранятся в кэше массивами оценок и половин ID подряд (см. from_bytes).
+    """
+    return scores.tobytes() + ids[0].tobytes() + ids[1].tobytes()
+
+
+def from_bytes(data: bytes) -> tuple[Floats, tuple[IDs, IDs]]:
+    size = len(data) // 24
+    return np.frombuffer(data, np.float64, size), (
+        np.frombuffer(data, np.uint64, size, 8 * size),
+        np.frombuffer(data, np.uint64, size, 16 * size),
+    )
+
+
+def join_id(high: np.uint64, low: np.uint64) -> UUID:
+    return UUID(int=int(high) << 64 | int(low))
+
+
+def _is_after(
+    scores: Floats, ids_high: IDs, ids_low: IDs, after_score: float, after_id: UUID
+) -> NDArray[np.bool_]:
+    high, low = after_id.int >> 64, after_id.int & 0xFFFF_FFFF_FFFF_FFFF
+    return (scores < after_score) | (
+        (scores == after_score)
+        & ((ids_high < high) | ((ids_high == high) & (ids_low < low)))
+    )
+
+
+def _top(scores: Floats, ids_high: IDs, ids_low: IDs, k: int) -> Indices:
+    """
+    Частичная сортировка отбирает оценки не ниже k-й за линейное время, полностью сортируются только они.
+    """
+    if len(scores) > k:
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+
+    order = np.lexsort((ids_low[candidates], ids_high[candidates], scores[candidates]))[
+        ::-1
+    ]
+    return candidates[order[:k]]
@@ -1,24 +1,46 @@
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    ARRAY,
+    RowMapping,
+    Text,
+    Uuid,
+    cast,
+    exists,
+    func,
+    literal,
+    literal_column,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.orm import aliased, selectinload
 
-from src.repositories import SQLAlchemyRepository
+from src.repositories import AsyncpgRepository, SQLAlchemyRepository
 from src.schemas import dto_from_obj, obj_from_dto
+from src.timelines.models import sqlalchemy_timelines
 from src.tweets.models import SQLAlchemyTweet, sqlalchemy_likes
 from src.tweets.schemas import (
+    Affinities,
+    PydanticAffinities,
+    PydanticTweetCandidates,
     PydanticTweetDetailed,
     PydanticTweetID,
     PydanticTweetPersonal,
+    PydanticTweetsCompact,
     PydanticTweetsDetailed,
+    TweetCandidates,
     TweetDetailed,
     TweetID,
+    TweetsCompact,
     TweetsDetailed,
 )
 from src.users.models import SQLAlchemyUser, sqlalchemy_follows
+from src.users.schemas import PydanticUsersNotDetailed, UsersNotDetailed
 
 
 class TweetRepository(ABC):
@@ -27,9 +49,54 @@ class TweetRepository(ABC):
     async def get_by_id(self, id_: UUID) -> Any:
         pass
 
+    @abstractmethod
+    async def get_author_id(self, id_: UUID) -> UUID:
+        pass
+
+    @abstractmethod
+    async def get_author_ids(self, ids: Collection[UUID]) -> dict[UUID, UUID]:
+        pass
+
     @dto_from_obj(TweetsDetailed)
     @abstractmethod
-    async def get_all(self, user_id: UUID) -> Sequence[Any]:
+    async def get_by_ids(self, ids: Sequence[UUID]) -> Sequence[Any]:
+        pass
+
+    @abstractmethod
+    async def get_serialized_by_ids(self, ids: Sequence[UUID]) -> bytes:
+        pass
+
+    @dto_from_obj(TweetsCompact)
+    @abstractmethod
+    async def get_compact_by_ids(
+        self, ids: Sequence[UUID], user_id: UUID, preview_size: int
+    ) -> Sequence[Any]:
+        pass
+
+    @dto_from_obj(UsersNotDetailed)
+    @abstractmethod
+    async def get_likes(
+        self, tweet_id: UUID, limit: int, after_user_id: UUID | None = None
+    ) -> Sequence[Any]:
+        pass
+
+    @dto_from_obj(TweetCandidates)
+    @abstractmethod
+    async def get_timeline_candidates(self, user_id: UUID, limit: int) -> Sequence[Any]:
+        pass
+
+    @dto_from_obj(TweetCandidates)
+    @abstractmethod
+    async def get_pulled_candidates(
+        self, user_id: UUID, min_followers: int, limit: int
+    ) -> Sequence[Any]:
+        pass
+
+    @dto_from_obj(Affinities)
+    @abstractmethod
+    async def get_affinities(
+        self, user_id: UUID, author_ids: Collection[UUID]
+    ) -> dict[UUID, int]:
         pass
 
     @dto_from_obj(TweetID)
@@ -45,10 +112,20 @@ class TweetRepository(ABC):
     async def create_like(self, tweet_id: UUID, user_id: UUID) -> None:
         pass
 
+    @abstractmethod
+    async def create_likes(self, tweet_ids: Collection[UUID], user_id: UUID) -> None:
+        pass
+
     @abstractmethod
     async def delete_like(self, tweet_id: UUID, user_id: UUID) -> None:
         pass
 
+    @abstractmethod
+    async def reconcile_like_counts(
+        self, after_id: UUID | None, limit: int
+    ) -> tuple[UUID | None, int]:
+        pass
+
 
 class SQLAlchemyTweetRepository(SQLAlchemyRepository, TweetRepository):
     @dto_from_obj(PydanticTweetDetailed)
@@ -57,30 +134,304 @@ class SQLAlchemyTweetRepository(SQLAlchemyRepository, TweetRepository):
             id_, SQLAlchemyTweet, (SQLAlchemyTweet.author, SQLAlchemyTweet.likes)
         )
 
-    @dto_from_obj(PydanticTweetsDetailed)
-    async def get_all(self, user_id: UUID) -> Sequence[SQLAlchemyTweet]:
-        return (
+    async def get_author_id(self, id_: UUID) -> UUID:
+        return (await self._get_by_id(id_, SQLAlchemyTweet, ())).author_id
+
+    async def get_author_ids(self, ids: Collection[UUID]) -> dict[UUID, UUID]:
+        """
+        :return: ID авторов по ID публикаций; отсутствующие публикации пропускаются.
+        """
+        return dict(
             (
                 await self._session.execute(
+                    select(SQLAlchemyTweet.id, SQLAlchemyTweet.author_id).where(
+                        SQLAlchemyTweet.id.in_(ids)
+                    )
+                )
+            )
+            .tuples()
+            .all()
+        )
+
+    @dto_from_obj(PydanticTweetsDetailed)
+    async def get_by_ids(self, ids: Sequence[UUID]) -> list[SQLAlchemyTweet]:
+        """
+        Публикации возвращаются в порядке переданных ID; отсутствующие (например, удалённые после ранжирования)
+        пропускаются.
+        """
+        tweets = {
+            tweet.id: tweet
+            for tweet in (
+                await self._read_session.execute(
                     select(SQLAlchemyTweet)
-                    .outerjoin(sqlalchemy_likes)
+                    .where(SQLAlchemyTweet.id.in_(ids))
+                    .options(
+                        selectinload(SQLAlchemyTweet.likes),
+                        selectinload(SQLAlchemyTweet.author),
+                    )
+                )
+            ).scalars()
+        }
+
+        return [tweets[id_] for id_ in ids if id_ in tweets]
+
+    async def get_serialized_by_ids(self, ids: Sequence[UUID]) -> bytes:
+        """
+        Массив публикаций (как у get_by_ids) собирается в JSON одним запросом на сервере БД и возвращается как есть,
+        без объектов ORM и валидации. Ключи соответствуют псевдонимам PydanticTweetDetailed.
+        """
+        positions = (
+            func.unnest(cast(ids, ARRAY(Uuid)))
+            .table_valued("id", with_ordinality="position")
+            .render_derived()
+        )
+        liker = aliased(SQLAlchemyUser)
+        likes = (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        func.json_build_object("id", liker.id, "name", liker.name)
+                    ),
+                    literal_column("'[]'::json"),
+                )
+            )
+            .select_from(sqlalchemy_likes)
+            .join(liker, liker.id == sqlalchemy_likes.c.user_id)
+            .where(sqlalchemy_likes.c.tweet_id == SQLAlchemyTweet.id)
+            .scalar_subquery()
+        )
+        tweet = func.json_build_object(
+            "id",
+            SQLAlchemyTweet.id,
+            "text",
+            SQLAlchemyTweet.text,
+            "medias",
+            SQLAlchemyTweet.medias,
+            "author",
+            func.json_build_object(
+                "id", SQLAlchemyUser.id, "name", SQLAlchemyUser.name
+            ),
+            "likes",
+            likes,
+            "likeCount",
+            SQLAlchemyTweet.like_count,
+        )
+
+        return (
+            (
+                await self._read_session.execute(
+                    select(
+                        cast(
+                            func.coalesce(
+                                func.json_agg(
+                                    aggregate_order_by(tweet, positions.c.position)
+                                ),
+                                literal_column("'[]'::json"),
+                            ),
+                            Text,
+                        )
+                    )
+                    .select_from(positions)
+                    .join(SQLAlchemyTweet, SQLAlchemyTweet.id == positions.c.id)
                     .join(
-                        SQLAlchemyUser, SQLAlchemyTweet.author_id == SQLAlchemyUser.id
+                        SQLAlchemyUser, SQLAlchemyUser.id == SQLAlchemyTweet.author_id
+                    )
+                )
+            )
+            .scalar_one()
+            .encode()
+        )
+
+    @dto_from_obj(PydanticTweetsCompact)
+    async def get_compact_by_ids(
+        self, ids: Sequence[UUID], user_id: UUID, preview_size: int
+    ) -> list[dict[str, Any]]:
+        """
+        Первые отметившие берутся по первичному ключу отметок не более чем preview_size на публикацию, поэтому
+        стоимость запроса не зависит от популярности публикаций. Порядок — как у get_by_ids.
+        """
+        tweets = (
+            (
+                await self._read_session.execute(
+                    select(
+                        SQLAlchemyTweet.id,
+                        SQLAlchemyTweet.text,
+                        SQLAlchemyTweet.medias,
+                        SQLAlchemyTweet.like_count,
+                        SQLAlchemyUser.id.label("author_id"),
+                        SQLAlchemyUser.name.label("author_name"),
+                        exists()
+                        .where(
+                            sqlalchemy_likes.c.tweet_id == SQLAlchemyTweet.id,
+                            sqlalchemy_likes.c.user_id == user_id,
+                        )
+                        .label("is_liked"),
                     )
                     .join(
-                        sqlalchemy_follows,
-                        sqlalchemy_follows.c.followed_id == SQLAlchemyTweet.author_id,
+                        SQLAlchemyUser, SQLAlchemyUser.id == SQLAlchemyTweet.author_id
                     )
-                    .where(sqlalchemy_follows.c.follower_id == user_id)
-                    .group_by(SQLAlchemyTweet.id)
-                    .order_by(func.count(sqlalchemy_likes.c.user_id).desc())
-                    .options(
-                        selectinload(SQLAlchemyTweet.likes),
-                        selectinload(SQLAlchemyTweet.author),
+                    .where(SQLAlchemyTweet.id.in_(ids))
+                )
+            )
+            .mappings()
+            .all()
+        )
+
+        preview = (
+            select(sqlalchemy_likes.c.user_id)
+            .where(sqlalchemy_likes.c.tweet_id == SQLAlchemyTweet.id)
+            .order_by(sqlalchemy_likes.c.user_id)
+            .limit(preview_size)
+            .lateral()
+        )
+        likes: dict[UUID, list[dict[str, Any]]] = {}
+        for like in (
+            await self._read_session.execute(
+                select(SQLAlchemyTweet.id, SQLAlchemyUser.id, SQLAlchemyUser.name)
+                .select_from(SQLAlchemyTweet)
+                .join(preview, true())
+                .join(SQLAlchemyUser, SQLAlchemyUser.id == preview.c.user_id)
+                .where(SQLAlchemyTweet.id.in_([tweet["id"] for tweet in tweets]))
+                .order_by(SQLAlchemyUser.id)
+            )
+        ).tuples():
+            likes.setdefault(like[0], []).append({"id": like[1], "name": like[2]})
+
+        by_id = {
+            tweet["id"]: {
+                "id": tweet["id"],
+                "text": tweet["text"],
+                "medias": tweet["medias"],
+                "like_count": tweet["like_count"],
+                "is_liked": tweet["is_liked"],
+                "author": {"id": tweet["author_id"], "name": tweet["author_name"]},
+                "likes_preview": likes.get(tweet["id"], []),
+            }
+            for tweet in tweets
+        }
+        return [by_id[id_] for id_ in ids if id_ in by_id]
+
+    @dto_from_obj(PydanticUsersNotDetailed)
+    async def get_likes(
+        self, tweet_id: UUID, limit: int, after_user_id: UUID | None = None
+    ) -> Sequence[RowMapping]:
+        """
+        Отметившие упорядочены по ID, поэтому следующая страница начинается после последнего из них.
+        """
+        await self._get_by_id(tweet_id, SQLAlchemyTweet, (), is_read_only=True)
+
+        query = (
+            select(SQLAlchemyUser.id, SQLAlchemyUser.name)
+            .join(sqlalchemy_likes, sqlalchemy_likes.c.user_id == SQLAlchemyUser.id)
+            .where(sqlalchemy_likes.c.tweet_id == tweet_id)
+            .order_by(sqlalchemy_likes.c.user_id)
+            .limit(limit)
+        )
+        if after_user_id is not None:
+            query = query.where(sqlalchemy_likes.c.user_id > after_user_id)
+
+        return (await self._read_session.execute(query)).mappings().all()
+
+    @dto_from_obj(PydanticTweetCandidates)
+    async def get_timeline_candidates(
+        self, user_id: UUID, limit: int
+    ) -> Sequence[RowMapping]:
+        """
+        Кандидаты упорядочены от новых к старым.
+        """
+        return (
+            (
+                await self._read_session.execute(
+                    select(*self._candidate_columns(SQLAlchemyTweet.__table__.c))
+                    .join(
+                        sqlalchemy_timelines,
+                        sqlalchemy_timelines.c.tweet_id == SQLAlchemyTweet.id,
+                    )
+                    .where(sqlalchemy_timelines.c.user_id == user_id)
+                    .order_by(
+                        SQLAlchemyTweet.created_at.desc(), SQLAlchemyTweet.id.desc()
                     )
+                    .limit(limit)
                 )
             )
-            .scalars()
+            .mappings()
+            .all()
+        )
+
+    @dto_from_obj(PydanticTweetCandidates)
+    async def get_pulled_candidates(
+        self, user_id: UUID, min_followers: int, limit: int
+    ) -> Sequence[RowMapping]:
+        """
+        Кандидатами служат последние limit публикаций всех отслеживаемых авторов с числом отслеживающих не меньше
+        min_followers вместе: у каждого автора читаются только его последние limit публикаций (по индексу), а из их
+        объединения отбираются самые новые. Они сгруппированы по авторам и внутри группы упорядочены от новых к старым.
+        """
+        authors = (
+            select(sqlalchemy_follows.c.followed_id.label("id"))
+            .join(SQLAlchemyUser, SQLAlchemyUser.id == sqlalchemy_follows.c.followed_id)
+            .where(
+                sqlalchemy_follows.c.follower_id == user_id,
+                SQLAlchemyUser.followers_count >= min_followers,
+            )
+            .subquery()
+        )
+        recent = (
+            select(*self._candidate_columns(SQLAlchemyTweet.__table__.c))
+            .where(SQLAlchemyTweet.author_id == authors.c.id)
+            .order_by(SQLAlchemyTweet.created_at.desc(), SQLAlchemyTweet.id.desc())
+            .limit(limit)
+            .lateral()
+        )
+
+        latest = (
+            select(*self._candidate_columns(recent.c))
+            .join_from(authors, recent, true())
+            .order_by(recent.c.created_at.desc(), recent.c.id.desc())
+            .limit(limit)
+            .subquery()
+        )
+
+        return (
+            (
+                await self._read_session.execute(
+                    select(*self._candidate_columns(latest.c)).order_by(
+                        latest.c.author_id,
+                        latest.c.created_at.desc(),
+                        latest.c.id.desc(),
+                    )
+                )
+            )
+            .mappings()
+            .all()
+        )
+
+    @dto_from_obj(PydanticAffinities)
+    async def get_affinities(
+        self, user_id: UUID, author_ids: Collection[UUID]
+    ) -> dict[UUID, int]:
+        """
+        Близость автора к пользователю — количество отмеченных пользователем публикаций автора.
+        """
+        if not author_ids:
+            return {}
+
+        return dict(
+            (
+                await self._read_session.execute(
+                    select(SQLAlchemyTweet.author_id, func.count())
+                    .join(
+                        sqlalchemy_likes,
+                        sqlalchemy_likes.c.tweet_id == SQLAlchemyTweet.id,
+                    )
+                    .where(
+                        sqlalchemy_likes.c.user_id == user_id,
+                        SQLAlchemyTweet.author_id.in_(author_ids),
+                    )
+                    .group_by(SQLAlchemyTweet.author_id)
+                )
+            )
+            .tuples()
             .all()
         )
 
@@ -90,45 +441,178 @@ class SQLAlchemyTweetRepository(SQLAlchemyRepository, TweetRepository):
         return await self._create(tweet)
 
     async def delete(self, tweet_id: UUID) -> None:
-        await self._delete_by_id(
-            tweet_id,
-            SQLAlchemyTweet,
-            (
-                SQLAlchemyTweet.author,
-                SQLAlchemyTweet.likes,
-            ),
-        )
+        """
+        Отметки «нравится» удаляются каскадно на стороне БД, поэтому публикация не загружается.
+        """
+        await self._delete_many(SQLAlchemyTweet, (tweet_id,))
 
     async def create_like(self, tweet_id: UUID, user_id: UUID) -> None:
-        tweet = await self._get_by_id(
-            tweet_id,
-            SQLAlchemyTweet,
+        if await self._create_relation(
+            sqlalchemy_likes, tweet_id=tweet_id, user_id=user_id
+        ):
+            await self._add_like_count((tweet_id,), 1)
+
+    async def create_likes(self, tweet_ids: Collection[UUID], user_id: UUID) -> None:
+        """
+        Отметки создаются одним запросом, отсутствующие публикации и уже существующие отметки пропускаются.
+        """
+        created = (
             (
-                SQLAlchemyTweet.author,
-                SQLAlchemyTweet.likes,
-            ),
+                await self._session.execute(
+                    insert(sqlalchemy_likes)
+                    .from_select(
+                        ["tweet_id", "user_id"],
+                        select(SQLAlchemyTweet.id, literal(user_id)).where(
+                            SQLAlchemyTweet.id.in_(tweet_ids)
+                        ),
+                    )
+                    .on_conflict_do_nothing()
+                    .returning(sqlalchemy_likes.c.tweet_id)
+                )
+            )
+            .scalars()
+            .all()
         )
+        if created:
+            await self._add_like_count(created, 1)
+
+    async def delete_like(self, tweet_id: UUID, user_id: UUID) -> None:
+        """
+        Отсутствие публикации проверяется, только если отметки не было.
+        """
+        if await self._delete_relation(
+            sqlalchemy_likes, tweet_id=tweet_id, user_id=user_id
+        ):
+            await self._add_like_count((tweet_id,), -1)
+            return
 
-        await self._append_related_by_id(
-            tweet.likes,
-            user_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+        await self._get_by_id(tweet_id, SQLAlchemyTweet, ())
+
+    async def reconcile_like_counts(
+        self, after_id: UUID | None, limit: int
+    ) -> tuple[UUID | None, int]:
+        """
+        Публикации перебираются по возрастанию ID, поэтому следующая партия начинается после последнего
+        возвращённого ID (None — партий больше нет).
+        """
+        query = select(SQLAlchemyTweet.id).order_by(SQLAlchemyTweet.id).limit(limit)
+        if after_id is not None:
+            query = query.where(SQLAlchemyTweet.id > after_id)
+
+        ids = (await self._session.execute(query)).scalars().all()
+        if not ids:
+            return None, 0
+
+        actual = (
+            select(func.count())
+            .where(sqlalchemy_likes.c.tweet_id == SQLAlchemyTweet.id)
+            .scalar_subquery()
+        )
+        fixed = await self._session.execute(
+            update(SQLAlchemyTweet)
+            .where(SQLAlchemyTweet.id.in_(ids), SQLAlchemyTweet.like_count != actual)
+            .values(like_count=actual)
+            .execution_options(synchronize_session=False)
         )
 
-    async def delete_like(self, tweet_id: UUID, user_id: UUID) -> None:
-        tweet = await self._get_by_id(
-            tweet_id,
-            SQLAlchemyTweet,
-            (
-                SQLAlchemyTweet.author,
-                SQLAlchemyTweet.likes,
-            ),
+        return ids[-1], fixed.rowcount
+
+    @staticmethod
+    def _candidate_columns(columns: Any) -> tuple[Any, ...]:
+        return columns.id, columns.author_id, columns.like_count, columns.created_at
+
+    async def _add_like_count(self, tweet_ids: Collection[UUID], delta: int) -> None:
+        """
+        Значение изменяется на сервере одним запросом: одновременные отметки не теряются.
+        """
+        await self._session.execute(
+            update(SQLAlchemyTweet)
+            .where(SQLAlchemyTweet.id.in_(tweet_ids))
+            .values(like_count=SQLAlchemyTweet.like_count + delta)
         )
 
-        await self._remove_related_by_id(
-            tweet.likes,
-            user_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+
+class AsyncpgTweetRepository(AsyncpgRepository, SQLAlchemyTweetRepository):
+    """
+    Страница ленты загружается двумя запросами вместо трёх, изменения выполняются через SQLAlchemy.
+    """
+
+    async def get_serialized_by_ids(self, ids: Sequence[UUID]) -> bytes:
+        connection = await self._get_connection(self._read_session)
+
+        return (
+            await connection.fetchval(
+                """
+                SELECT coalesce(
+                    json_agg(
+                        json_build_object(
+                            'id', tweets.id,
+                            'text', tweets.text,
+                            'medias', tweets.medias,
+                            'author', json_build_object('id', users.id, 'name', users.name),
+                            'likes', (
+                                SELECT coalesce(
+                                    json_agg(json_build_object('id', likers.id, 'name', likers.name)),
+                                    '[]'::json
+                                )
+                                FROM likes
+                                JOIN users AS likers ON likers.id = likes.user_id
+                                WHERE likes.tweet_id = tweets.id
+                            ),
+                            'likeCount', tweets.like_count
+                        )
+                        ORDER BY ids.position
+                    ),
+                    '[]'::json
+                )::text
+                FROM unnest($1::uuid[]) WITH ORDINALITY AS ids (id, position)
+                JOIN tweets ON tweets.id = ids.id
+                JOIN users ON users.id = tweets.author_id
+                """,
+                ids,
+            )
+        ).encode()
+
+    @dto_from_obj(PydanticTweetsDetailed)
+    async def get_by_ids(self, ids: Sequence[UUID]) -> list[dict[str, Any]]:
+        connection = await self._get_connection(self._read_session)
+
+        tweets = await connection.fetch(
+            """
+            SELECT
+                tweets.id, tweets.text, tweets.medias, tweets.like_count,
+                users.id AS author_id, users.name AS author_name
+            FROM unnest($1::uuid[]) WITH ORDINALITY AS ids (id, position)
+            JOIN tweets ON tweets.id = ids.id
+            JOIN users ON users.id = tweets.author_id
+            ORDER BY ids.position
+            """,
+            ids,
         )
+        likes = await connection.fetch(
+            """
+            SELECT likes.tweet_id, users.id, users.name
+            FROM likes
+            JOIN users ON users.id = likes.user_id
+            WHERE likes.tweet_id = ANY($1::uuid[])
+            """,
+            [tweet["id"] for tweet in tweets],
+        )
+
+        likes_by_tweet: dict[UUID, list[dict[str, Any]]] = {}
+        for like in likes:
+            likes_by_tweet.setdefault(like["tweet_id"], []).append(
+                {"id": like["id"], "name": like["name"]}
+            )
+
+        return [
+            {
+                "id": tweet["id"],
+                "text": tweet["text"],
+                "medias": tweet["medias"],
+                "like_count": tweet["like_count"],
+                "author": {"id": tweet["author_id"], "name": tweet["author_name"]},
+                "likes": likes_by_tweet.get(tweet["id"], []),
+            }
+            for tweet in tweets
+        ]
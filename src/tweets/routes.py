@@ -1,12 +1,19 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
+from fastapi.responses import StreamingResponse
 
-from src.schemas import ID, PydanticError
+from src.dependencies import IfNoneMatch, is_etag_matched, to_etag
+from src.schemas import ID, Limit, PydanticBatchResult, PydanticError, PydanticIDs
 from src.tweets.dependencies import Service
 from src.tweets.schemas import (
+    Cursor,
+    IsCompact,
+    LikesPageCursor,
+    PydanticLikesPage,
     PydanticTweetID,
     PydanticTweetNotDetailed,
     PydanticTweetPersonal,
-    PydanticTweetsDetailed,
+    PydanticTweetsCompactPage,
+    PydanticTweetsPage,
 )
 from src.users.dependencies import CurrentUser
 
@@ -15,9 +22,11 @@ router: APIRouter = APIRouter(prefix="/tweets", tags=["Публикации"])
 
 @router.get(
     "",
-    summary="Получение всех публикаций.",
-    response_description="Публикации получены.",
+    response_model=PydanticTweetsPage | PydanticTweetsCompactPage,
+    summary="Получение страницы публикаций.",
+    response_description="Страница публикаций получена.",
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Страница не изменилась."},
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Не передан ключ API.",
             "model": PydanticError,
@@ -28,11 +37,90 @@ router: APIRouter = APIRouter(prefix="/tweets", tags=["Публикации"])
         },
     },
 )
-async def get_list(service: Service, user: CurrentUser) -> PydanticTweetsDetailed:
+async def get_list(
+    service: Service,
+    user: CurrentUser,
+    limit: Limit = 20,
+    cursor: Cursor = None,
+    is_compact: IsCompact = False,
+    if_none_match: IfNoneMatch = None,
+) -> Response:
     """
-    Получение полного списка публикаций (твитов) в порядке популярности от отслеживаемых пользователей.
+    Получение страницы списка публикаций (твитов) в порядке популярности с учётом давности от отслеживаемых
+    пользователей. Следующая страница запрашивается с курсором из ответа; публикации, изменившие популярность между
+    запросами, могут быть пропущены или повторены. В кратком виде вместо полных списков отметивших публикации
+    выдаются лишь первые из них. Страница может быть взята из кэша; если она не изменилась с полученной клиентом
+    версии, возвращается только статус.
     """
-    return await service.get_list(user.id)
+    etag = to_etag(await service.get_list_version(user.id), limit, cursor, is_compact)
+    if is_etag_matched(etag, if_none_match):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+
+    return Response(
+        await service.get_serialized_list(user.id, limit, cursor, is_compact),
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    summary="Подключение к потоку новых публикаций.",
+    response_description="Поток событий открыт.",
+    responses={
+        status.HTTP_200_OK: {"content": {"text/event-stream": {}}},
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+    },
+)
+async def get_events(service: Service, user: CurrentUser) -> StreamingResponse:
+    """
+    Поток событий (Server-Sent Events) «tweet» с ID новых публикаций отслеживаемых пользователей: вместо повторных
+    запросов ленты клиент загружает только их.
+    """
+    return StreamingResponse(
+        await service.stream_events(user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get(
+    "/{id}/likes",
+    summary="Получение страницы отметивших публикацию.",
+    response_description="Страница отметивших получена.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Публикация не найдена.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def get_likes(
+    id_: ID,
+    service: Service,
+    user: CurrentUser,
+    limit: Limit = 20,
+    cursor: LikesPageCursor = None,
+) -> PydanticLikesPage:
+    """
+    Получение страницы пользователей, отметивших публикацию (твит) «нравится», в порядке их ID. Следующая страница
+    запрашивается с курсором из ответа.
+    """
+    return await service.get_likes(id_, limit, cursor)
 
 
 @router.post(
@@ -94,6 +182,32 @@ async def remove(id_: ID, service: Service, user: CurrentUser) -> None:
     await service.remove(id_, user.id)
 
 
+@router.post(
+    "/likes:batch",
+    summary="Отметка нескольких публикаций «нравится».",
+    response_description="Отметки обработаны, результат каждой — в ответе.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def like_many(
+    ids: PydanticIDs, service: Service, user: CurrentUser
+) -> PydanticBatchResult:
+    """
+    Добавление нескольких публикаций (твитов) в список понравившихся текущего пользователя одним запросом к БД.
+    Отсутствующие и собственные публикации не прерывают обработку остальных: для них в ответе указывается ошибка,
+    как при отметке по одной.
+    """
+    return await service.like_many(ids.ids, user.id)
+
+
 @router.post(
     "/{id}/likes",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -1,9 +1,11 @@
+from datetime import datetime
 from typing import Annotated, Any
 from uuid import UUID
 
-from pydantic import Field
+from fastapi import Query
+from pydantic import AfterValidator, Field, NonNegativeInt
 
-from src.schemas import PydanticRootSchema, PydanticSchema, Schema
+from src.schemas import PydanticRootSchema, PydanticSchema, Schema, from_cursor
 from src.settings import EXAMPLES
 from src.users.schemas import PydanticUserNotDetailed
 
@@ -59,11 +61,51 @@ class PydanticTweetPersonal(PydanticTweetNotDetailed, TweetPersonal):
 class TweetDetailed(TweetID, TweetNotDetailed):
     author: Any
     likes: Any
+    like_count: Any
 
 
 class PydanticTweetDetailed(PydanticTweetID, PydanticTweetNotDetailed, TweetDetailed):
     author: PydanticUserNotDetailed
     likes: list[PydanticUserNotDetailed]
+    like_count: Annotated[
+        NonNegativeInt,
+        Field(description="Количество отметок «нравится»", examples=[1]),
+    ]
+
+
+class TweetCompact(TweetID, TweetNotDetailed):
+    author: Any
+    like_count: Any
+    is_liked: Any
+    likes_preview: Any
+
+
+class PydanticTweetCompact(PydanticTweetID, PydanticTweetNotDetailed, TweetCompact):
+    """
+    Вместо полного списка отметивших — лишь несколько первых из них (см. GET /tweets/{id}/likes), поэтому размер
+    публикации не зависит от её популярности.
+    """
+
+    author: PydanticUserNotDetailed
+    like_count: Annotated[
+        NonNegativeInt,
+        Field(description="Количество отметок «нравится»", examples=[1]),
+    ]
+    is_liked: Annotated[
+        bool, Field(description="Отмечена ли публикация текущим пользователем")
+    ]
+    likes_preview: Annotated[
+        list[PydanticUserNotDetailed],
+        Field(description="Первые отметившие публикацию пользователи"),
+    ]
+
+
+class TweetsCompact(Schema):
+    root: Any
+
+
+class PydanticTweetsCompact(PydanticRootSchema, TweetsCompact):
+    root: list[PydanticTweetCompact]
 
 
 class TweetsDetailed(Schema):
@@ -72,3 +114,120 @@ class TweetsDetailed(Schema):
 
 class PydanticTweetsDetailed(PydanticRootSchema, TweetsDetailed):
     root: list[PydanticTweetDetailed]
+
+
+class TweetCandidate(Schema):
+    id: Any
+    author_id: Any
+    like_count: Any
+    created_at: Any
+
+
+class PydanticTweetCandidate(PydanticSchema, TweetCandidate):
+    id: UUID
+    author_id: UUID
+    like_count: NonNegativeInt
+    created_at: datetime
+
+
+class TweetCandidates(Schema):
+    root: Any
+
+
+class PydanticTweetCandidates(PydanticRootSchema, TweetCandidates):
+    root: list[PydanticTweetCandidate]
+
+
+class Affinities(Schema):
+    root: Any
+
+
+class PydanticAffinities(PydanticRootSchema, Affinities):
+    root: dict[UUID, NonNegativeInt]
+
+
+class TweetsCursor(Schema):
+    score: Any
+    id: Any
+    ranked_at: Any
+
+
+class PydanticTweetsCursor(PydanticSchema, TweetsCursor):
+    """
+    Позиция в ленте: публикации упорядочены по убыванию пары (оценка, ID), поэтому следующая страница начинается
+    строго после последней публикации предыдущей. Оценка зависит от возраста публикации, поэтому все страницы
+    ранжируются на момент ranked_at — запроса первой.
+    """
+
+    score: float
+    id: UUID
+    ranked_at: datetime
+
+
+class TweetsPage(Schema):
+    tweets: Any
+    next_cursor: Any
+
+
+class PydanticTweetsPage(PydanticSchema, TweetsPage):
+    tweets: list[PydanticTweetDetailed]
+    next_cursor: Annotated[
+        str | None,
+        Field(
+            description="Курсор следующей страницы (null — страница последняя)",
+            examples=[None],
+        ),
+    ]
+
+
+class PydanticTweetsCompactPage(PydanticTweetsPage):
+    tweets: list[PydanticTweetCompact]
+
+
+class LikesCursor(Schema):
+    user_id: Any
+
+
+class PydanticLikesCursor(PydanticSchema, LikesCursor):
+    """
+    Позиция в списке отметивших: он упорядочен по ID пользователя, как и первичный ключ отметок.
+    """
+
+    user_id: UUID
+
+
+class LikesPage(Schema):
+    likes: Any
+    next_cursor: Any
+
+
+class PydanticLikesPage(PydanticSchema, LikesPage):
+    likes: list[PydanticUserNotDetailed]
+    next_cursor: Annotated[
+        str | None,
+        Field(
+            description="Курсор следующей страницы (null — страница последняя)",
+            examples=[None],
+        ),
+    ]
+
+
+Cursor = Annotated[
+    str | None,
+    AfterValidator(from_cursor(PydanticTweetsCursor)),
+    Query(description="Курсор страницы, полученный вместе с предыдущей"),
+]
+
+LikesPageCursor = Annotated[
+    str | None,
+    AfterValidator(from_cursor(PydanticLikesCursor)),
+    Query(description="Курсор страницы, полученный вместе с предыдущей"),
+]
+
+IsCompact = Annotated[
+    bool,
+    Query(
+        alias="compact",
+        description="Заменить полные списки отметивших публикации их количеством и первыми из них",
+    ),
+]
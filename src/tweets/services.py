@@ -1,42 +1,422 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from datetime import UTC, datetime
+from heapq import merge
+from itertools import groupby, islice
+from operator import attrgetter
 from uuid import UUID
 
-from src.errors import NotFoundError, SelfActionError
+import numpy as np
+
+from src.bus import Bus
+from src.cache import Cache
+from src.errors import NotFoundError, SelfActionError, ServerError
+from src.schemas import PydanticBatchResult, to_cursor
+from src.settings import db_settings, event_settings, ranking_settings
+from src.timelines.repositories import TimelineRepository
+from src.tweets.ranking import (
+    Floats,
+    IDs,
+    from_bytes,
+    join_id,
+    locate,
+    rank,
+    split_ids,
+    to_bytes,
+)
 from src.tweets.repositories import TweetRepository
 from src.tweets.schemas import (
+    PydanticLikesCursor,
+    PydanticLikesPage,
+    PydanticTweetCandidate,
     PydanticTweetID,
     PydanticTweetPersonal,
-    PydanticTweetsDetailed,
+    PydanticTweetsCompactPage,
+    PydanticTweetsCursor,
+    PydanticTweetsPage,
 )
 from src.users.errors import UnauthorizedError
+from src.users.repositories import UserRepository
 
 
 class TweetService:
-    def __init__(self, repository: TweetRepository) -> None:
+    def __init__(
+        self,
+        repository: TweetRepository,
+        timeline_repository: TimelineRepository,
+        user_repository: UserRepository,
+        cache: Cache,
+        bus: Bus,
+    ) -> None:
         self._repository: TweetRepository = repository
+        self._timeline_repository: TimelineRepository = timeline_repository
+        self._user_repository: UserRepository = user_repository
+        self._cache: Cache = cache
+        self._bus: Bus = bus
+
+    async def get_list_version(self, user_id: UUID) -> str:
+        """
+        Версия меняется вместе с инвалидацией закэшированных страниц (см. get_serialized_list) и не требует их
+        ранжирования.
+        """
+        return await self._cache.get_version(self.timeline_key(user_id))
+
+    async def get_serialized_list(
+        self,
+        user_id: UUID,
+        limit: int,
+        after: PydanticTweetsCursor | None = None,
+        is_compact: bool = False,
+    ) -> bytes:
+        """
+        Страница кэшируется сериализованной до изменения ленты: публикации или удаления в ней, отметки «нравится»
+        её публикаций, отслеживания или отписки читателя. Если лента изменилась, пока страница собиралась, страница
+        не кэшируется (см. Cache.set_if_version). Публикации авторов, читаемых при запросе (см. is_pulled),
+        не инвалидируют ленты их отслеживающих, чтобы оставаться O(1), и появляются в них по истечении времени жизни
+        кэша.
+
+        Если задано db_settings.is_db_json, полная страница собирается в JSON сервером БД (см.
+        TweetRepository.get_serialized_by_ids) и не проходит через Pydantic.
+        """
+        key = self.timeline_key(user_id)
+        field = f"{int(is_compact)}:{limit}:{'' if after is None else to_cursor(after)}"
+        page = await self._cache.get(key, field)
+        if page is None:
+            version = await self._cache.get_version(key)
+            if db_settings.is_db_json and not is_compact:
+                ids, next_cursor = await self._rank(user_id, limit, after)
+                page = b"".join(
+                    (
+                        b'{"tweets":',
+                        await self._repository.get_serialized_by_ids(ids),
+                        b',"nextCursor":',
+                        json.dumps(next_cursor).encode(),
+                        b"}",
+                    )
+                )
+            else:
+                page = (
+                    (await self.get_list(user_id, limit, after, is_compact))
+                    .model_dump_json(by_alias=True)
+                    .encode()
+                )
+            await self._cache.set_if_version(key, field, page, version)
+
+        return page
+
+    async def get_list(
+        self,
+        user_id: UUID,
+        limit: int,
+        after: PydanticTweetsCursor | None = None,
+        is_compact: bool = False,
+    ) -> PydanticTweetsPage:
+        """
+        :param is_compact: Загрузить вместо полных списков отметивших публикации лишь первых из них.
+        """
+        ids, next_cursor = await self._rank(user_id, limit, after)
+        if is_compact:
+            return PydanticTweetsCompactPage(
+                tweets=(
+                    await self._repository.get_compact_by_ids(
+                        ids, user_id, db_settings.likes_preview_size
+                    )
+                ).root,
+                next_cursor=next_cursor,
+            )
+
+        return PydanticTweetsPage(
+            tweets=(await self._repository.get_by_ids(ids)).root,
+            next_cursor=next_cursor,
+        )
+
+    async def get_likes(
+        self, tweet_id: UUID, limit: int, after: PydanticLikesCursor | None = None
+    ) -> PydanticLikesPage:
+        """
+        Загружается на одного отметившего больше страницы: так известно, есть ли следующая.
+        """
+        likes = (
+            await self._repository.get_likes(
+                tweet_id, limit + 1, None if after is None else after.user_id
+            )
+        ).root
+        if len(likes) <= limit:
+            return PydanticLikesPage(likes=likes, next_cursor=None)
 
-    async def get_list(self, user_id: UUID) -> PydanticTweetsDetailed:
-        return await self._repository.get_all(user_id)
+        return PydanticLikesPage(
+            likes=likes[:limit],
+            next_cursor=to_cursor(PydanticLikesCursor(user_id=likes[limit - 1].id)),
+        )
 
     async def publish(self, tweet: PydanticTweetPersonal) -> PydanticTweetID:
-        return await self._repository.create(tweet)
+        """
+        Публикация сразу добавляется в ленты отслеживающих автора, поэтому их чтение не собирает ленту заново. Исключение
+        — авторы с большим числом отслеживающих (см. is_pulled): их публикации подмешиваются к лентам при чтении.
+        Подключённые к потоку событий отслеживающие (см. stream_events) получают ID публикации.
+        """
+        tweet_id = await self._repository.create(tweet)
+        author = await self._user_repository.get_counted_by_id(tweet.author_id)
+        if self.is_pulled(author.followers_count):
+            topics = [self.author_topic(tweet.author_id)]
+        else:
+            readers = await self._timeline_repository.push(tweet_id.id, tweet.author_id)
+            await self._invalidate(*readers)
+            topics = list(map(self.reader_topic, readers))
+        await self._bus.publish(topics, json.dumps({"id": str(tweet_id.id)}))
+
+        return tweet_id
+
+    async def stream_events(self, user_id: UUID) -> AsyncIterator[bytes]:
+        """
+        Поток событий (Server-Sent Events) о новых публикациях в ленте пользователя: клиенту достаточно загрузить
+        их, а не запрашивать ленту заново. Публикации авторов, читаемых при запросе (см. is_pulled), доставляются по
+        подписке на самих авторов; она определяется при подключении.
+        """
+        topics = [
+            self.reader_topic(user_id),
+            *map(
+                self.author_topic,
+                await self._user_repository.get_following_ids(
+                    user_id, db_settings.pull_threshold
+                ),
+            ),
+        ]
+        return self._serialize_events(topics)
 
     async def remove(self, id_: UUID, author_id: UUID) -> None:
         try:
-            tweet = await self._repository.get_by_id(id_)
+            tweet_author_id = await self._repository.get_author_id(id_)
         except NotFoundError:
             return
-        self._check_owned(tweet.author.id, author_id)
+        self._check_owned(tweet_author_id, author_id)
 
+        readers = await self._timeline_repository.remove(id_)
         await self._repository.delete(id_)
+        await self._invalidate(*readers)
 
     async def like(self, tweet_id: UUID, user_id: UUID) -> None:
-        tweet = await self._repository.get_by_id(tweet_id)
-        self._check_not_owned(tweet.author.id, user_id)
+        """
+        Отметка меняет оценку публикации во всех лентах с ней и близость автора к читателю (см. get_list).
+        """
+        self._check_not_owned(await self._repository.get_author_id(tweet_id), user_id)
 
         await self._repository.create_like(tweet_id, user_id)
+        await self._invalidate(
+            user_id, *await self._timeline_repository.get_readers(tweet_id)
+        )
+
+    async def like_many(
+        self, tweet_ids: Sequence[UUID], user_id: UUID
+    ) -> PydanticBatchResult:
+        """
+        Все отметки создаются одним запросом. Для каждого ID сообщается ошибка, с которой завершилась бы его
+        отдельная отметка.
+        """
+        author_ids = await self._repository.get_author_ids(tweet_ids)
+        errors: dict[UUID, ServerError] = {}
+        for tweet_id in tweet_ids:
+            if tweet_id not in author_ids:
+                errors[tweet_id] = NotFoundError("Requested tweet not found")
+                continue
+            try:
+                self._check_not_owned(author_ids[tweet_id], user_id)
+            except SelfActionError as exc:
+                errors[tweet_id] = exc
+        allowed = [id_ for id_ in author_ids if id_ not in errors]
+
+        await self._repository.create_likes(allowed, user_id)
+        await self._invalidate(
+            user_id, *await self._timeline_repository.get_readers(*allowed)
+        )
+
+        return PydanticBatchResult.from_errors(tweet_ids, errors)
 
     async def unlike(self, tweet_id: UUID, user_id: UUID) -> None:
         await self._repository.delete_like(tweet_id, user_id)
+        await self._invalidate(
+            user_id, *await self._timeline_repository.get_readers(tweet_id)
+        )
+
+    async def reconcile_like_counts(
+        self, after_id: UUID | None, limit: int
+    ) -> tuple[UUID | None, int]:
+        """
+        Пересчитывает количество отметок «нравится» для очередной партии публикаций.
+        :param after_id: ID, после которого начинается партия (None — с начала).
+        :param limit: Размер партии.
+        :return: ID, после которого начинается следующая партия (None — партий больше нет), и количество
+        исправленных публикаций.
+        """
+        return await self._repository.reconcile_like_counts(after_id, limit)
+
+    @staticmethod
+    def is_pulled(followers_count: int) -> bool:
+        """
+        Рассылка публикации по лентам стоит O(количество отслеживающих), поэтому публикации популярных авторов
+        не рассылаются, а читаются вместе с лентой.
+        """
+        return followers_count >= db_settings.pull_threshold
+
+    @staticmethod
+    def timeline_key(user_id: UUID) -> str:
+        return f"timeline:{user_id}"
+
+    @staticmethod
+    def reader_topic(user_id: UUID) -> str:
+        return f"reader:{user_id}"
+
+    @staticmethod
+    def author_topic(author_id: UUID) -> str:
+        return f"author:{author_id}"
+
+    async def _serialize_events(self, topics: list[str]) -> AsyncIterator[bytes]:
+        """
+        Если событий долго нет, отправляется комментарий: он поддерживает соединение и позволяет обнаружить
+        отключение клиента.
+        """
+        async with self._bus.subscribe(*topics) as queue:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), event_settings.events_heartbeat
+                    )
+                except TimeoutError:
+                    yield b": ping\n\n"
+                else:
+                    yield f"event: tweet\ndata: {message}\n\n".encode()
+
+    async def _invalidate(self, *user_ids: UUID) -> None:
+        await self._cache.delete(*map(self.timeline_key, user_ids))
+
+    async def _rank(
+        self, user_id: UUID, limit: int, after: PydanticTweetsCursor | None = None
+    ) -> tuple[list[UUID], str | None]:
+        """
+        Лента собирается в три этапа: отбор кандидатов, их ранжирование (см. src/tweets/ranking.py) и загрузка
+        одной страницы. Здесь выполняются первые два, загрузка остаётся вызывающему. Порядок всех кандидатов на
+        момент ranked_at кэшируется вместе со страницами ленты (см. _get_ranking), поэтому следующие страницы лишь
+        продолжают его.
+        :return: ID публикаций страницы и курсор следующей (None — страница последняя).
+        """
+        ranked_at = datetime.now(UTC) if after is None else after.ranked_at
+        scores, ids = await self._get_ranking(user_id, ranked_at, after is None)
+
+        start = 0 if after is None else locate(scores, ids, (after.score, after.id))
+        end = min(start + limit, len(scores))
+        page = [join_id(ids[0][i], ids[1][i]) for i in range(start, end)]
+        if end == len(scores):
+            return page, None
+
+        return page, to_cursor(
+            PydanticTweetsCursor(
+                score=scores[end - 1], id=page[-1], ranked_at=ranked_at
+            )
+        )
+
+    async def _get_ranking(
+        self, user_id: UUID, ranked_at: datetime, is_first_page: bool
+    ) -> tuple[Floats, tuple[IDs, IDs]]:
+        """
+        Кандидаты ранжируются целиком при запросе первой страницы, а при запросе следующих — только если их порядок
+        вытеснен из кэша или лента с тех пор изменилась. Порядок хранится до инвалидации ленты или истечения
+        времени жизни её кэша (см. get_serialized_list).
+        :return: Оценки и ID кандидатов (см. split_ids) по убыванию (оценка, ID).
+        """
+        key = self.timeline_key(user_id)
+        field = f"ranking:{ranked_at.isoformat()}"
+        version = await self._cache.get_version(key)
+        if not is_first_page:
+            ranking = await self._cache.get(key, field)
+            if ranking is not None:
+                return from_bytes(ranking)
+
+        candidates = await self._get_candidates(user_id)
+        affinities = (
+            await self._repository.get_affinities(
+                user_id, {candidate.author_id for candidate in candidates}
+            )
+        ).root
+        ids = split_ids(candidate.id for candidate in candidates)
+
+        indices, scores = rank(
+            np.fromiter(
+                (candidate.like_count for candidate in candidates),
+                np.float64,
+                len(candidates),
+            ),
+            np.fromiter(
+                (
+                    (ranked_at - candidate.created_at).total_seconds()
+                    for candidate in candidates
+                ),
+                np.float64,
+                len(candidates),
+            ),
+            np.fromiter(
+                (affinities.get(candidate.author_id, 0) for candidate in candidates),
+                np.float64,
+                len(candidates),
+            ),
+            ids,
+            len(candidates),
+            ranking_settings.batch_size,
+            ranking_settings.gravity,
+            ranking_settings.affinity_weight,
+        )
+        ranked_ids = ids[0][indices], ids[1][indices]
+        await self._cache.set_if_version(
+            key, field, to_bytes(scores, ranked_ids), version
+        )
+
+        return scores, ranked_ids
+
+    async def _get_candidates(self, user_id: UUID) -> list[PydanticTweetCandidate]:
+        """
+        Кандидаты — последние публикации материализованной ленты и авторов, читаемых при запросе (см. is_pulled).
+        Каждый источник уже упорядочен от новых к старым, поэтому слияние не сортирует их заново, а общее количество
+        кандидатов ограничено размером ленты.
+        """
+        timeline = (
+            await self._repository.get_timeline_candidates(
+                user_id, db_settings.timeline_size
+            )
+        ).root
+        pulled = (
+            await self._repository.get_pulled_candidates(
+                user_id, db_settings.pull_threshold, db_settings.timeline_size
+            )
+        ).root
+
+        return list(
+            islice(
+                self._merge(
+                    timeline,
+                    *(
+                        list(group)
+                        for _, group in groupby(pulled, attrgetter("author_id"))
+                    ),
+                ),
+                db_settings.timeline_size,
+            )
+        )
+
+    @staticmethod
+    def _merge(
+        *sources: Iterable[PydanticTweetCandidate],
+    ) -> Iterator[PydanticTweetCandidate]:
+        """
+        Публикация автора, ставшего популярным, может оказаться и в ленте, и среди читаемых при запросе: при слиянии
+        такие копии идут подряд и пропускаются.
+        """
+        last_id = None
+        for tweet in merge(
+            *sources, key=lambda tweet: (tweet.created_at, tweet.id), reverse=True
+        ):
+            if tweet.id != last_id:
+                yield tweet
+            last_id = tweet.id
 
     @staticmethod
     def _check_owned(tweet_author_id: UUID, current_author_id: UUID) -> None:
@@ -2,20 +2,29 @@
 Сюда относятся не только зависимости самой сущности пользователя, но и системы авторизации.
 """
 
-from typing import Annotated
+from collections.abc import AsyncIterator, Callable
+from typing import Annotated, Any
 from uuid import UUID
 
-from fastapi import Depends, Security
-from fastapi.security import APIKeyHeader
+from fastapi import BackgroundTasks, Depends, Security
 
-from src.dependencies import Session
+from src.cache import Cache, DeferredCache
+from src.dependencies import (
+    Client,
+    DB_Manager,
+    Principal_Cache,
+    ReadSession,
+    Response_Cache,
+    Session,
+    key_header,
+)
+from src.settings import db_settings
+from src.timelines.repositories import SQLAlchemyTimelineRepository
 from src.users.errors import UnauthenticatedError
-from src.users.repositories import SQLAlchemyUserRepository
-from src.users.schemas import PydanticUserDetailed
+from src.users.repositories import AsyncpgUserRepository, SQLAlchemyUserRepository
+from src.users.schemas import PydanticUserCounted, PydanticUserNotDetailed
 from src.users.services import UserService
 
-key_header: APIKeyHeader = APIKeyHeader(name="X-API-Key", auto_error=False)
-
 
 async def _get_key(api_key: Annotated[UUID, Security(key_header)]) -> UUID:
     if api_key is None:
@@ -23,17 +32,75 @@ async def _get_key(api_key: Annotated[UUID, Security(key_header)]) -> UUID:
     return api_key
 
 
-def _get_user_service(session: Session) -> UserService:
-    return UserService(SQLAlchemyUserRepository(session))
+def _create_user_service(
+    session: Any, read_session: Any, cache: Cache, principal_cache: Cache
+) -> UserService:
+    repository = (
+        AsyncpgUserRepository
+        if db_settings.is_raw_repositories
+        else SQLAlchemyUserRepository
+    )
+    return UserService(
+        repository(session, read_session),
+        SQLAlchemyTimelineRepository(session),
+        cache,
+        principal_cache,
+    )
+
+
+def _get_user_service(
+    session: Session,
+    read_session: ReadSession,
+    cache: Response_Cache,
+    principal_cache: Principal_Cache,
+    background_tasks: BackgroundTasks,
+) -> UserService:
+    """
+    Фоновые задачи выполняются после фиксации сессии, поэтому через них инвалидируется кэш лент.
+    """
+    return _create_user_service(
+        session,
+        read_session,
+        DeferredCache(cache, background_tasks.add_task),
+        principal_cache,
+    )
 
 
 Service = Annotated[UserService, Depends(_get_user_service)]
 
 
+def _get_user_streamer(
+    db_manager: DB_Manager,
+    client: Client,
+    cache: Response_Cache,
+    principal_cache: Principal_Cache,
+) -> Callable[[PydanticUserCounted], AsyncIterator[bytes]]:
+    """
+    Зависимости закрываются до отправки ответа, поэтому потоковая выдача открывает собственную сессию для чтения на
+    всё её время.
+    """
+
+    async def stream(user: PydanticUserCounted) -> AsyncIterator[bytes]:
+        async with db_manager.get_read_session(client) as read_session:
+            service = _create_user_service(
+                read_session, read_session, cache, principal_cache
+            )
+            async for chunk in service.stream_detailed(user):
+                yield chunk
+
+    return stream
+
+
+Streamer = Annotated[
+    Callable[[PydanticUserCounted], AsyncIterator[bytes]],
+    Depends(_get_user_streamer),
+]
+
+
 async def _authenticate(
     key: Annotated[UUID, Security(_get_key)], service: Service
-) -> PydanticUserDetailed:
+) -> PydanticUserNotDetailed:
     return await service.authenticate(key)
 
 
-CurrentUser = Annotated[PydanticUserDetailed, Security(_authenticate)]
+CurrentUser = Annotated[PydanticUserNotDetailed, Security(_authenticate)]
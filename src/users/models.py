@@ -1,15 +1,30 @@
-from sqlalchemy import Column, ForeignKey, String, Table, Uuid
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, String, Table, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.models import SQLAlchemyIDModel, SQLAlchemyModel
 
 
 class SQLAlchemyUser(SQLAlchemyIDModel):
+    """
+    Количества отслеживающих и отслеживаемых денормализованы: они поддерживаются при создании и удалении
+    отслеживания, чтобы профиль не требовал загрузки всех связанных пользователей. Номер последней заполненной
+    ячейки ленты (см. src/timelines/repositories.py) растёт неограниченно и берётся по модулю её размера. Версия
+    отслеживаний увеличивается при каждом их изменении и служит для условных запросов профиля.
+    """
+
     __readable_name__ = "user"
     __tablename__ = "users"
 
     name: Mapped[str] = mapped_column(String(30), unique=True)
-    key: Mapped[str] = mapped_column(String(64))
+    key: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    followers_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    following_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    timeline_head: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0"
+    )
+    follow_version: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0"
+    )
 
     following: Mapped[list["SQLAlchemyUser"]] = relationship(
         "SQLAlchemyUser",
@@ -35,4 +50,5 @@ sqlalchemy_follows: Table = Table(
         ForeignKey("users.id", onupdate="RESTRICT", ondelete="CASCADE"),
         primary_key=True,
     ),
+    Index("ix_follows_followed_id_follower_id", "followed_id", "follower_id"),
 )
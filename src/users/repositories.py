@@ -1,28 +1,37 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Collection, Sequence
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Column, RowMapping, case, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import selectinload
 
-from src.repositories import SQLAlchemyRepository
+from src.errors import NotFoundError
+from src.repositories import AsyncpgRepository, SQLAlchemyRepository
 from src.schemas import dto_from_obj, obj_from_dto
+from src.settings import db_settings
 from src.users.errors import UnauthenticatedError
-from src.users.models import SQLAlchemyUser
+from src.users.models import SQLAlchemyUser, sqlalchemy_follows
 from src.users.schemas import (
+    PydanticUserCounted,
     PydanticUserDetailed,
     PydanticUserNotDetailed,
     PydanticUserSafe,
+    PydanticUsersCounted,
+    PydanticUsersNotDetailed,
+    UserCounted,
     UserDetailed,
     UserNotDetailed,
+    UsersCounted,
+    UsersNotDetailed,
 )
 
 
 class UserRepository(ABC):
-    @dto_from_obj(UserDetailed)
+    @dto_from_obj(UserNotDetailed)
     @abstractmethod
-    async def get_by_key(self, key: str) -> Any:
+    async def get_principal_by_key(self, key: str) -> Any:
         pass
 
     @dto_from_obj(UserDetailed)
@@ -30,6 +39,52 @@ class UserRepository(ABC):
     async def get_by_id(self, id_: UUID) -> Any:
         pass
 
+    @dto_from_obj(UserCounted)
+    @abstractmethod
+    async def get_counted_by_id(self, id_: UUID) -> Any:
+        pass
+
+    @dto_from_obj(UserCounted)
+    @abstractmethod
+    async def load_counted_by_id(self, id_: UUID) -> Any:
+        pass
+
+    @abstractmethod
+    async def get_follow_version(self, id_: UUID) -> int:
+        pass
+
+    @abstractmethod
+    async def get_followers_count(self, id_: UUID) -> int:
+        pass
+
+    @dto_from_obj(UsersCounted)
+    @abstractmethod
+    async def get_counted_by_ids(self, ids: Collection[UUID]) -> Sequence[Any]:
+        pass
+
+    @abstractmethod
+    async def get_following_ids(
+        self, id_: UUID, min_followers: int = 0
+    ) -> Sequence[UUID]:
+        pass
+
+    @abstractmethod
+    def stream_follows(
+        self, id_: UUID, is_following: bool
+    ) -> AsyncIterator[list[UserNotDetailed]]:
+        pass
+
+    @dto_from_obj(UsersNotDetailed)
+    @abstractmethod
+    async def get_follows(
+        self,
+        id_: UUID,
+        is_following: bool,
+        limit: int,
+        after_user_id: UUID | None = None,
+    ) -> Sequence[Any]:
+        pass
+
     @dto_from_obj(UserNotDetailed)
     @abstractmethod
     async def create(self, user: PydanticUserSafe) -> Any:
@@ -39,33 +94,173 @@ class UserRepository(ABC):
     async def create_follow(self, following_id: UUID, follower_id: UUID) -> None:
         pass
 
+    @abstractmethod
+    async def create_follows(
+        self, following_ids: Collection[UUID], follower_id: UUID
+    ) -> None:
+        pass
+
     @abstractmethod
     async def delete_follow(self, following_id: UUID, follower_id: UUID) -> None:
         pass
 
 
 class SQLAlchemyUserRepository(SQLAlchemyRepository, UserRepository):
-    @dto_from_obj(PydanticUserDetailed)
-    async def get_by_key(self, key: str) -> SQLAlchemyUser:
+    @dto_from_obj(PydanticUserNotDetailed)
+    async def get_principal_by_key(self, key: str) -> RowMapping:
+        """
+        Только то, что нужно для идентификации, без отслеживающих и отслеживаемых.
+        """
         try:
             return (
-                await self._session.execute(
-                    select(SQLAlchemyUser)
-                    .where(SQLAlchemyUser.key == key)
-                    .options(
-                        selectinload(SQLAlchemyUser.following),
-                        selectinload(SQLAlchemyUser.followers),
+                (
+                    await self._read_session.execute(
+                        select(SQLAlchemyUser.id, SQLAlchemyUser.name).where(
+                            SQLAlchemyUser.key == key
+                        )
                     )
                 )
-            ).scalar_one()
+                .mappings()
+                .one()
+            )
         except NoResultFound:
             raise UnauthenticatedError("Invalid credentials.")
 
     @dto_from_obj(PydanticUserDetailed)
     async def get_by_id(self, id_: UUID) -> SQLAlchemyUser:
         return await self._get_by_id(
-            id_, SQLAlchemyUser, (SQLAlchemyUser.following, SQLAlchemyUser.followers)
+            id_,
+            SQLAlchemyUser,
+            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+            is_read_only=True,
+        )
+
+    @dto_from_obj(PydanticUserCounted)
+    async def get_counted_by_id(self, id_: UUID) -> SQLAlchemyUser:
+        return await self._get_by_id(id_, SQLAlchemyUser, (), is_read_only=True)
+
+    @dto_from_obj(PydanticUserCounted)
+    async def load_counted_by_id(self, id_: UUID) -> SQLAlchemyUser:
+        """
+        Конкурентные вызовы объединяются в один запрос (см. SQLAlchemyRepository._load_by_id).
+        """
+        return await self._load_by_id(id_, SQLAlchemyUser, ())
+
+    @dto_from_obj(PydanticUsersCounted)
+    async def get_counted_by_ids(
+        self, ids: Collection[UUID]
+    ) -> Sequence[SQLAlchemyUser]:
+        """
+        Отсутствующие пользователи пропускаются.
+        """
+        return (
+            (
+                await self._session.execute(
+                    select(SQLAlchemyUser).where(SQLAlchemyUser.id.in_(ids))
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    async def get_follow_version(self, id_: UUID) -> int:
+        try:
+            return (
+                await self._read_session.execute(
+                    select(SQLAlchemyUser.follow_version).where(
+                        SQLAlchemyUser.id == id_
+                    )
+                )
+            ).scalar_one()
+        except NoResultFound:
+            raise NotFoundError(
+                f"Requested {SQLAlchemyUser.__readable_name__} not found"
+            )
+
+    async def get_followers_count(self, id_: UUID) -> int:
+        """
+        Читается через основную сессию: значение учитывает изменения текущей транзакции, а реплика может отставать.
+        """
+        try:
+            return (
+                await self._session.execute(
+                    select(SQLAlchemyUser.followers_count).where(
+                        SQLAlchemyUser.id == id_
+                    )
+                )
+            ).scalar_one()
+        except NoResultFound:
+            raise NotFoundError(
+                f"Requested {SQLAlchemyUser.__readable_name__} not found"
+            )
+
+    async def get_following_ids(
+        self, id_: UUID, min_followers: int = 0
+    ) -> Sequence[UUID]:
+        """
+        :param min_followers: Минимальное количество отслеживающих у отслеживаемых пользователей.
+        """
+        return (
+            (
+                await self._read_session.execute(
+                    select(sqlalchemy_follows.c.followed_id)
+                    .join(
+                        SQLAlchemyUser,
+                        SQLAlchemyUser.id == sqlalchemy_follows.c.followed_id,
+                    )
+                    .where(
+                        sqlalchemy_follows.c.follower_id == id_,
+                        SQLAlchemyUser.followers_count >= min_followers,
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    async def stream_follows(
+        self, id_: UUID, is_following: bool
+    ) -> AsyncIterator[list[PydanticUserNotDetailed]]:
+        """
+        :param is_following: Выдавать отслеживаемых пользователем, а не отслеживающих его.
+        """
+        own, other = self._follow_columns(is_following)
+        async for records in self._stream(
+            select(SQLAlchemyUser.id, SQLAlchemyUser.name)
+            .join(sqlalchemy_follows, other == SQLAlchemyUser.id)
+            .where(own == id_),
+            db_settings.stream_batch_size,
+        ):
+            yield [PydanticUserNotDetailed.from_obj(dict(user)) for user in records]
+
+    @dto_from_obj(PydanticUsersNotDetailed)
+    async def get_follows(
+        self,
+        id_: UUID,
+        is_following: bool,
+        limit: int,
+        after_user_id: UUID | None = None,
+    ) -> Sequence[RowMapping]:
+        """
+        Пользователи упорядочены по ID, поэтому следующая страница начинается после последнего из них. Отслеживаемые
+        читаются по первичному ключу отслеживаний, отслеживающие — по обратному ему индексу.
+
+        :param is_following: Выдавать отслеживаемых пользователем, а не отслеживающих его.
+        """
+        await self._get_by_id(id_, SQLAlchemyUser, (), is_read_only=True)
+
+        own, other = self._follow_columns(is_following)
+        query = (
+            select(SQLAlchemyUser.id, SQLAlchemyUser.name)
+            .join(sqlalchemy_follows, other == SQLAlchemyUser.id)
+            .where(own == id_)
+            .order_by(other)
+            .limit(limit)
         )
+        if after_user_id is not None:
+            query = query.where(other > after_user_id)
+
+        return (await self._read_session.execute(query)).mappings().all()
 
     @dto_from_obj(PydanticUserNotDetailed)
     @obj_from_dto(SQLAlchemyUser)
@@ -73,29 +268,141 @@ class SQLAlchemyUserRepository(SQLAlchemyRepository, UserRepository):
         return await self._create(user)
 
     async def create_follow(self, following_id: UUID, follower_id: UUID) -> None:
-        following = await self._get_by_id(
-            following_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
-        )
+        if await self._create_relation(
+            sqlalchemy_follows, follower_id=follower_id, followed_id=following_id
+        ):
+            await self._add_follow_counts((following_id,), follower_id, 1)
 
-        await self._append_related_by_id(
-            following.followers,
-            follower_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+    async def create_follows(
+        self, following_ids: Collection[UUID], follower_id: UUID
+    ) -> None:
+        """
+        Отслеживания создаются одним запросом, отсутствующие пользователи и уже существующие отслеживания
+        пропускаются.
+        """
+        created = (
+            (
+                await self._session.execute(
+                    insert(sqlalchemy_follows)
+                    .from_select(
+                        ["follower_id", "followed_id"],
+                        select(literal(follower_id), SQLAlchemyUser.id).where(
+                            SQLAlchemyUser.id.in_(following_ids)
+                        ),
+                    )
+                    .on_conflict_do_nothing()
+                    .returning(sqlalchemy_follows.c.followed_id)
+                )
+            )
+            .scalars()
+            .all()
         )
+        if created:
+            await self._add_follow_counts(created, follower_id, 1)
 
     async def delete_follow(self, following_id: UUID, follower_id: UUID) -> None:
-        following = await self._get_by_id(
-            following_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+        """
+        Отсутствие пользователей проверяется, только если отношения не было.
+        """
+        if await self._delete_relation(
+            sqlalchemy_follows, follower_id=follower_id, followed_id=following_id
+        ):
+            await self._add_follow_counts((following_id,), follower_id, -1)
+            return
+
+        for id_ in (following_id, follower_id):
+            await self._get_by_id(id_, SQLAlchemyUser, ())
+
+    @staticmethod
+    def _follow_columns(is_following: bool) -> tuple[Column[UUID], Column[UUID]]:
+        """
+        :return: Столбцы отслеживаний с ID самого пользователя и связанных с ним.
+        """
+        return (
+            (sqlalchemy_follows.c.follower_id, sqlalchemy_follows.c.followed_id)
+            if is_following
+            else (sqlalchemy_follows.c.followed_id, sqlalchemy_follows.c.follower_id)
         )
 
-        await self._remove_related_by_id(
-            following.followers,
-            follower_id,
-            SQLAlchemyUser,
-            (SQLAlchemyUser.following, SQLAlchemyUser.followers),
+    async def _add_follow_counts(
+        self, following_ids: Collection[UUID], follower_id: UUID, delta: int
+    ) -> None:
+        """
+        Счётчики изменяются на сервере одним запросом: одновременные отслеживания не теряются. Версия отслеживаний
+        растёт у всех затронутых пользователей при любом изменении, даже если количества остались прежними.
+        """
+        await self._session.execute(
+            update(SQLAlchemyUser)
+            .where(SQLAlchemyUser.id.in_((*following_ids, follower_id)))
+            .values(
+                followers_count=SQLAlchemyUser.followers_count
+                + case((SQLAlchemyUser.id.in_(following_ids), delta), else_=0),
+                following_count=SQLAlchemyUser.following_count
+                + case(
+                    (SQLAlchemyUser.id == follower_id, delta * len(following_ids)),
+                    else_=0,
+                ),
+                follow_version=SQLAlchemyUser.follow_version + 1,
+            )
+        )
+
+
+class AsyncpgUserRepository(AsyncpgRepository, SQLAlchemyUserRepository):
+    """
+    Пользователь вместе с отслеживаемыми и отслеживающими загружается двумя запросами вместо трёх, при
+    аутентификации — без объектов ORM; изменения выполняются через SQLAlchemy.
+    """
+
+    @dto_from_obj(PydanticUserNotDetailed)
+    async def get_principal_by_key(self, key: str) -> dict[str, Any]:
+        connection = await self._get_connection(self._read_session)
+
+        user = await connection.fetchrow(
+            "SELECT id, name FROM users WHERE key = $1", key
+        )
+        if user is None:
+            raise UnauthenticatedError("Invalid credentials.")
+
+        return dict(user)
+
+    @dto_from_obj(PydanticUserDetailed)
+    async def get_by_id(self, id_: UUID) -> dict[str, Any]:
+        connection = await self._get_connection(self._read_session)
+
+        user = await connection.fetchrow(
+            "SELECT id, name, followers_count, following_count FROM users WHERE id = $1",
+            id_,
         )
+        if user is None:
+            raise NotFoundError(
+                f"Requested {SQLAlchemyUser.__readable_name__} not found"
+            )
+
+        follows = await connection.fetch(
+            """
+            SELECT true AS is_following, users.id, users.name
+            FROM follows
+            JOIN users ON users.id = follows.followed_id
+            WHERE follows.follower_id = $1
+            UNION ALL
+            SELECT false, users.id, users.name
+            FROM follows
+            JOIN users ON users.id = follows.follower_id
+            WHERE follows.followed_id = $1
+            """,
+            user["id"],
+        )
+
+        return {
+            **user,
+            "following": [
+                {"id": follow["id"], "name": follow["name"]}
+                for follow in follows
+                if follow["is_following"]
+            ],
+            "followers": [
+                {"id": follow["id"], "name": follow["name"]}
+                for follow in follows
+                if not follow["is_following"]
+            ],
+        }
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
+from fastapi.responses import StreamingResponse
 
-from src.schemas import ID, PydanticError
-from src.users.dependencies import CurrentUser, Service
+from src.dependencies import IfNoneMatch, is_etag_matched, to_etag
+from src.schemas import ID, Limit, PydanticBatchResult, PydanticError, PydanticIDs
+from src.users.dependencies import CurrentUser, Service, Streamer
 from src.users.schemas import (
+    FollowsPageCursor,
+    IsExpanded,
+    PydanticFollowsPage,
+    PydanticUserCounted,
     PydanticUserDetailed,
     PydanticUserNotDetailed,
     PydanticUserPersonal,
+    PydanticUsersCounted,
+    UserIDs,
 )
 
 router = APIRouter(prefix="/users", tags=["Пользователи"])
@@ -13,9 +21,11 @@ router = APIRouter(prefix="/users", tags=["Пользователи"])
 
 @router.get(
     "/me",
+    response_model=PydanticUserDetailed | PydanticUserCounted,
     summary="Получение своего профиля.",
     response_description="Профиль получен.",
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Профиль не изменился."},
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Неверные данные аутентификации.",
             "model": PydanticError,
@@ -26,18 +36,61 @@ router = APIRouter(prefix="/users", tags=["Пользователи"])
         },
     },
 )
-async def get_profile(user: CurrentUser) -> PydanticUserDetailed:
+async def get_profile(
+    service: Service,
+    user: CurrentUser,
+    response: Response,
+    is_expanded: IsExpanded = False,
+    if_none_match: IfNoneMatch = None,
+) -> PydanticUserDetailed | PydanticUserCounted | Response:
     """
-    Получение подробной информации о текущем аутентифицированном пользователе (самом себе).
+    Получение информации о текущем аутентифицированном пользователе (самом себе). По умолчанию отслеживающие и
+    отслеживаемые представлены только количеством. Если отслеживания не менялись с полученной клиентом версии,
+    возвращается только статус.
     """
-    return user
+    etag = to_etag(await service.get_follow_version(user.id), is_expanded)
+    if is_etag_matched(etag, if_none_match):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+
+    response.headers["ETag"] = etag
+    return await service.find_by_id(user.id, is_expanded)
+
+
+@router.get(
+    "",
+    summary="Получение профилей нескольких пользователей.",
+    response_description="Пользователи получены.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def get_by_ids(
+    ids: UserIDs, service: Service, user: CurrentUser
+) -> PydanticUsersCounted:
+    """
+    Получение информации о нескольких пользователях по их ID одним запросом (например, об авторах и отметивших
+    публикации ленты). Отслеживающие и отслеживаемые представлены только количеством, отсутствующие пользователи
+    пропускаются.
+    """
+    return await service.find_by_ids(ids)
 
 
 @router.get(
     "/{id}",
+    response_model=PydanticUserDetailed | PydanticUserCounted,
     summary="Получение профиля другого пользователя.",
     response_description="Пользователь получен.",
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Профиль не изменился."},
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Не передан ключ API.",
             "model": PydanticError,
@@ -53,12 +106,98 @@ async def get_profile(user: CurrentUser) -> PydanticUserDetailed:
     },
 )
 async def get_by_id(
-    id_: ID, service: Service, user: CurrentUser
-) -> PydanticUserDetailed:
+    id_: ID,
+    service: Service,
+    user: CurrentUser,
+    stream: Streamer,
+    response: Response,
+    is_expanded: IsExpanded = False,
+    if_none_match: IfNoneMatch = None,
+) -> PydanticUserDetailed | PydanticUserCounted | Response:
+    """
+    Получение информации о другом пользователе по его ID. По умолчанию отслеживающие и отслеживаемые представлены
+    только количеством, полные списки выдаются потоком. Если отслеживания не менялись с полученной клиентом версии,
+    возвращается только статус.
+    """
+    etag = to_etag(await service.get_follow_version(id_), is_expanded)
+    if is_etag_matched(etag, if_none_match):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+
+    if is_expanded:
+        return StreamingResponse(
+            stream(await service.find_by_id(id_, is_expanded=False)),
+            media_type="application/json",
+            headers={"ETag": etag},
+        )
+
+    response.headers["ETag"] = etag
+    return await service.find_by_id(id_, is_expanded=False)
+
+
+@router.get(
+    "/{id}/followers",
+    summary="Получение страницы отслеживающих пользователя.",
+    response_description="Страница отслеживающих получена.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Пользователь не найден.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def get_followers(
+    id_: ID,
+    service: Service,
+    user: CurrentUser,
+    limit: Limit = 20,
+    cursor: FollowsPageCursor = None,
+) -> PydanticFollowsPage:
     """
-    Получение подробной информации о другом пользователе по его ID.
+    Получение страницы пользователей, отслеживающих данного, в порядке их ID. Следующая страница запрашивается с курсором из ответа.
     """
-    return await service.find_by_id(id_)
+    return await service.get_follows(id_, False, limit, cursor)
+
+
+@router.get(
+    "/{id}/following",
+    summary="Получение страницы отслеживаемых пользователя.",
+    response_description="Страница отслеживаемых получена.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Пользователь не найден.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def get_following(
+    id_: ID,
+    service: Service,
+    user: CurrentUser,
+    limit: Limit = 20,
+    cursor: FollowsPageCursor = None,
+) -> PydanticFollowsPage:
+    """
+    Получение страницы пользователей, отслеживаемых данным, в порядке их ID. Следующая страница запрашивается с курсором из ответа.
+    """
+    return await service.get_follows(id_, True, limit, cursor)
 
 
 @router.post(
@@ -86,6 +225,32 @@ async def sign_up(
     return await service.sign_up(user)
 
 
+@router.post(
+    "/follows:batch",
+    summary="Отслеживание нескольких пользователей.",
+    response_description="Отслеживания обработаны, результат каждого — в ответе.",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Не передан ключ API.",
+            "model": PydanticError,
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Неверные данные запроса.",
+            "model": list[PydanticError],
+        },
+    },
+)
+async def follow_many(
+    ids: PydanticIDs, service: Service, user: CurrentUser
+) -> PydanticBatchResult:
+    """
+    Добавление нескольких пользователей в отслеживаемые одним запросом к БД. Отсутствующие пользователи и попытка
+    отслеживать самого себя не прерывают обработку остальных: для них в ответе указывается ошибка, как при
+    отслеживании по одному.
+    """
+    return await service.follow_many(ids.ids, user.id)
+
+
 @router.post(
     "/{id}/follows",
     status_code=status.HTTP_204_NO_CONTENT,
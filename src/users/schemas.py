@@ -1,10 +1,11 @@
 from typing import Annotated, Any
 from uuid import UUID
 
-from pydantic import Field
+from fastapi import Query
+from pydantic import AfterValidator, Field, NonNegativeInt
 
-from src.schemas import PydanticSchema, Schema
-from src.settings import EXAMPLES
+from src.schemas import PydanticRootSchema, PydanticSchema, Schema, from_cursor
+from src.settings import EXAMPLES, db_settings
 
 
 class User(Schema):
@@ -37,12 +38,42 @@ class PydanticUserNotDetailed(PydanticUser, UserNotDetailed):
     ]
 
 
-class UserDetailed(UserNotDetailed):
+class UsersNotDetailed(Schema):
+    root: Any
+
+
+class PydanticUsersNotDetailed(PydanticRootSchema, UsersNotDetailed):
+    root: list[PydanticUserNotDetailed]
+
+
+class UserCounted(UserNotDetailed):
+    followers_count: Any
+    following_count: Any
+
+
+class PydanticUserCounted(PydanticUserNotDetailed, UserCounted):
+    followers_count: Annotated[
+        NonNegativeInt, Field(description="Количество отслеживающих", examples=[10])
+    ]
+    following_count: Annotated[
+        NonNegativeInt, Field(description="Количество отслеживаемых", examples=[5])
+    ]
+
+
+class UsersCounted(Schema):
+    root: Any
+
+
+class PydanticUsersCounted(PydanticRootSchema, UsersCounted):
+    root: list[PydanticUserCounted]
+
+
+class UserDetailed(UserCounted):
     followers: Any
     following: Any
 
 
-class PydanticUserDetailed(PydanticUserNotDetailed, UserDetailed):
+class PydanticUserDetailed(PydanticUserCounted, UserDetailed):
     followers: list["PydanticUserNotDetailed"]
     following: list["PydanticUserNotDetailed"]
 
@@ -72,3 +103,56 @@ class PydanticUserSafe(PydanticUser, UserSafe):
             examples=[EXAMPLES.sha256()],
         ),
     ]
+
+
+class FollowsCursor(Schema):
+    user_id: Any
+
+
+class PydanticFollowsCursor(PydanticSchema, FollowsCursor):
+    """
+    Позиция в списке отслеживающих или отслеживаемых: он упорядочен по ID пользователя, как и индексы отслеживаний.
+    """
+
+    user_id: UUID
+
+
+class FollowsPage(Schema):
+    users: Any
+    next_cursor: Any
+
+
+class PydanticFollowsPage(PydanticSchema, FollowsPage):
+    users: list[PydanticUserNotDetailed]
+    next_cursor: Annotated[
+        str | None,
+        Field(
+            description="Курсор следующей страницы (null — страница последняя)",
+            examples=[None],
+        ),
+    ]
+
+
+FollowsPageCursor = Annotated[
+    str | None,
+    AfterValidator(from_cursor(PydanticFollowsCursor)),
+    Query(description="Курсор страницы, полученный вместе с предыдущей"),
+]
+
+UserIDs = Annotated[
+    list[UUID],
+    Query(
+        alias="ids",
+        min_length=1,
+        max_length=db_settings.batch_max_size,
+        description="Уникальные идентификаторы пользователей",
+    ),
+]
+
+IsExpanded = Annotated[
+    bool,
+    Query(
+        alias="expand",
+        description="Включить в профиль полные списки отслеживающих и отслеживаемых, а не только их количество",
+    ),
+]
@@ -1,25 +1,112 @@
+import asyncio
+from collections.abc import AsyncIterator, Sequence
 from hashlib import sha256
 from uuid import UUID
 
-from src.errors import SelfActionError
+from src.cache import Cache
+from src.errors import NotFoundError, SelfActionError, ServerError
+from src.schemas import PydanticBatchResult, to_cursor
+from src.timelines.repositories import TimelineRepository
+from src.tweets.services import TweetService
 from src.users.repositories import UserRepository
 from src.users.schemas import (
+    PydanticFollowsCursor,
+    PydanticFollowsPage,
+    PydanticUserCounted,
     PydanticUserDetailed,
     PydanticUserNotDetailed,
     PydanticUserPersonal,
     PydanticUserSafe,
+    PydanticUsersCounted,
 )
 
 
 class UserService:
-    def __init__(self, repository: UserRepository) -> None:
+    def __init__(
+        self,
+        repository: UserRepository,
+        timeline_repository: TimelineRepository,
+        cache: Cache,
+        principal_cache: Cache,
+    ) -> None:
         self._repository: UserRepository = repository
+        self._timeline_repository: TimelineRepository = timeline_repository
+        self._cache: Cache = cache
+        self._principal_cache: Cache = principal_cache
 
-    async def authenticate(self, key: UUID) -> PydanticUserDetailed:
-        return await self._repository.get_by_key(self._encode(key))
+    async def authenticate(self, key: UUID) -> PydanticUserNotDetailed:
+        """
+        Пользователь определяется без отслеживающих и отслеживаемых (при необходимости они загружаются отдельно, см.
+        find_by_id) и кэшируется по зашифрованному ключу, поэтому большинство запросов не обращается к БД. Запись
+        не инвалидируется: идентификатор, имя и ключ не меняются после регистрации, а устаревание после удаления
+        пользователя напрямую из БД ограничено временем жизни записей кэша.
+        """
+        encoded = self._encode(key)
+
+        async def load() -> bytes:
+            principal = await self._repository.get_principal_by_key(encoded)
+            return principal.model_dump_json().encode()
+
+        return PydanticUserNotDetailed.model_validate_json(
+            await self._principal_cache.get_or_set(
+                self.principal_key(encoded), "user", load
+            )
+        )
 
-    async def find_by_id(self, id_: UUID) -> PydanticUserDetailed:
-        return await self._repository.get_by_id(id_)
+    async def find_by_id(
+        self, id_: UUID, is_expanded: bool = True
+    ) -> PydanticUserDetailed | PydanticUserCounted:
+        """
+        :param is_expanded: Загрузить полные списки отслеживающих и отслеживаемых, а не только их количество.
+        """
+        if is_expanded:
+            return await self._repository.get_by_id(id_)
+        return await self._repository.get_counted_by_id(id_)
+
+    async def find_by_ids(self, ids: Sequence[UUID]) -> PydanticUsersCounted:
+        """
+        Пользователи запрашиваются по одному, но конкурентно, поэтому репозиторий загружает их одним запросом (см.
+        UserRepository.load_counted_by_id). Порядок сохраняется, повторы и отсутствующие пользователи пропускаются.
+        """
+        users = await asyncio.gather(
+            *map(self._repository.load_counted_by_id, dict.fromkeys(ids)),
+            return_exceptions=True,
+        )
+        for user in users:
+            if isinstance(user, BaseException) and not isinstance(user, NotFoundError):
+                raise user
+
+        return PydanticUsersCounted(
+            [user for user in users if not isinstance(user, NotFoundError)]
+        )
+
+    async def get_follow_version(self, id_: UUID) -> int:
+        return await self._repository.get_follow_version(id_)
+
+    async def get_follows(
+        self,
+        id_: UUID,
+        is_following: bool,
+        limit: int,
+        after: PydanticFollowsCursor | None = None,
+    ) -> PydanticFollowsPage:
+        """
+        Загружается на одного пользователя больше страницы: так известно, есть ли следующая.
+
+        :param is_following: Выдавать отслеживаемых пользователем, а не отслеживающих его.
+        """
+        users = (
+            await self._repository.get_follows(
+                id_, is_following, limit + 1, None if after is None else after.user_id
+            )
+        ).root
+        if len(users) <= limit:
+            return PydanticFollowsPage(users=users, next_cursor=None)
+
+        return PydanticFollowsPage(
+            users=users[:limit],
+            next_cursor=to_cursor(PydanticFollowsCursor(user_id=users[limit - 1].id)),
+        )
 
     async def sign_up(self, user: PydanticUserPersonal) -> PydanticUserNotDetailed:
         return await self._repository.create(
@@ -31,6 +118,43 @@ class UserService:
 
         await self._repository.create_follow(following_id, follower_id)
 
+        followers_count = await self._repository.get_followers_count(following_id)
+        if not TweetService.is_pulled(followers_count):
+            await self._timeline_repository.backfill(follower_id, following_id)
+        await self._cache.delete(TweetService.timeline_key(follower_id))
+
+    async def follow_many(
+        self, following_ids: Sequence[UUID], follower_id: UUID
+    ) -> PydanticBatchResult:
+        """
+        Все отслеживания создаются одним запросом, а лента дополняется публикациями всех новых отслеживаемых сразу.
+        Для каждого ID сообщается ошибка, с которой завершилось бы его отдельное отслеживание.
+        """
+        errors: dict[UUID, ServerError] = {}
+        for following_id in following_ids:
+            try:
+                self._check_not_owned(following_id, follower_id)
+            except SelfActionError as exc:
+                errors[following_id] = exc
+        allowed = [id_ for id_ in set(following_ids) if id_ not in errors]
+
+        await self._repository.create_follows(allowed, follower_id)
+
+        following = (await self._repository.get_counted_by_ids(allowed)).root
+        for id_ in set(allowed) - {user.id for user in following}:
+            errors[id_] = NotFoundError("Requested user not found")
+        await self._timeline_repository.backfill(
+            follower_id,
+            *(
+                user.id
+                for user in following
+                if not TweetService.is_pulled(user.followers_count)
+            ),
+        )
+        await self._cache.delete(TweetService.timeline_key(follower_id))
+
+        return PydanticBatchResult.from_errors(following_ids, errors)
+
     async def unfollow(self, following_id: UUID, follower_id: UUID) -> None:
         """
         Удаляет отношение «следование» (отписка) между пользователями.
@@ -38,6 +162,34 @@ class UserService:
         :param follower: Тот, кто отслеживает.
         """
         await self._repository.delete_follow(following_id, follower_id)
+        await self._timeline_repository.prune(follower_id, following_id)
+        await self._cache.delete(TweetService.timeline_key(follower_id))
+
+    async def stream_detailed(self, user: PydanticUserCounted) -> AsyncIterator[bytes]:
+        """
+        Развёрнутый профиль сериализуется по частям по мере чтения отслеживаний, поэтому память не зависит от их
+        количества. Пользователь загружается заранее, чтобы его отсутствие обнаружилось до начала выдачи ответа.
+        """
+        yield user.model_dump_json(by_alias=True)[:-1].encode()
+
+        for name, is_following in (("following", True), ("followers", False)):
+            yield f',"{name}":['.encode()
+            separator = b""
+            async for users in self._repository.stream_follows(user.id, is_following):
+                yield separator + b",".join(
+                    user_.model_dump_json(by_alias=True).encode() for user_ in users
+                )
+                separator = b","
+            yield b"]"
+
+        yield b"}"
+
+    @staticmethod
+    def principal_key(key: str) -> str:
+        """
+        :param key: Зашифрованный ключ API.
+        """
+        return f"principal:{key}"
 
     @staticmethod
     def _encode(key: UUID) -> str:
@@ -0,0 +1,69 @@
+"""
+Сравнение векторизованного ранжирования ленты с построчным на 100 000 кандидатов. БД не используется. Запуск:
+python -m tests.benchmarks.ranking
+"""
+
+import math
+import random
+from time import perf_counter
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from src.settings import ranking_settings
+from src.tweets.ranking import SECONDS_PER_HOUR, rank, split_ids
+
+CANDIDATES: int = 100_000
+PAGE_SIZE: int = 20
+ROUNDS: int = 20
+
+
+def rank_rows(
+    like_counts: list[int], ages: list[float], affinities: list[int], ids: list[UUID]
+) -> list[int]:
+    scores = [
+        (like_count + 1)
+        * (1 + ranking_settings.affinity_weight * math.log1p(affinity))
+        / (max(age, 0) / SECONDS_PER_HOUR + 2) ** ranking_settings.gravity
+        for like_count, age, affinity in zip(like_counts, ages, affinities)
+    ]
+    return sorted(range(len(scores)), key=lambda i: (scores[i], ids[i]), reverse=True)[
+        : PAGE_SIZE + 1
+    ]
+
+
+def main() -> None:
+    like_counts = [int(random.paretovariate(1.2)) for _ in range(CANDIDATES)]
+    ages = [random.uniform(0, 30 * 24 * SECONDS_PER_HOUR) for _ in range(CANDIDATES)]
+    affinities = [random.choice((0, 0, 0, 1, 5)) for _ in range(CANDIDATES)]
+    ids = [uuid4() for _ in range(CANDIDATES)]
+
+    start = perf_counter()
+    for _ in range(ROUNDS):
+        expected = rank_rows(like_counts, ages, affinities, ids)
+    rows = (perf_counter() - start) / ROUNDS * 1000
+
+    arrays = (
+        np.array(like_counts, np.float64),
+        np.array(ages, np.float64),
+        np.array(affinities, np.float64),
+        split_ids(ids),
+    )
+    start = perf_counter()
+    for _ in range(ROUNDS):
+        indices, _ = rank(
+            *arrays,
+            PAGE_SIZE + 1,
+            ranking_settings.batch_size,
+            ranking_settings.gravity,
+            ranking_settings.affinity_weight,
+        )
+    vectorized = (perf_counter() - start) / ROUNDS * 1000
+
+    assert indices.tolist() == expected
+    print(f"{'rows':<12}{rows:8.2f} ms")
+    print(f"{'vectorized':<12}{vectorized:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
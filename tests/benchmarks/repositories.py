@@ -0,0 +1,161 @@
+"""
+Сравнение репозиториев на нагруженных маршрутах (лента и аутентификация), а также сериализации страницы ленты через
+Pydantic и на сервере БД. Использует ту же БД, что и тесты, и очищает
+её по завершении. Запуск: python -m tests.benchmarks.repositories
+"""
+
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from hashlib import sha256
+from time import perf_counter
+from typing import Any, Type
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from src.db import DBManager
+from src.dependencies import create_db_manager
+from src.repositories import SQLAlchemyRepository
+from src.settings import EXAMPLES
+from src.timelines.models import sqlalchemy_timelines
+from src.tweets.models import SQLAlchemyTweet, sqlalchemy_likes
+from src.tweets.repositories import AsyncpgTweetRepository, SQLAlchemyTweetRepository
+from src.users.models import SQLAlchemyUser, sqlalchemy_follows
+from src.users.repositories import AsyncpgUserRepository, SQLAlchemyUserRepository
+
+USERS: int = 1_000
+FOLLOWS_PER_USER: int = 50
+TWEETS_PER_USER: int = 5
+LIKES_PER_TWEET: int = 10
+ROUNDS: int = 200
+PAGE_SIZE: int = 20
+
+
+async def seed(db_manager: DBManager) -> tuple[list[Any], list[str]]:
+    users = [
+        {"id": uuid4(), "name": f"{i} {EXAMPLES.first_name()}"[:30], "key": uuid4()}
+        for i in range(USERS)
+    ]
+    tweets = [
+        {"id": uuid4(), "text": "text", "medias": [], "author_id": user["id"]}
+        for user in users
+        for _ in range(TWEETS_PER_USER)
+    ]
+
+    async with db_manager.get_session() as session:
+        await session.execute(
+            insert(SQLAlchemyUser),
+            [
+                {**user, "key": sha256(str(user["key"]).encode()).hexdigest()}
+                for user in users
+            ],
+        )
+        follows = [
+            {"follower_id": user["id"], "followed_id": followed["id"]}
+            for user in users
+            for followed in random.sample(users, FOLLOWS_PER_USER)
+            if followed is not user
+        ]
+        await session.execute(insert(sqlalchemy_follows), follows)
+        await session.execute(insert(SQLAlchemyTweet), tweets)
+        await session.execute(insert(sqlalchemy_timelines), timelines(follows, tweets))
+        await session.execute(
+            insert(sqlalchemy_likes),
+            [
+                {"tweet_id": tweet["id"], "user_id": user["id"]}
+                for tweet in tweets
+                for user in random.sample(users, LIKES_PER_TWEET)
+            ],
+        )
+
+    return [tweet["id"] for tweet in tweets], [
+        sha256(str(user["key"]).encode()).hexdigest() for user in users
+    ]
+
+
+def timelines(
+    follows: list[dict[str, Any]], tweets: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    tweets_by_author: dict[Any, list[Any]] = {}
+    for tweet in tweets:
+        tweets_by_author.setdefault(tweet["author_id"], []).append(tweet["id"])
+
+    slots: dict[Any, int] = {}
+    rows = []
+    for follow in follows:
+        for tweet_id in tweets_by_author[follow["followed_id"]]:
+            slot = slots.get(follow["follower_id"], 0)
+            slots[follow["follower_id"]] = slot + 1
+            rows.append(
+                {"user_id": follow["follower_id"], "slot": slot, "tweet_id": tweet_id}
+            )
+
+    return rows
+
+
+async def serialize_by_ids(repository: Any, ids: list[Any]) -> bytes:
+    return (await repository.get_by_ids(ids)).model_dump_json(by_alias=True).encode()
+
+
+async def measure(
+    db_manager: DBManager,
+    repository: Type[SQLAlchemyRepository],
+    method: str | Callable[..., Awaitable[Any]],
+    args: list[tuple[Any, ...]],
+) -> float:
+    start = perf_counter()
+    for arg in args:
+        async with db_manager.get_session(is_read_only=True) as session:
+            if isinstance(method, str):
+                await getattr(repository(session), method)(*arg)
+            else:
+                await method(repository(session), *arg)
+
+    return (perf_counter() - start) / len(args) * 1000
+
+
+async def main() -> None:
+    db_manager = create_db_manager()
+    await db_manager.setup()
+    try:
+        tweet_ids, keys = await seed(db_manager)
+
+        pages = [(random.sample(tweet_ids, PAGE_SIZE),) for _ in range(ROUNDS)]
+        for path, method, args, repositories in (
+            (
+                "timeline",
+                "get_by_ids",
+                pages,
+                (SQLAlchemyTweetRepository, AsyncpgTweetRepository),
+            ),
+            (
+                "page",
+                serialize_by_ids,
+                pages,
+                (SQLAlchemyTweetRepository, AsyncpgTweetRepository),
+            ),
+            (
+                "page_json",
+                "get_serialized_by_ids",
+                pages,
+                (SQLAlchemyTweetRepository, AsyncpgTweetRepository),
+            ),
+            (
+                "auth",
+                "get_principal_by_key",
+                [(key,) for key in random.choices(keys, k=ROUNDS)],
+                (SQLAlchemyUserRepository, AsyncpgUserRepository),
+            ),
+        ):
+            for repository in repositories:
+                await measure(db_manager, repository, method, args[:10])
+                elapsed = await measure(db_manager, repository, method, args)
+                print(f"{path:<12}{repository.__name__:<30}{elapsed:8.2f} ms")
+    finally:
+        await db_manager.clear()
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
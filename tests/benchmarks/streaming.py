@@ -0,0 +1,90 @@
+"""
+Сравнение пиковой памяти при выдаче развёрнутого профиля целиком и потоком в зависимости от количества отслеживающих.
+Использует ту же БД, что и тесты, и очищает её по завершении. Запуск: python -m tests.benchmarks.streaming
+"""
+
+import asyncio
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert
+
+from src.cache import LRUCache
+from src.db import DBManager
+from src.dependencies import create_db_manager
+from src.timelines.repositories import SQLAlchemyTimelineRepository
+from src.users.models import SQLAlchemyUser, sqlalchemy_follows
+from src.users.repositories import SQLAlchemyUserRepository
+from src.users.services import UserService
+
+FOLLOWERS: tuple[int, ...] = (1_000, 10_000, 100_000)
+
+
+async def seed(db_manager: DBManager, followers: int) -> UUID:
+    users = [
+        {"id": uuid4(), "name": f"user {i}", "key": uuid4().hex * 2}
+        for i in range(followers + 1)
+    ]
+
+    async with db_manager.get_session() as session:
+        await session.execute(insert(SQLAlchemyUser), users)
+        await session.execute(
+            insert(sqlalchemy_follows),
+            [
+                {"follower_id": user["id"], "followed_id": users[0]["id"]}
+                for user in users[1:]
+            ],
+        )
+
+    return users[0]["id"]
+
+
+async def materialize(service: UserService, id_: UUID) -> None:
+    (await service.find_by_id(id_)).model_dump_json(by_alias=True).encode()
+
+
+async def stream(service: UserService, id_: UUID) -> None:
+    async for _ in service.stream_detailed(
+        await service.find_by_id(id_, is_expanded=False)
+    ):
+        pass
+
+
+async def measure(
+    db_manager: DBManager,
+    method: Callable[[UserService, UUID], Awaitable[None]],
+    id_: UUID,
+) -> float:
+    async with db_manager.get_session(is_read_only=True) as session:
+        service = UserService(
+            SQLAlchemyUserRepository(session),
+            SQLAlchemyTimelineRepository(session),
+            LRUCache(1, 1),
+            LRUCache(1, 1),
+        )
+        tracemalloc.start()
+        try:
+            await method(service, id_)
+            return tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+
+async def main() -> None:
+    db_manager = create_db_manager()
+    await db_manager.setup()
+    try:
+        for followers in FOLLOWERS:
+            id_ = await seed(db_manager, followers)
+            for method in (materialize, stream):
+                peak = await measure(db_manager, method, id_)
+                print(f"{followers:<10}{method.__name__:<15}{peak:8.2f} MiB")
+            await db_manager.clear()
+    finally:
+        await db_manager.clear()
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
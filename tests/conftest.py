@@ -3,15 +3,51 @@ from typing import Any
 
 import pytest
 import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
 
+from src.bus import Bus
+from src.cache import Cache
 from src.db import DBManager
-from src.dependencies import get_db_manager
+from src.dependencies import create_bus, create_cache, create_db_manager
+from src.main import app
 from tests.factories import SQLAlchemyTweetFactory, SQLAlchemyUserFactory
 
 
-@pytest.fixture
-def db_manager() -> DBManager:
-    return get_db_manager()
+@pytest_asyncio.fixture
+async def db_manager() -> AsyncGenerator[DBManager, None]:
+    db_manager_ = create_db_manager()
+
+    yield db_manager_
+
+    await db_manager_.dispose()
+
+
+@pytest_asyncio.fixture
+async def cache() -> AsyncGenerator[Cache, None]:
+    cache_ = create_cache()
+
+    yield cache_
+
+    await cache_.dispose()
+
+
+@pytest_asyncio.fixture
+async def principal_cache() -> AsyncGenerator[Cache, None]:
+    cache_ = create_cache()
+
+    yield cache_
+
+    await cache_.dispose()
+
+
+@pytest_asyncio.fixture
+async def bus() -> AsyncGenerator[Bus, None]:
+    bus_ = create_bus()
+    await bus_.setup()
+
+    yield bus_
+
+    await bus_.dispose()
 
 
 @pytest_asyncio.fixture(autouse=True)
@@ -33,3 +69,21 @@ async def session(db_manager: DBManager) -> Any:
 def set_session(session: Any) -> None:
     for factory in (SQLAlchemyUserFactory, SQLAlchemyTweetFactory):
         factory._meta.sqlalchemy_session = session
+
+
+@pytest_asyncio.fixture
+async def client(
+    db_manager: DBManager, cache: Cache, principal_cache: Cache, bus: Bus
+) -> AsyncGenerator[AsyncClient, None]:
+    """
+    Транспорт ASGI не запускает lifespan, поэтому менеджер БД, кэш и шина событий передаются приложению напрямую.
+    """
+    app.state.db_manager = db_manager
+    app.state.cache = cache
+    app.state.principal_cache = principal_cache
+    app.state.bus = bus
+
+    async with AsyncClient(
+        transport=ASGITransport(app), base_url="http://test"
+    ) as client_:
+        yield client_
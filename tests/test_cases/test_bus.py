@@ -0,0 +1,42 @@
+import pytest
+
+from src.bus import DeferredBus, LocalBus
+
+
+class TestLocalBus:
+    @pytest.mark.asyncio
+    async def test_publish(self) -> None:
+        bus = LocalBus(10)
+        async with bus.subscribe("first", "second") as queue:
+            await bus.publish(["first", "other"], "message")
+
+            assert queue.get_nowait() == "message"
+            assert queue.empty()
+
+        await bus.publish(["first"], "message")
+        assert queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_drop_when_full(self) -> None:
+        bus = LocalBus(1)
+        async with bus.subscribe("topic") as queue:
+            for message in ("first", "second"):
+                await bus.publish(["topic"], message)
+
+            assert queue.get_nowait() == "first"
+            assert queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_deferred(self) -> None:
+        bus, deferred = LocalBus(10), []
+        async with DeferredBus(bus, lambda *args: deferred.append(args)).subscribe(
+            "topic"
+        ) as queue:
+            await DeferredBus(bus, lambda *args: deferred.append(args)).publish(
+                ["topic"], "message"
+            )
+            assert queue.empty()
+
+            func, *args = deferred[0]
+            await func(*args)
+            assert queue.get_nowait() == "message"
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from src.cache import DeferredCache, LRUCache
+from src.settings import EXAMPLES
+
+
+class TestLRUCache:
+    @pytest.mark.asyncio
+    async def test_get(self) -> None:
+        cache = LRUCache(10, 30)
+        await cache.set("key", "field", b"value")
+
+        assert await cache.get("key", "field") == b"value"
+        assert await cache.get("key", "other") is None
+        assert await cache.get("other", "field") is None
+        assert cache.get_stats() == {"hits": 1, "misses": 2, "size": 1}
+
+    @pytest.mark.asyncio
+    async def test_delete(self) -> None:
+        cache = LRUCache(10, 30)
+        await cache.set("key", "field", b"value")
+        await cache.delete("key", "other")
+
+        assert await cache.get("key", "field") is None
+
+    @pytest.mark.asyncio
+    async def test_set_if_version(self) -> None:
+        cache = LRUCache(10, 30)
+        version = await cache.get_version("key")
+
+        assert await cache.set_if_version("key", "first", b"value", version)
+        await cache.delete("key")
+        assert not await cache.set_if_version("key", "second", b"value", version)
+        assert await cache.get("key", "second") is None
+
+    @pytest.mark.asyncio
+    async def test_evict_least_recent(self) -> None:
+        cache = LRUCache(2, 30)
+        for key in ("first", "second"):
+            await cache.set(key, "field", b"value")
+        await cache.get("first", "field")
+        await cache.set("third", "field", b"value")
+
+        assert await cache.get("second", "field") is None
+        assert await cache.get("first", "field") == b"value"
+
+    @pytest.mark.asyncio
+    async def test_get_or_set_once(self) -> None:
+        cache, calls = LRUCache(10, 30), []
+
+        async def create() -> bytes:
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return b"value"
+
+        values = await asyncio.gather(
+            *(cache.get_or_set("key", "field", create) for _ in range(3))
+        )
+
+        assert values == [b"value"] * 3
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_or_set_after_error(self) -> None:
+        cache, calls = LRUCache(10, 30), []
+
+        async def create() -> bytes:
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise ValueError
+            return b"value"
+
+        first, second = await asyncio.gather(
+            cache.get_or_set("key", "field", create),
+            cache.get_or_set("key", "field", create),
+            return_exceptions=True,
+        )
+
+        assert isinstance(first, ValueError)
+        assert second == b"value"
+
+    @pytest.mark.asyncio
+    async def test_expire(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Время жизни отсчитывается от первой записи в ключ и не продлевается последующими.
+        """
+        now = 0.0
+        monkeypatch.setattr("src.cache.monotonic", lambda: now)
+        cache = LRUCache(10, 30)
+        await cache.set("key", "first", b"value")
+        now = 20
+        await cache.set("key", "second", b"value")
+        now = 30
+
+        assert await cache.get("key", "second") is None
+
+
+class TestDeferredCache:
+    @pytest.mark.asyncio
+    async def test_delete(self) -> None:
+        cache = LRUCache(10, 30)
+        deferred = []
+        deferred_cache = DeferredCache(cache, lambda *args: deferred.append(args))
+        await deferred_cache.set("key", "field", b"value")
+        await deferred_cache.delete("key")
+
+        assert await cache.get("key", "field") == b"value"
+
+        func, *args = deferred[0]
+        await func(*args)
+        assert await deferred_cache.get("key", "field") is None
+        assert deferred_cache.get_stats() == cache.get_stats()
+
+
+class TestCacheMetrics:
+    @pytest.mark.asyncio
+    async def test_get_cache(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+
+        assert (await client.get("/api/metrics/cache")).status_code == 401
+        response = await client.get("/api/metrics/cache", headers={"X-API-Key": key})
+
+        assert response.status_code == 200
+        assert response.json() == {"hits": 0, "misses": 0, "size": 0}
@@ -0,0 +1,210 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event, make_url, text
+from sqlalchemy.pool import Pool
+
+from src.db import SQLAlchemyDBManager
+from src.models import SQLAlchemyModel
+from src.settings import EXAMPLES, db_settings
+from tests.factories import SQLAlchemyUserFactory
+
+
+class TestSQLAlchemyDBManager:
+    @pytest.mark.asyncio
+    async def test_pool_reuse(
+        self, client: AsyncClient, db_manager: SQLAlchemyDBManager
+    ) -> None:
+        """
+        Новые соединения не открываются ни в одном пуле: все запросы используют соединение, уже созданное при
+        подготовке таблиц.
+        """
+        connections: list[Any] = []
+
+        def on_connect(dbapi_conn: Any, record: Any) -> None:
+            connections.append(dbapi_conn)
+
+        event.listen(Pool, "connect", on_connect)
+        try:
+            for i in range(10):
+                response = await client.post(
+                    "/api/users",
+                    json={
+                        "name": f"{EXAMPLES.first_name()} {i}",
+                        "key": str(EXAMPLES.uuid4()),
+                    },
+                )
+                assert response.status_code == 201
+        finally:
+            event.remove(Pool, "connect", on_connect)
+
+        assert connections == []
+        assert db_manager.engine.pool.checkedout() == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_requests_skip_pool(
+        self, client: AsyncClient, db_manager: SQLAlchemyDBManager
+    ) -> None:
+        checkouts: list[Any] = []
+
+        def on_checkout(dbapi_conn: Any, record: Any, proxy: Any) -> None:
+            checkouts.append(dbapi_conn)
+
+        event.listen(db_manager.engine.sync_engine, "checkout", on_checkout)
+
+        assert (await client.get("/api/tweets")).status_code == 401
+        assert (await client.post("/api/users", json={})).status_code == 422
+        assert checkouts == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("is_read_only", [True, False])
+    async def test_read_only_session(
+        self, db_manager: SQLAlchemyDBManager, is_read_only: bool
+    ) -> None:
+        """
+        Без явной транзакции каждый запрос выполняется в собственной.
+        """
+        async with db_manager.get_session(is_read_only=is_read_only) as session:
+            xact_ids = [
+                (await session.execute(text("SELECT pg_current_xact_id()"))).scalar()
+                for _ in range(2)
+            ]
+
+        assert (xact_ids[0] != xact_ids[1]) is is_read_only
+
+
+class TestSQLAlchemyDBManagerReplicas:
+    @pytest_asyncio.fixture
+    async def replicated_db_manager(
+        self, monkeypatch: pytest.MonkeyPatch, replica_url: str
+    ) -> AsyncGenerator[SQLAlchemyDBManager, None]:
+        monkeypatch.setattr(db_settings, "replica_urls", [replica_url])
+        monkeypatch.setattr(db_settings, "read_your_writes_time", 60)
+        db_manager_ = SQLAlchemyDBManager(SQLAlchemyModel.metadata)
+
+        yield db_manager_
+
+        await db_manager_.dispose()
+
+    @pytest.fixture
+    def replica_url(self) -> str:
+        """
+        В качестве реплики выступает основной сервер: важен лишь выбор движка.
+        """
+        return db_settings.url
+
+    @pytest.mark.asyncio
+    async def test_read_on_replica(
+        self, replicated_db_manager: SQLAlchemyDBManager
+    ) -> None:
+        async with (
+            replicated_db_manager.get_session() as session,
+            replicated_db_manager.get_read_session(primary=session) as read_session,
+        ):
+            assert (await read_session.execute(text("SELECT 1"))).scalar_one() == 1
+            assert read_session is not session
+            assert read_session.bind is not replicated_db_manager.engine
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "replica_url",
+        [make_url(db_settings.url).set(port=1).render_as_string(hide_password=False)],
+    )
+    async def test_unavailable_replica(
+        self, replicated_db_manager: SQLAlchemyDBManager
+    ) -> None:
+        """
+        Чтение, выпавшее на недоступную реплику, выполняется на основном сервере, а реплика исключается из
+        балансировки.
+        """
+        async with replicated_db_manager.get_session() as session:
+            for _ in range(2):
+                async with replicated_db_manager.get_read_session(
+                    primary=session
+                ) as read_session:
+                    assert read_session is session
+                    assert (
+                        await read_session.execute(text("SELECT 1"))
+                    ).scalar_one() == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("is_written", [True, False])
+    async def test_read_your_writes(
+        self, replicated_db_manager: SQLAlchemyDBManager, is_written: bool
+    ) -> None:
+        """
+        За основным сервером закрепляется только клиент, изменивший данные: чтение в сессии основного сервера на
+        выбор реплики не влияет.
+        """
+        writer, reader = EXAMPLES.uuid4(), EXAMPLES.uuid4()
+        async with replicated_db_manager.get_session(writer) as session:
+            await session.execute(text("SELECT 1"))
+            if is_written:
+                session.add(SQLAlchemyUserFactory.build())
+
+        async with replicated_db_manager.get_session() as session:
+            async with replicated_db_manager.get_read_session(
+                writer, session
+            ) as read_session:
+                assert (read_session is session) is is_written
+            async with replicated_db_manager.get_read_session(
+                reader, session
+            ) as read_session:
+                assert read_session is not session
+
+
+class TestPoolMetrics:
+    @pytest_asyncio.fixture
+    async def pre_ping_db_manager(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> AsyncGenerator[SQLAlchemyDBManager, None]:
+        monkeypatch.setattr(db_settings, "is_pool_pre_ping", True)
+        db_manager_ = SQLAlchemyDBManager(SQLAlchemyModel.metadata)
+
+        yield db_manager_
+
+        await db_manager_.dispose()
+
+    @pytest.mark.asyncio
+    async def test_get_pools(
+        self, client: AsyncClient, db_manager: SQLAlchemyDBManager
+    ) -> None:
+        """
+        Во время ответа занято только соединение, через которое сам запрос аутентифицирован.
+        """
+        assert (await client.post("/api/users", json={})).status_code == 422
+        keys = [str(EXAMPLES.uuid4()) for _ in range(3)]
+        for key in keys:
+            await client.post(
+                "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+            )
+
+        assert (await client.get("/api/metrics/pools")).status_code == 401
+        stats = (
+            await client.get("/api/metrics/pools", headers={"X-API-Key": keys[0]})
+        ).json()["primary"]
+
+        assert stats["checkedOut"] == 1
+        assert stats["connects"] == 1
+        assert stats["checkoutWait"]["count"] >= 3
+        assert stats["connectionAge"]["count"] == stats["checkoutWait"]["count"]
+
+    @pytest.mark.asyncio
+    async def test_pre_ping_failure(
+        self, pre_ping_db_manager: SQLAlchemyDBManager, db_manager: SQLAlchemyDBManager
+    ) -> None:
+        engine = pre_ping_db_manager.engine
+        async with engine.connect() as stale:
+            pid = (await stale.execute(text("SELECT pg_backend_pid()"))).scalar()
+        async with db_manager.engine.connect() as killer:
+            await killer.execute(text(f"SELECT pg_terminate_backend({pid})"))
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+        stats = pre_ping_db_manager.get_stats()["primary"]
+        assert stats["pre_ping_failures"] == 1
+        assert stats["invalidations"] >= 1
@@ -0,0 +1,145 @@
+import random
+from typing import Any
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.settings import EXAMPLES
+from src.timelines.models import sqlalchemy_timelines
+from src.tweets.models import SQLAlchemyTweet, sqlalchemy_likes
+from src.users.models import SQLAlchemyUser, sqlalchemy_follows
+
+
+class TestIndexes:
+    """
+    Каждый путь поиска репозиториев должен обслуживаться индексом на заполненной БД, а не последовательным
+    сканированием.
+    """
+
+    users_count: int = 500
+    tweets_per_user: int = 5
+    follows_per_user: int = 10
+    likes_per_user: int = 5
+
+    @pytest_asyncio.fixture
+    async def seeded(self, session: AsyncSession) -> dict[str, UUID | str]:
+        users = [
+            {
+                "id": uuid4(),
+                "name": f"{i} {EXAMPLES.first_name()}"[:30],
+                "key": EXAMPLES.sha256(),
+            }
+            for i in range(self.users_count)
+        ]
+        tweets = [
+            {"id": uuid4(), "text": "text", "medias": [], "author_id": user["id"]}
+            for user in users
+            for _ in range(self.tweets_per_user)
+        ]
+
+        tweets_by_author: dict[UUID, list[UUID]] = {}
+        for tweet in tweets:
+            tweets_by_author.setdefault(tweet["author_id"], []).append(tweet["id"])
+
+        await session.execute(insert(SQLAlchemyUser), users)
+        await session.execute(insert(SQLAlchemyTweet), tweets)
+        follows = [
+            {"follower_id": user["id"], "followed_id": followed["id"]}
+            for user in users
+            for followed in random.sample(users, self.follows_per_user)
+            if followed is not user
+        ]
+        await session.execute(insert(sqlalchemy_follows), follows)
+        timelines: dict[UUID, list[UUID]] = {}
+        for follow in follows:
+            timelines.setdefault(follow["follower_id"], []).extend(
+                tweets_by_author[follow["followed_id"]]
+            )
+        await session.execute(
+            insert(sqlalchemy_timelines),
+            [
+                {"user_id": user_id, "slot": slot, "tweet_id": tweet_id}
+                for user_id, tweet_ids in timelines.items()
+                for slot, tweet_id in enumerate(tweet_ids)
+            ],
+        )
+        await session.execute(
+            insert(sqlalchemy_likes),
+            [
+                {"tweet_id": tweet["id"], "user_id": user["id"]}
+                for user in users
+                for tweet in random.sample(tweets, self.likes_per_user)
+            ],
+        )
+        await session.execute(text("ANALYZE"))
+
+        return {
+            "id": users[0]["id"],
+            "key": users[0]["key"],
+            "tweet_id": tweets[0]["id"],
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "query, param, index",
+        [
+            ("SELECT * FROM users WHERE key = :value", "key", "ix_users_key"),
+            ("SELECT * FROM users WHERE id = :value", "id", "users_pkey"),
+            (
+                "SELECT * FROM tweets WHERE author_id = :value",
+                "id",
+                "ix_tweets_author_id_created_at",
+            ),
+            ("SELECT * FROM follows WHERE follower_id = :value", "id", "follows_pkey"),
+            (
+                "SELECT * FROM follows WHERE followed_id = :value",
+                "id",
+                "ix_follows_followed_id_follower_id",
+            ),
+            (
+                (
+                    "SELECT * FROM follows WHERE follower_id = :value "
+                    "ORDER BY followed_id LIMIT 20"
+                ),
+                "id",
+                "follows_pkey",
+            ),
+            (
+                (
+                    "SELECT * FROM follows WHERE followed_id = :value "
+                    "ORDER BY follower_id LIMIT 20"
+                ),
+                "id",
+                "ix_follows_followed_id_follower_id",
+            ),
+            ("SELECT * FROM likes WHERE tweet_id = :value", "tweet_id", "likes_pkey"),
+            ("SELECT * FROM likes WHERE user_id = :value", "id", "ix_likes_user_id"),
+            ("SELECT * FROM timelines WHERE user_id = :value", "id", "timelines_pkey"),
+            (
+                "SELECT * FROM timelines WHERE tweet_id = :value",
+                "tweet_id",
+                "ix_timelines_tweet_id",
+            ),
+        ],
+    )
+    async def test_lookup_uses_index(
+        self,
+        session: AsyncSession,
+        seeded: dict[str, Any],
+        query: str,
+        param: str,
+        index: str,
+    ) -> None:
+        plan = "\n".join(
+            (
+                await session.execute(
+                    text(f"EXPLAIN {query}"), {"value": seeded[param]}
+                )
+            ).scalars()
+        )
+
+        assert index in plan
+        assert "Seq Scan" not in plan
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from src.loaders import DataLoader
+
+
+class TestDataLoader:
+    @pytest.mark.asyncio
+    async def test_coalesce(self) -> None:
+        batches = []
+
+        async def batch_load(keys: list[int]) -> dict[int, str]:
+            batches.append(keys)
+            return {key: str(key) for key in keys if key != 3}
+
+        loader = DataLoader(batch_load)
+
+        assert await asyncio.gather(*map(loader.load, (1, 2, 1, 3))) == [
+            "1",
+            "2",
+            "1",
+            None,
+        ]
+        assert await loader.load(1) == "1"
+        assert batches == [[1, 2, 3], [1]]
+
+    @pytest.mark.asyncio
+    async def test_error(self) -> None:
+        async def batch_load(keys: list[int]) -> dict[int, str]:
+            raise ValueError("failed")
+
+        loader = DataLoader(batch_load)
+
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled(self) -> None:
+        async def batch_load(keys: list[int]) -> dict[int, str]:
+            raise asyncio.CancelledError
+
+        loader = DataLoader(batch_load)
+
+        with pytest.raises(asyncio.CancelledError):
+            await loader.load(1)
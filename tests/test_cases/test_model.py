@@ -5,7 +5,9 @@ import pytest
 from async_factory_boy.factory.sqlalchemy import AsyncSQLAlchemyFactory
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import Cache
 from src.repositories import SQLAlchemyRepository
+from src.timelines.repositories import SQLAlchemyTimelineRepository
 
 
 class TestModel(ABC):
@@ -16,7 +18,17 @@ class TestModel(ABC):
 class TestSQLAlchemyModel(TestModel):
     factory_: Type[AsyncSQLAlchemyFactory]
     repository: Type[SQLAlchemyRepository]
+    timeline_repository: Type[SQLAlchemyTimelineRepository] = (
+        SQLAlchemyTimelineRepository
+    )
 
     @pytest.fixture(autouse=True)
-    def set_service(self, session: AsyncSession) -> None:
-        self.test_service = self.service(self.repository(session))
+    def set_service(
+        self, session: AsyncSession, cache: Cache, principal_cache: Cache
+    ) -> None:
+        self.test_service = self.service(
+            self.repository(session),
+            self.timeline_repository(session),
+            cache,
+            principal_cache,
+        )
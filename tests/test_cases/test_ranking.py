@@ -0,0 +1,88 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from src.tweets.ranking import (
+    from_bytes,
+    join_id,
+    locate,
+    rank,
+    score,
+    split_ids,
+    to_bytes,
+)
+
+
+class TestRanking:
+    size: int = 1000
+
+    @pytest.fixture
+    def candidates(self) -> tuple[np.ndarray, ...]:
+        rng = np.random.default_rng(0)
+        return (
+            rng.integers(0, 5, self.size).astype(np.float64),
+            np.full(self.size, 3600.0),
+            rng.integers(0, 3, self.size).astype(np.float64),
+        )
+
+    def test_score_decays(self) -> None:
+        scores = score(
+            np.array([10.0, 10.0, 1.0]),
+            np.array([0.0, 48 * 3600.0, 0.0]),
+            np.zeros(3),
+            1.8,
+            0.5,
+        )
+
+        assert scores[0] > scores[2] > scores[1]
+
+    @pytest.mark.parametrize("batch_size", [7, 1000])
+    def test_rank_pages(
+        self, candidates: tuple[np.ndarray, ...], batch_size: int
+    ) -> None:
+        """
+        Постраничное ранжирование партиями совпадает с полной сортировкой, в том числе при равных оценках.
+        """
+        ids = [uuid4() for _ in range(self.size)]
+        scores = score(*candidates, 1.8, 0.5)
+        expected = sorted(
+            range(self.size), key=lambda i: (scores[i], ids[i]), reverse=True
+        )
+
+        ranked: list[int] = []
+        after = None
+        while len(ranked) < self.size:
+            indices, page_scores = rank(
+                *candidates, split_ids(ids), 30, batch_size, 1.8, 0.5, after
+            )
+            ranked.extend(indices.tolist())
+            after = page_scores[-1], ids[indices[-1]]
+
+        assert ranked == expected
+
+    def test_locate_cached(self, candidates: tuple[np.ndarray, ...]) -> None:
+        """
+        Полный порядок переживает сериализацию, и страница после курсора продолжает его.
+        """
+        ids = [uuid4() for _ in range(self.size)]
+        split = split_ids(ids)
+        indices, scores = rank(*candidates, split, self.size, 100, 1.8, 0.5)
+        cached_scores, (high, low) = from_bytes(
+            to_bytes(scores, (split[0][indices], split[1][indices]))
+        )
+
+        start = locate(cached_scores, (high, low), (scores[29], ids[indices[29]]))
+        assert start == 30
+        assert [join_id(high[i], low[i]) for i in range(start, start + 30)] == [
+            ids[i]
+            for i in rank(
+                *candidates,
+                split,
+                30,
+                100,
+                1.8,
+                0.5,
+                (scores[29], ids[indices[29]]),
+            )[0]
+        ]
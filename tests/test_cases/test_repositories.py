@@ -0,0 +1,114 @@
+from typing import Any
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.errors import AlreadyExistsError, NotFoundError
+from src.repositories import SQLAlchemyRepository
+from src.settings import EXAMPLES, db_settings
+from src.tweets.models import SQLAlchemyTweet
+from src.users.models import SQLAlchemyUser
+
+
+class TestSQLAlchemyRepository:
+    @pytest.fixture
+    def repository(self, session: AsyncSession) -> SQLAlchemyRepository:
+        return SQLAlchemyRepository(session)
+
+    @staticmethod
+    def _users(count: int) -> list[dict[str, Any]]:
+        return [
+            {"name": f"{i} {EXAMPLES.first_name()}"[:30], "key": EXAMPLES.sha256()}
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("is_copy", [False, True])
+    async def test_create_many(
+        self, repository: SQLAlchemyRepository, session: AsyncSession, is_copy: bool
+    ) -> None:
+        users = self._users(3)
+
+        with patch.object(db_settings, "copy_threshold", 3 if is_copy else 4):
+            ids = await repository._create_many(SQLAlchemyUser, users)
+
+        created = await repository._get_many_by_ids(ids, SQLAlchemyUser, ())
+        assert [user.name for user in created] == [user["name"] for user in users]
+        assert all(user.followers_count == 0 for user in created)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("is_copy", [False, True])
+    async def test_create_many_errors(
+        self, repository: SQLAlchemyRepository, session: AsyncSession, is_copy: bool
+    ) -> None:
+        users = self._users(2)
+        await repository._create_many(SQLAlchemyUser, users[:1])
+
+        with (
+            patch.object(db_settings, "copy_threshold", 1 if is_copy else 3),
+            pytest.raises(AlreadyExistsError),
+        ):
+            await repository._create_many(SQLAlchemyUser, users)
+        await session.rollback()
+
+        with (
+            patch.object(db_settings, "copy_threshold", 1 if is_copy else 3),
+            pytest.raises(NotFoundError),
+        ):
+            await repository._create_many(
+                SQLAlchemyTweet,
+                [{"text": "text", "medias": [], "author_id": uuid4()}],
+            )
+        await session.rollback()
+
+    @pytest.mark.asyncio
+    async def test_upsert_many(
+        self, repository: SQLAlchemyRepository, session: AsyncSession
+    ) -> None:
+        users = self._users(2)
+        [id_] = await repository._create_many(SQLAlchemyUser, users[:1])
+
+        await repository._upsert_many(
+            SQLAlchemyUser,
+            [
+                {**users[0], "name": "renamed"},
+                users[1],
+                {**users[0], "name": "renamed again"},
+            ],
+            ["key"],
+            ["name"],
+        )
+
+        names = dict(
+            (await session.execute(select(SQLAlchemyUser.key, SQLAlchemyUser.name)))
+            .tuples()
+            .all()
+        )
+        assert names == {
+            users[0]["key"]: "renamed again",
+            users[1]["key"]: users[1]["name"],
+        }
+        assert (await repository._get_many_by_ids([id_], SQLAlchemyUser, ()))[
+            0
+        ].key == users[0]["key"]
+
+    @pytest.mark.asyncio
+    async def test_get_and_delete_many(
+        self, repository: SQLAlchemyRepository, session: AsyncSession
+    ) -> None:
+        ids = await repository._create_many(SQLAlchemyUser, self._users(3))
+
+        with pytest.raises(NotFoundError):
+            await repository._get_many_by_ids([ids[0], uuid4()], SQLAlchemyUser, ())
+
+        await repository._delete_many(SQLAlchemyUser, ids[:2])
+        assert (
+            await session.execute(select(func.count()).select_from(SQLAlchemyUser))
+        ).scalar() == 1
+
+        with pytest.raises(NotFoundError):
+            await repository._delete_many(SQLAlchemyUser, [ids[2], uuid4()])
+        await session.rollback()
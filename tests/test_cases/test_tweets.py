@@ -1,18 +1,36 @@
+import asyncio
+import json
+from base64 import urlsafe_b64decode
+from datetime import timedelta
+from operator import itemgetter
 from typing import Any, Type
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import pytest
 import pytest_asyncio
-from sqlalchemy import select
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
 
-from src.errors import SelfActionError
-from src.settings import EXAMPLES
+from src.bus import Bus
+from src.cache import Cache
+from src.db import DBManager
+from src.errors import NotFoundError, SelfActionError
+from src.settings import EXAMPLES, db_settings, event_settings
+from src.timelines.models import sqlalchemy_timelines
+from src.tweets.jobs import reconcile_like_counts
 from src.tweets.models import SQLAlchemyTweet
-from src.tweets.repositories import SQLAlchemyTweetRepository
-from src.tweets.schemas import PydanticTweetPersonal
+from src.tweets.repositories import AsyncpgTweetRepository, SQLAlchemyTweetRepository
+from src.tweets.schemas import (
+    PydanticLikesCursor,
+    PydanticTweetPersonal,
+    PydanticTweetsCursor,
+)
 from src.tweets.services import TweetService
 from src.users.errors import UnauthorizedError
-from tests.factories import SQLAlchemyTweetFactory
+from src.users.models import SQLAlchemyUser
+from src.users.repositories import SQLAlchemyUserRepository
+from src.users.services import UserService
+from tests.factories import SQLAlchemyTweetFactory, SQLAlchemyUserFactory
 from tests.test_cases.test_model import TestSQLAlchemyModel
 
 
@@ -21,6 +39,21 @@ class TestSQLAlchemyTweets(TestSQLAlchemyModel):
     service: Type[TweetService] = TweetService
     repository: Type[SQLAlchemyTweetRepository] = SQLAlchemyTweetRepository
 
+    @pytest.fixture(autouse=True)
+    def set_service(
+        self, session: Any, cache: Cache, principal_cache: Cache, bus: Bus
+    ) -> None:
+        self.cache = cache
+        self.principal_cache = principal_cache
+        self.bus = bus
+        self.test_service = self.service(
+            self.repository(session),
+            self.timeline_repository(session),
+            SQLAlchemyUserRepository(session),
+            cache,
+            bus,
+        )
+
     @pytest_asyncio.fixture
     async def tweet(self) -> SQLAlchemyTweet:
         return await self.factory_()
@@ -38,9 +71,511 @@ class TestSQLAlchemyTweets(TestSQLAlchemyModel):
     async def tweets(self) -> list[SQLAlchemyTweet]:
         return await self.factory_.create_batch(2)
 
+    async def _follow(
+        self, session: Any, following_id: UUID, follower_id: UUID
+    ) -> None:
+        await UserService(
+            SQLAlchemyUserRepository(session),
+            self.timeline_repository(session),
+            self.cache,
+            self.principal_cache,
+        ).follow(following_id, follower_id)
+
     @pytest.mark.asyncio
     async def test_get_all(self, tweet: SQLAlchemyTweet) -> None:
-        assert (await self.test_service.get_list(tweet.author.id)).root == []
+        page = await self.test_service.get_list(tweet.author.id, 20)
+
+        assert page.tweets == []
+        assert page.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_get_all_followed(
+        self, tweets: list[SQLAlchemyTweet], session: Any
+    ) -> None:
+        """
+        Публикации отслеживаемых авторов упорядочены по количеству отметок «нравится».
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        await self.test_service.like(tweets[1].id, follower.id)
+
+        feed = (await self.test_service.get_list(follower.id, 20)).tweets
+
+        assert [tweet.id for tweet in feed] == [tweets[1].id, tweets[0].id]
+        assert [user.id for user in feed[0].likes] == [follower.id]
+        assert feed[0].author.id == tweets[1].author_id
+
+    @pytest.mark.asyncio
+    async def test_get_all_paginated(self, session: Any) -> None:
+        """
+        Страницы не пересекаются и вместе содержат все публикации, в том числе с одинаковым количеством
+        отметок «нравится».
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        tweets = await self.factory_.create_batch(5)
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        await session.execute(
+            update(SQLAlchemyTweet)
+            .where(SQLAlchemyTweet.id.in_([tweet.id for tweet in tweets[:2]]))
+            .values(like_count=1)
+        )
+
+        pages = [await self.test_service.get_list(follower.id, 2)]
+        while pages[-1].next_cursor is not None:
+            after = PydanticTweetsCursor.model_validate_json(
+                urlsafe_b64decode(pages[-1].next_cursor)
+            )
+            pages.append(await self.test_service.get_list(follower.id, 2, after))
+        feed = [tweet for page in pages for tweet in page.tweets]
+
+        assert [len(page.tweets) for page in pages] == [2, 2, 1]
+        assert sorted(tweet.id for tweet in feed) == sorted(
+            tweet.id for tweet in tweets
+        )
+        assert {tweet.id for tweet in feed[:2]} == {tweet.id for tweet in tweets[:2]}
+
+    @pytest.mark.asyncio
+    async def test_get_all_paginated_ranked_once(
+        self, session: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Следующие страницы продолжают закэшированный порядок первой, а не отбирают и ранжируют кандидатов заново.
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        tweets = await self.factory_.create_batch(3)
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        calls = []
+        get_candidates = self.test_service._get_candidates
+
+        async def count_candidates(user_id: UUID) -> Any:
+            calls.append(user_id)
+            return await get_candidates(user_id)
+
+        monkeypatch.setattr(self.test_service, "_get_candidates", count_candidates)
+
+        pages = [await self.test_service.get_list(follower.id, 1)]
+        while pages[-1].next_cursor is not None:
+            after = PydanticTweetsCursor.model_validate_json(
+                urlsafe_b64decode(pages[-1].next_cursor)
+            )
+            pages.append(await self.test_service.get_list(follower.id, 1, after))
+
+        assert len(pages) == 3
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_all_ranked(
+        self, tweets: list[SQLAlchemyTweet], session: Any
+    ) -> None:
+        """
+        Старая популярная публикация уступает новой, а при равной популярности выше публикация автора, чьи
+        публикации читатель уже отмечал.
+        """
+        liked: SQLAlchemyTweet = await self.factory_(author=tweets[1].author)
+        old: SQLAlchemyTweet = await self.factory_(author=tweets[0].author)
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        await self.test_service.like(liked.id, follower.id)
+        await session.execute(
+            update(SQLAlchemyTweet)
+            .where(SQLAlchemyTweet.id == old.id)
+            .values(like_count=5, created_at=func.now() - timedelta(days=7))
+        )
+
+        feed = (await self.test_service.get_list(follower.id, 20)).tweets
+
+        assert [tweet.id for tweet in feed] == [
+            liked.id,
+            tweets[1].id,
+            tweets[0].id,
+            old.id,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_serialized_list_cached(
+        self, built_tweet: PydanticTweetPersonal, session: Any
+    ) -> None:
+        """
+        Страница берётся из кэша, пока лента не изменится.
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, built_tweet.author_id, follower.id)
+        pages = [await self.test_service.get_serialized_list(follower.id, 20)]
+        pages.append(await self.test_service.get_serialized_list(follower.id, 20))
+
+        tweet_id = await self.test_service.publish(built_tweet)
+        pages.append(await self.test_service.get_serialized_list(follower.id, 20))
+        await self.test_service.like(tweet_id.id, follower.id)
+        pages.append(await self.test_service.get_serialized_list(follower.id, 20))
+
+        assert pages[0] == pages[1]
+        assert str(tweet_id.id) not in pages[0].decode()
+        assert str(tweet_id.id) in pages[2].decode()
+        assert pages[2] != pages[3]
+        assert self.cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_serialized_list_invalidated_while_ranking(
+        self, built_tweet: PydanticTweetPersonal, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Страница, собранная из данных до инвалидации, не попадает в кэш после неё.
+        """
+        rank = self.test_service._rank
+
+        async def rank_and_invalidate(user_id: UUID, *args: Any) -> Any:
+            ranked = await rank(user_id, *args)
+            await self.cache.delete(TweetService.timeline_key(user_id))
+            return ranked
+
+        monkeypatch.setattr(self.test_service, "_rank", rank_and_invalidate)
+        await self.test_service.get_serialized_list(built_tweet.author_id, 20)
+        monkeypatch.undo()
+        await self.test_service.get_serialized_list(built_tweet.author_id, 20)
+
+        assert self.cache.get_stats()["hits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_get_serialized_list_db_json(
+        self,
+        tweets: list[SQLAlchemyTweet],
+        session: Any,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        await self.test_service.like(tweets[0].id, follower.id)
+        await self.test_service.like(tweets[0].id, tweets[1].author_id)
+
+        expected = (await self.test_service.get_list(follower.id, 1)).model_dump(
+            mode="json", by_alias=True
+        )
+        monkeypatch.setattr(db_settings, "is_db_json", True)
+        page = json.loads(await self.test_service.get_serialized_list(follower.id, 1))
+
+        for tweet in (*page["tweets"], *expected["tweets"]):
+            tweet["likes"].sort(key=itemgetter("id"))
+        assert page["tweets"] == expected["tweets"]
+        assert page["nextCursor"] is not None
+        assert (
+            json.loads(await self.test_service.get_serialized_list(follower.id, 20))[
+                "tweets"
+            ][1]["likes"]
+            == []
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_list_compact(self, tweet: SQLAlchemyTweet, session: Any) -> None:
+        likers = await SQLAlchemyUserFactory.create_batch(
+            db_settings.likes_preview_size + 1
+        )
+        await self._follow(session, tweet.author_id, likers[0].id)
+        for liker in likers:
+            await self.test_service.like(tweet.id, liker.id)
+
+        compact = (
+            await self.test_service.get_list(likers[0].id, 20, is_compact=True)
+        ).tweets[0]
+        detailed = (await self.test_service.get_list(likers[0].id, 20)).tweets[0]
+
+        assert compact.like_count == len(likers)
+        assert compact.is_liked
+        assert [user.id for user in compact.likes_preview] == sorted(
+            liker.id for liker in likers
+        )[: db_settings.likes_preview_size]
+        assert len(detailed.likes) == len(likers)
+
+    @pytest.mark.asyncio
+    async def test_get_likes(self, tweet: SQLAlchemyTweet) -> None:
+        likers = await SQLAlchemyUserFactory.create_batch(3)
+        for liker in likers:
+            await self.test_service.like(tweet.id, liker.id)
+
+        pages = [await self.test_service.get_likes(tweet.id, 2)]
+        pages.append(
+            await self.test_service.get_likes(
+                tweet.id,
+                2,
+                PydanticLikesCursor.model_validate_json(
+                    urlsafe_b64decode(pages[0].next_cursor)
+                ),
+            )
+        )
+
+        assert [user.id for page in pages for user in page.likes] == sorted(
+            liker.id for liker in likers
+        )
+        assert pages[1].next_cursor is None
+        with pytest.raises(NotFoundError):
+            await self.test_service.get_likes(EXAMPLES.uuid4(), 2)
+
+    @pytest.mark.asyncio
+    async def test_publish_fans_out(
+        self, built_tweet: PydanticTweetPersonal, session: Any
+    ) -> None:
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, built_tweet.author_id, follower.id)
+
+        tweet_id = await self.test_service.publish(built_tweet)
+
+        assert tweet_id.id in [
+            tweet.id
+            for tweet in (await self.test_service.get_list(follower.id, 20)).tweets
+        ]
+        assert (
+            await self.test_service.get_list(built_tweet.author_id, 20)
+        ).tweets == []
+
+    @pytest.mark.asyncio
+    async def test_publish_notifies(
+        self,
+        built_tweet: PydanticTweetPersonal,
+        session: Any,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Отслеживающие узнают о публикации по своей теме, а о публикации популярного автора — по теме автора.
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, built_tweet.author_id, follower.id)
+
+        async with self.bus.subscribe(
+            TweetService.reader_topic(follower.id),
+            TweetService.author_topic(built_tweet.author_id),
+        ) as queue:
+            pushed = await self.test_service.publish(built_tweet)
+            monkeypatch.setattr(db_settings, "pull_threshold", 1)
+            pulled = await self.test_service.publish(built_tweet)
+
+            assert [json.loads(queue.get_nowait())["id"] for _ in range(2)] == [
+                str(pushed.id),
+                str(pulled.id),
+            ]
+            assert queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_stream_events(
+        self,
+        built_tweet: PydanticTweetPersonal,
+        session: Any,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, built_tweet.author_id, follower.id)
+        monkeypatch.setattr(event_settings, "events_heartbeat", 0.05)
+        events = await self.test_service.stream_events(follower.id)
+
+        assert await anext(events) == b": ping\n\n"
+        monkeypatch.setattr(event_settings, "events_heartbeat", 60)
+        event = asyncio.create_task(anext(events))
+        await asyncio.sleep(0)
+        tweet_id = await self.test_service.publish(built_tweet)
+
+        assert await event == (
+            f'event: tweet\ndata: {{"id": "{tweet_id.id}"}}\n\n'.encode()
+        )
+        await events.aclose()
+
+    @pytest.mark.asyncio
+    async def test_timeline_size(
+        self,
+        built_tweet: PydanticTweetPersonal,
+        session: Any,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Лента хранит только последние публикации: новые вытесняют самые старые.
+        """
+        monkeypatch.setattr(db_settings, "timeline_size", 2)
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, built_tweet.author_id, follower.id)
+
+        tweet_ids = [
+            (await self.test_service.publish(built_tweet)).id for _ in range(3)
+        ]
+
+        assert {
+            tweet.id
+            for tweet in (await self.test_service.get_list(follower.id, 20)).tweets
+        } == set(tweet_ids[1:])
+
+    @pytest.mark.asyncio
+    async def test_follow_backfills_and_unfollow_prunes(
+        self, tweets: list[SQLAlchemyTweet], session: Any
+    ) -> None:
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        for tweet in tweets:
+            await self._follow(session, tweet.author_id, follower.id)
+        await self._follow(session, tweets[0].author_id, follower.id)
+
+        await UserService(
+            SQLAlchemyUserRepository(session),
+            self.timeline_repository(session),
+            self.cache,
+            self.principal_cache,
+        ).unfollow(tweets[0].author_id, follower.id)
+
+        assert [
+            tweet.id
+            for tweet in (await self.test_service.get_list(follower.id, 20)).tweets
+        ] == [tweets[1].id]
+
+    @pytest.mark.asyncio
+    async def test_backfill_keeps_newer(
+        self, session: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Публикации нового отслеживаемого автора вытесняют из заполненной ленты только более старые.
+        """
+        monkeypatch.setattr(db_settings, "timeline_size", 2)
+        follower, author, prolific = await SQLAlchemyUserFactory.create_batch(3)
+        now = (await session.execute(select(func.now()))).scalar_one()
+        newer = [
+            await SQLAlchemyTweetFactory(
+                author=author, created_at=now - timedelta(hours=hours)
+            )
+            for hours in (1, 2)
+        ]
+        latest = await SQLAlchemyTweetFactory(author=prolific, created_at=now)
+        for hours in (3, 4):
+            await SQLAlchemyTweetFactory(
+                author=prolific, created_at=now - timedelta(hours=hours)
+            )
+        await self._follow(session, author.id, follower.id)
+        await self._follow(session, prolific.id, follower.id)
+
+        assert [
+            tweet.id
+            for tweet in (await self.test_service.get_list(follower.id, 20)).tweets
+        ] == [latest.id, newer[0].id]
+
+    @pytest.mark.asyncio
+    async def test_push_after_backfill(
+        self, session: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Рассылка после дополнения ленты сначала занимает свободные ячейки, а затем вытесняет самые старые публикации,
+        а не дополненные.
+        """
+        monkeypatch.setattr(db_settings, "timeline_size", 4)
+        follower, author, followed = await SQLAlchemyUserFactory.create_batch(3)
+        now = (await session.execute(select(func.now()))).scalar_one()
+        older = [
+            await SQLAlchemyTweetFactory(
+                author=followed, created_at=now - timedelta(hours=hours)
+            )
+            for hours in (1, 2)
+        ]
+        built_tweet = PydanticTweetPersonal(
+            text=EXAMPLES.sentence(), medias=[], author_id=author.id
+        )
+
+        await self._follow(session, author.id, follower.id)
+        pushed = [(await self.test_service.publish(built_tweet)).id]
+        await self._follow(session, followed.id, follower.id)
+        pushed.append((await self.test_service.publish(built_tweet)).id)
+        timeline = select(sqlalchemy_timelines.c.tweet_id).where(
+            sqlalchemy_timelines.c.user_id == follower.id
+        )
+
+        assert set((await session.execute(timeline)).scalars()) == {
+            *pushed,
+            *(tweet.id for tweet in older),
+        }
+
+        pushed.append((await self.test_service.publish(built_tweet)).id)
+
+        assert set((await session.execute(timeline)).scalars()) == {
+            *pushed,
+            older[0].id,
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_all_pulled(
+        self,
+        tweets: list[SQLAlchemyTweet],
+        session: Any,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Публикации популярного автора не рассылаются по лентам, но сливаются с ними при чтении в общем порядке.
+        """
+        follower: SQLAlchemyUser = await SQLAlchemyUserFactory()
+        await self._follow(session, tweets[0].author_id, follower.id)
+        monkeypatch.setattr(db_settings, "pull_threshold", 1)
+        await self._follow(session, tweets[1].author_id, follower.id)
+        pulled = [
+            (
+                await self.test_service.publish(
+                    PydanticTweetPersonal(
+                        text=EXAMPLES.sentence(),
+                        medias=[],
+                        author_id=tweets[1].author_id,
+                    )
+                )
+            ).id
+            for _ in range(2)
+        ]
+        await session.execute(
+            update(SQLAlchemyTweet)
+            .where(SQLAlchemyTweet.id.in_([tweets[0].id, pulled[0]]))
+            .values(like_count=SQLAlchemyTweet.like_count + 1)
+        )
+
+        timeline = await session.execute(
+            select(sqlalchemy_timelines.c.tweet_id).where(
+                sqlalchemy_timelines.c.user_id == follower.id
+            )
+        )
+        assert timeline.scalars().all() == [tweets[0].id]
+
+        page = await self.test_service.get_list(follower.id, 2)
+        after = PydanticTweetsCursor.model_validate_json(
+            urlsafe_b64decode(page.next_cursor)
+        )
+        feed = (
+            page.tweets
+            + (await self.test_service.get_list(follower.id, 2, after)).tweets
+        )
+
+        assert {tweet.id for tweet in feed[:2]} == {tweets[0].id, pulled[0]}
+        assert {tweet.id for tweet in feed[2:]} == {tweets[1].id, pulled[1]}
+
+    @pytest.mark.asyncio
+    async def test_get_pulled_candidates_limited(
+        self, session: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Ограничение общее для всех читаемых при запросе авторов, а не для каждого из них.
+        """
+        monkeypatch.setattr(db_settings, "pull_threshold", 1)
+        follower, *authors = await SQLAlchemyUserFactory.create_batch(3)
+        for author in authors:
+            await self._follow(session, author.id, follower.id)
+        now = (await session.execute(select(func.now()))).scalar_one()
+        tweets = [
+            await SQLAlchemyTweetFactory(
+                author=authors[hours % 2], created_at=now - timedelta(hours=hours)
+            )
+            for hours in range(4)
+        ]
+
+        candidates = (
+            await self.repository(session).get_pulled_candidates(follower.id, 1, 3)
+        ).root
+
+        assert [candidate.id for candidate in candidates] == [
+            tweet.id
+            for tweet in sorted(
+                tweets[:3],
+                key=lambda tweet: (tweet.author_id, now - tweet.created_at),
+            )
+        ]
 
     @pytest.mark.asyncio
     async def test_create(self, built_tweet: PydanticTweetPersonal) -> None:
@@ -68,7 +603,37 @@ class TestSQLAlchemyTweets(TestSQLAlchemyModel):
         tweet_1, user_2 = tweets[0], tweets[1].author
         await self.test_service.like(tweet_1.id, user_2.id)
 
-        assert tweet_1.likes == [user_2]
+        assert await tweet_1.awaitable_attrs.likes == [user_2]
+        assert tweet_1.like_count == 1
+
+    @pytest.mark.asyncio
+    async def test_like_twice(self, tweets: list[SQLAlchemyTweet]) -> None:
+        tweet_1, user_2 = tweets[0], tweets[1].author
+        await self.test_service.like(tweet_1.id, user_2.id)
+        await self.test_service.like(tweet_1.id, user_2.id)
+
+        assert await tweet_1.awaitable_attrs.likes == [user_2]
+        assert tweet_1.like_count == 1
+
+    @pytest.mark.asyncio
+    async def test_like_many(self, tweets: list[SQLAlchemyTweet]) -> None:
+        user = tweets[1].author
+        await self.test_service.like(tweets[0].id, user.id)
+        ids = [tweets[0].id, tweets[1].id, uuid4(), tweets[0].id]
+
+        result = (await self.test_service.like_many(ids, user.id)).root
+
+        assert [item.id for item in result] == ids
+        assert [item.error is None for item in result] == [True, False, False, True]
+        assert await tweets[0].awaitable_attrs.likes == [user]
+        assert tweets[0].like_count == 1
+
+    @pytest.mark.asyncio
+    async def test_like_nonexistent(self, tweet: SQLAlchemyTweet) -> None:
+        with pytest.raises(NotFoundError):
+            await self.test_service.like(EXAMPLES.uuid4(), tweet.author.id)
+        with pytest.raises(NotFoundError):
+            await self.test_service.unlike(EXAMPLES.uuid4(), tweet.author.id)
 
     @pytest.mark.asyncio
     async def test_like_self(self, tweet: SQLAlchemyTweet) -> None:
@@ -82,6 +647,7 @@ class TestSQLAlchemyTweets(TestSQLAlchemyModel):
         await self.test_service.unlike(tweet_1.id, user_2.id)
 
         assert await tweet_1.awaitable_attrs.likes == []
+        assert tweet_1.like_count == 0
 
     @pytest.mark.asyncio
     async def test_unlike_self(self, tweet: SQLAlchemyTweet) -> None:
@@ -92,3 +658,130 @@ class TestSQLAlchemyTweets(TestSQLAlchemyModel):
         tweet_1, user_2 = tweets[0], tweets[1].author
 
         await self.test_service.unlike(tweet_1.id, user_2.id)
+
+        assert tweet_1.like_count == 0
+
+    @pytest.mark.asyncio
+    async def test_reconcile_like_counts(
+        self, tweets: list[SQLAlchemyTweet], session: Any
+    ) -> None:
+        tweet_1, user_2 = tweets[0], tweets[1].author
+        await self.test_service.like(tweet_1.id, user_2.id)
+        await session.execute(
+            update(SQLAlchemyTweet).values(like_count=SQLAlchemyTweet.like_count + 5)
+        )
+
+        after_id, total = None, 0
+        for _ in tweets:
+            after_id, fixed = await self.test_service.reconcile_like_counts(after_id, 1)
+            total += fixed
+
+        assert total == 2
+        assert await self.test_service.reconcile_like_counts(after_id, 1) == (None, 0)
+        like_counts = await session.execute(
+            select(SQLAlchemyTweet.id, SQLAlchemyTweet.like_count)
+        )
+        assert dict(like_counts.tuples().all()) == {tweet_1.id: 1, tweets[1].id: 0}
+
+
+class TestAsyncpgTweets(TestSQLAlchemyTweets):
+    repository: Type[AsyncpgTweetRepository] = AsyncpgTweetRepository
+
+
+class TestTweetsRoutes:
+    @pytest.mark.asyncio
+    async def test_get_list_cursor(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        response = await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+        assert response.status_code == 201
+
+        response = await client.get("/api/tweets", headers={"X-API-Key": key})
+        assert response.status_code == 200
+        assert response.json() == {"tweets": [], "nextCursor": None}
+
+        for params in ({"cursor": "invalid"}, {"limit": 0}):
+            response = await client.get(
+                "/api/tweets", params=params, headers={"X-API-Key": key}
+            )
+            assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_get_likes(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+        headers = {"X-API-Key": key}
+
+        response = await client.get(
+            "/api/tweets", params={"compact": True}, headers=headers
+        )
+        assert response.status_code == 200
+
+        response = await client.get(
+            f"/api/tweets/{EXAMPLES.uuid4()}/likes", headers=headers
+        )
+        assert response.status_code == 404
+
+        response = await client.get("/api/tweets/events")
+        assert response.status_code == 401
+
+        response = await client.post(
+            "/api/tweets", json={"text": "text", "medias": []}, headers=headers
+        )
+        response = await client.get(
+            f"/api/tweets/{response.json()['id']}/likes",
+            params={"cursor": "invalid"},
+            headers=headers,
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_get_list_etag(self, client: AsyncClient) -> None:
+        keys = [str(EXAMPLES.uuid4()) for _ in range(2)]
+        ids = []
+        for key in keys:
+            response = await client.post(
+                "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+            )
+            ids.append(response.json()["id"])
+        headers = {"X-API-Key": keys[0]}
+
+        response = await client.get("/api/tweets", headers=headers)
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        response = await client.get(
+            "/api/tweets", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get(
+            "/api/tweets",
+            params={"limit": 10},
+            headers={**headers, "If-None-Match": etag},
+        )
+        assert response.status_code == 200
+
+        await client.post(f"/api/users/{ids[1]}/follows", headers=headers)
+        response = await client.get(
+            "/api/tweets", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+class TestTweetsJobs:
+    @pytest.mark.asyncio
+    async def test_reconcile_like_counts(
+        self, session: Any, db_manager: DBManager
+    ) -> None:
+        await SQLAlchemyTweetFactory.create_batch(3)
+        await session.execute(update(SQLAlchemyTweet).values(like_count=5))
+        await session.commit()
+
+        assert await reconcile_like_counts(db_manager, 2) == 3
+        assert await reconcile_like_counts(db_manager, 2) == 0
@@ -1,16 +1,23 @@
+import json
+from base64 import urlsafe_b64decode
 from hashlib import sha256
-from typing import Type
-from uuid import UUID
+from typing import Any, Type
+from uuid import UUID, uuid4
 
 import pytest
 import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.errors import NotFoundError, SelfActionError
-from src.settings import EXAMPLES
+from src.cache import Cache
+from src.db import SQLAlchemyDBManager
+from src.errors import AlreadyExistsError, NotFoundError, SelfActionError
+from src.settings import EXAMPLES, db_settings
 from src.users.errors import UnauthenticatedError
 from src.users.models import SQLAlchemyUser
-from src.users.repositories import SQLAlchemyUserRepository
-from src.users.schemas import PydanticUserPersonal
+from src.users.repositories import AsyncpgUserRepository, SQLAlchemyUserRepository
+from src.users.schemas import PydanticFollowsCursor, PydanticUserPersonal
 from src.users.services import UserService
 from tests.factories import SQLAlchemyUserFactory
 from tests.test_cases.test_model import TestSQLAlchemyModel
@@ -59,6 +66,23 @@ class TestSQLAlchemyUsers(TestSQLAlchemyModel):
         with pytest.raises(UnauthenticatedError):
             await self.test_service.authenticate(EXAMPLES.uuid4())
 
+    @pytest.mark.asyncio
+    async def test_authenticate_cached(
+        self,
+        user_and_raw_key: tuple[SQLAlchemyUser, UUID],
+        cache: Cache,
+        principal_cache: Cache,
+    ) -> None:
+        user, raw_key = user_and_raw_key
+        principals = [await self.test_service.authenticate(raw_key) for _ in range(2)]
+
+        assert principals[0] == principals[1]
+        assert (principals[0].id, principals[0].name) == (user.id, user.name)
+        assert principal_cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["hits"] == 0
+        with pytest.raises(UnauthenticatedError):
+            await self.test_service.authenticate(EXAMPLES.uuid4())
+
     @pytest.mark.asyncio
     async def test_get_by_id(self, user: SQLAlchemyUser) -> None:
         assert user.name == (await self.test_service.find_by_id(user.id)).name
@@ -68,10 +92,77 @@ class TestSQLAlchemyUsers(TestSQLAlchemyModel):
         with pytest.raises(NotFoundError):
             await self.test_service.find_by_id(EXAMPLES.uuid4())
 
+    @pytest.mark.asyncio
+    async def test_find_by_ids(
+        self,
+        followers: tuple[SQLAlchemyUser, SQLAlchemyUser],
+        db_manager: SQLAlchemyDBManager,
+    ) -> None:
+        user_1, user_2 = followers
+        statements: list[str] = []
+
+        def on_execute(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(db_manager.engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            users = (
+                await self.test_service.find_by_ids(
+                    [user_2.id, uuid4(), user_1.id, user_2.id]
+                )
+            ).root
+        finally:
+            event.remove(
+                db_manager.engine.sync_engine, "before_cursor_execute", on_execute
+            )
+
+        assert [user.id for user in users] == [user_2.id, user_1.id]
+        assert users[1].followers_count == 1
+        assert len(statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_by_id_detailed(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        user_1, user_2 = followers
+
+        found_1 = await self.test_service.find_by_id(user_1.id)
+        found_2 = await self.test_service.find_by_id(user_2.id)
+
+        assert [user.id for user in found_1.followers] == [user_2.id]
+        assert found_1.following == []
+        assert [user.id for user in found_2.following] == [user_1.id]
+        assert found_2.followers == []
+
+    @pytest.mark.asyncio
+    async def test_get_by_id_counted(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        user_1, user_2 = followers
+
+        found_1 = await self.test_service.find_by_id(user_1.id, is_expanded=False)
+        found_2 = await self.test_service.find_by_id(user_2.id, is_expanded=False)
+
+        assert (found_1.followers_count, found_1.following_count) == (1, 0)
+        assert (found_2.followers_count, found_2.following_count) == (0, 1)
+        assert not hasattr(found_1, "followers")
+
     @pytest.mark.asyncio
     async def test_create(self, built_user: PydanticUserPersonal) -> None:
         assert built_user.name == (await self.test_service.sign_up(built_user)).name
 
+    @pytest.mark.asyncio
+    async def test_create_same_key(
+        self, built_user: PydanticUserPersonal, session: AsyncSession
+    ) -> None:
+        await self.test_service.sign_up(built_user)
+
+        with pytest.raises(AlreadyExistsError):
+            await self.test_service.sign_up(
+                PydanticUserPersonal(name=EXAMPLES.last_name(), key=built_user.key)
+            )
+        await session.rollback()
+
     @pytest.mark.asyncio
     async def test_follow(
         self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
@@ -81,6 +172,72 @@ class TestSQLAlchemyUsers(TestSQLAlchemyModel):
         assert await user_1.awaitable_attrs.followers == [user_2]
         assert await user_2.awaitable_attrs.following == [user_1]
 
+    @pytest.mark.asyncio
+    async def test_follow_with_lagging_read_session(
+        self,
+        session: Any,
+        db_manager: SQLAlchemyDBManager,
+        cache: Cache,
+        principal_cache: Cache,
+    ) -> None:
+        """
+        Количество отслеживающих, от которого зависит дополнение ленты, читается через основную сессию: сессия для
+        чтения (реплика) может ещё не видеть ни пользователя, ни отслеживания.
+        """
+        user_1, user_2 = self.factory_.build(), await self.factory_()
+        session.add(user_1)
+        await session.flush()
+        async with db_manager.get_session(is_read_only=True) as read_session:
+            await self.service(
+                self.repository(session, read_session),
+                self.timeline_repository(session),
+                cache,
+                principal_cache,
+            ).follow(user_1.id, user_2.id)
+
+        assert await user_1.awaitable_attrs.followers == [user_2]
+
+    @pytest.mark.asyncio
+    async def test_follow_twice(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        user_1, user_2 = followers
+        await self.test_service.follow(user_1.id, user_2.id)
+
+        assert await user_1.awaitable_attrs.followers == [user_2]
+        assert (
+            await self.test_service.find_by_id(user_1.id, is_expanded=False)
+        ).followers_count == 1
+
+    @pytest.mark.asyncio
+    async def test_follow_many(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        user_1, user_2 = followers
+        user_3 = await self.factory_()
+        ids = [user_1.id, user_3.id, user_2.id, uuid4()]
+
+        result = (await self.test_service.follow_many(ids, user_2.id)).root
+
+        assert [item.id for item in result] == ids
+        assert [item.error is None for item in result] == [True, True, False, False]
+        assert set(await user_2.awaitable_attrs.following) == {user_1, user_3}
+        counted = await self.test_service.find_by_id(user_2.id, is_expanded=False)
+        assert counted.following_count == 2
+        assert (
+            await self.test_service.find_by_id(user_1.id, is_expanded=False)
+        ).followers_count == 1
+
+    @pytest.mark.asyncio
+    async def test_follow_nonexistent(
+        self, user: SQLAlchemyUser, session: AsyncSession
+    ) -> None:
+        with pytest.raises(NotFoundError):
+            await self.test_service.unfollow(EXAMPLES.uuid4(), user.id)
+        with pytest.raises(NotFoundError):
+            await self.test_service.follow(EXAMPLES.uuid4(), user.id)
+        await session.rollback()
+
     @pytest.mark.asyncio
     async def test_follow_self(self, user: SQLAlchemyUser) -> None:
         with pytest.raises(SelfActionError):
@@ -95,6 +252,74 @@ class TestSQLAlchemyUsers(TestSQLAlchemyModel):
 
         assert await user_1.awaitable_attrs.followers == []
         assert await user_2.awaitable_attrs.following == []
+        assert (
+            await self.test_service.find_by_id(user_1.id, is_expanded=False)
+        ).followers_count == 0
+        assert (
+            await self.test_service.find_by_id(user_2.id, is_expanded=False)
+        ).following_count == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_detailed(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        _, user_2 = followers
+        user = await self.test_service.find_by_id(user_2.id)
+
+        chunks = [
+            chunk
+            async for chunk in self.test_service.stream_detailed(
+                await self.test_service.find_by_id(user_2.id, is_expanded=False)
+            )
+        ]
+
+        assert json.loads(b"".join(chunks)) == user.model_dump(
+            mode="json", by_alias=True
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_follows(self, user: SQLAlchemyUser) -> None:
+        followers = await self.factory_.create_batch(3)
+        for follower in followers:
+            await self.test_service.follow(user.id, follower.id)
+
+        pages = [await self.test_service.get_follows(user.id, False, 2)]
+        pages.append(
+            await self.test_service.get_follows(
+                user.id,
+                False,
+                2,
+                PydanticFollowsCursor.model_validate_json(
+                    urlsafe_b64decode(pages[0].next_cursor)
+                ),
+            )
+        )
+
+        assert [user_.id for page in pages for user_ in page.users] == sorted(
+            follower.id for follower in followers
+        )
+        assert pages[1].next_cursor is None
+        assert [
+            user_.id
+            for user_ in (
+                await self.test_service.get_follows(followers[0].id, True, 2)
+            ).users
+        ] == [user.id]
+        with pytest.raises(NotFoundError):
+            await self.test_service.get_follows(EXAMPLES.uuid4(), False, 2)
+
+    @pytest.mark.asyncio
+    async def test_follow_version(
+        self, followers: tuple[SQLAlchemyUser, SQLAlchemyUser]
+    ) -> None:
+        user_1, user_2 = followers
+        version = await self.test_service.get_follow_version(user_1.id)
+        await self.test_service.unfollow(user_1.id, user_2.id)
+        await self.test_service.follow(user_1.id, user_2.id)
+
+        assert await self.test_service.get_follow_version(user_1.id) == version + 2
+        with pytest.raises(NotFoundError):
+            await self.test_service.get_follow_version(EXAMPLES.uuid4())
 
     @pytest.mark.asyncio
     async def test_unfollow_self(self, user: SQLAlchemyUser) -> None:
@@ -107,3 +332,139 @@ class TestSQLAlchemyUsers(TestSQLAlchemyModel):
         user_1, user_2 = followers
 
         await self.test_service.unfollow(user_1.id, user_2.id)
+
+
+class TestAsyncpgUsers(TestSQLAlchemyUsers):
+    repository: Type[AsyncpgUserRepository] = AsyncpgUserRepository
+
+
+class TestUsersRoutes:
+    @pytest.mark.asyncio
+    async def test_get_profile_etag(self, client: AsyncClient) -> None:
+        keys = [str(EXAMPLES.uuid4()) for _ in range(2)]
+        ids = []
+        for key in keys:
+            response = await client.post(
+                "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+            )
+            ids.append(response.json()["id"])
+        headers = {"X-API-Key": keys[0]}
+
+        response = await client.get("/api/users/me", headers=headers)
+        etag = response.headers["ETag"]
+
+        response = await client.get(
+            "/api/users/me", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        await client.post(f"/api/users/{ids[1]}/follows", headers=headers)
+        response = await client.get(
+            "/api/users/me", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["followingCount"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_by_id_etag(self, client: AsyncClient) -> None:
+        keys = [str(EXAMPLES.uuid4()) for _ in range(2)]
+        ids = []
+        for key in keys:
+            response = await client.post(
+                "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+            )
+            ids.append(response.json()["id"])
+        headers = {"X-API-Key": keys[0]}
+
+        response = await client.get(f"/api/users/{ids[1]}", headers=headers)
+        etag = response.headers["ETag"]
+
+        response = await client.get(
+            f"/api/users/{ids[1]}", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        response = await client.get(
+            f"/api/users/{ids[1]}",
+            params={"expand": True},
+            headers={**headers, "If-None-Match": etag},
+        )
+        assert response.status_code == 200
+        assert response.json()["followers"] == []
+
+        await client.post(f"/api/users/{ids[1]}/follows", headers=headers)
+        response = await client.get(
+            f"/api/users/{ids[1]}", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["followersCount"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_follows(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        response = await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+        id_ = response.json()["id"]
+        headers = {"X-API-Key": key}
+
+        for path in ("followers", "following"):
+            response = await client.get(f"/api/users/{id_}/{path}", headers=headers)
+            assert response.status_code == 200
+            assert response.json() == {"users": [], "nextCursor": None}
+
+            response = await client.get(
+                f"/api/users/{id_}/{path}",
+                params={"cursor": "invalid"},
+                headers=headers,
+            )
+            assert response.status_code == 422
+
+        response = await client.get(
+            f"/api/users/{EXAMPLES.uuid4()}/followers", headers=headers
+        )
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_follow_many(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        response = await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+        id_ = response.json()["id"]
+        headers = {"X-API-Key": key}
+
+        response = await client.post(
+            "/api/users/follows:batch", json={"ids": [id_]}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json()[0]["error"]["msg"]
+
+        response = await client.post(
+            "/api/users/follows:batch", json={"ids": []}, headers=headers
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_get_by_ids(self, client: AsyncClient) -> None:
+        key = str(EXAMPLES.uuid4())
+        response = await client.post(
+            "/api/users", json={"name": EXAMPLES.first_name(), "key": key}
+        )
+        id_ = response.json()["id"]
+        headers = {"X-API-Key": key}
+
+        response = await client.get(
+            "/api/users", params={"ids": [id_, str(uuid4())]}, headers=headers
+        )
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()] == [id_]
+
+        response = await client.get(
+            "/api/users",
+            params={
+                "ids": [str(uuid4()) for _ in range(db_settings.batch_max_size + 1)]
+            },
+            headers=headers,
+        )
+        assert response.status_code == 422